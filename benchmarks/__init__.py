@@ -0,0 +1,7 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+(m,n,k)-game: benchmark suite.
+
+Run with: `python -m benchmarks --help`
+"""
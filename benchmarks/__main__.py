@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+(m,n,k)-game: benchmark suite.
+
+Results are written as JSON and compared against a stored baseline:
+the exit status is non-zero if regressions are found.
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+
+from benchmarks.util import BASELINE_FILEPATH, save, load, compare
+from benchmarks.bench_board import bench_boards
+from benchmarks.bench_ai import bench_ais, MAX_NODES
+from benchmarks.bench_perft import bench_perfts
+from benchmarks.bench_startup import bench_startup
+
+SUITES = dict(
+    board=bench_boards,
+    ai=bench_ais,
+    perft=bench_perfts,
+    startup=bench_startup,
+)
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        'suites', metavar='SUITE',
+        nargs='*', choices=list(SUITES.keys()) + [[]],
+        help='select the suites to run [all|(%(choices)s)]')
+    arg_parser.add_argument(
+        '-f', '--filter', metavar='PATTERN',
+        type=str, default=None,
+        help='only report benchmarks matching the pattern [%(default)s]')
+    arg_parser.add_argument(
+        '-o', '--output', metavar='FILE',
+        type=str, default=None,
+        help='write the results as JSON to file [%(default)s]')
+    arg_parser.add_argument(
+        '-b', '--baseline', metavar='FILE',
+        type=str, default=BASELINE_FILEPATH,
+        help='compare against the baseline [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--tolerance', metavar='X',
+        type=float, default=0.25,
+        help='relative slowdown tolerated [%(default)s]')
+    arg_parser.add_argument(
+        '-N', '--max_nodes', metavar='N',
+        type=int, default=MAX_NODES,
+        help='node budget of the AI searches [%(default)s]')
+    arg_parser.add_argument(
+        '-d', '--max_depth', metavar='N',
+        type=int, default=None,
+        help='maximum depth of the AI searches [%(default)s]')
+    arg_parser.add_argument(
+        '-u', '--update_baseline',
+        action='store_true',
+        help='overwrite the baseline with the results [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    args = handle_arg().parse_args()
+    results = {}
+    for suite in args.suites or list(SUITES.keys()):
+        print(f'I: Running `{suite}` benchmarks...', file=sys.stderr)
+        kws = dict(max_nodes=args.max_nodes, max_depth=args.max_depth) \
+            if suite == 'ai' else {}
+        results.update(SUITES[suite](**kws))
+    if args.filter:
+        results = {
+            name: result for name, result in results.items()
+            if fnmatch.fnmatch(name, args.filter)}
+    for name, result in sorted(results.items()):
+        print('{:<48s} {:>12.3e} s'.format(name, result['time']))
+    if args.output:
+        save(results, args.output)
+    if args.update_baseline:
+        if os.path.isfile(args.baseline):
+            baseline = load(args.baseline)
+            baseline.update(results)
+            results = baseline
+        save(results, args.baseline)
+    elif args.baseline and os.path.isfile(args.baseline):
+        regressions = compare(results, load(args.baseline), args.tolerance)
+        for name, field, base_value, value in regressions:
+            print(f'W: {name}: {field}: {base_value} -> {value}')
+        if regressions:
+            sys.exit(1)
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+from mnkgame.util import AI_MODES
+
+from benchmarks.util import SHAPES, random_position, jsonify
+
+# default node budget of each search
+MAX_NODES = 2000
+# AI methods whose move is not reproducible
+RANDOM_METHODS = ('more', 'less')
+
+
+# ======================================================================
+def bench_ai(name, shape, ai_mode, max_nodes=MAX_NODES, max_depth=None):
+    """
+    Benchmark an AI mode on an early position with a node budget.
+
+    Args:
+        name (str): The shape name.
+        shape (dict): The board shape.
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        max_nodes (int|None): The node budget.
+        max_depth (int|None): The maximum depth.
+
+    Returns:
+        results (dict): The results by benchmark name.
+    """
+    board, _ = random_position(shape, fill=0.1)
+    ai_class = AI_MODES[ai_mode]['ai_class']
+    ai_method = AI_MODES[ai_mode]['ai_method']
+    ai = ai_class()
+    begin_time = time.perf_counter()
+    move = ai.get_best_move(
+        board, None, ai_method, max_depth=max_depth, max_nodes=max_nodes,
+        verbose=False, seed=0)
+    result = dict(time=time.perf_counter() - begin_time)
+    if ai_method not in RANDOM_METHODS:
+        result.update(move=jsonify(move))
+    if ai.stats is not None and ai.stats.total_nodes:
+        result.update(
+            nodes=ai.stats.total_nodes, depth=ai.stats.depth,
+            nodes_per_sec=ai.stats.total_nodes / result['time'])
+    return {f'ai.{name}.{ai_mode}': result}
+
+
+# ======================================================================
+def bench_ais(max_nodes=MAX_NODES, max_depth=None, **_kws):
+    results = {}
+    for name, shape in SHAPES.items():
+        for ai_mode in AI_MODES:
+            results.update(
+                bench_ai(name, shape, ai_mode, max_nodes, max_depth))
+    return results
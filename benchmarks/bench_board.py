@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from benchmarks.util import SHAPES, measure, random_position
+
+
+# ======================================================================
+def bench_board(name, shape, **_kws):
+    """
+    Benchmark the board primitives on a mid-game position.
+
+    Args:
+        name (str): The shape name.
+        shape (dict): The board shape.
+        **_kws: Keyword arguments for `measure()`.
+
+    Returns:
+        results (dict): The results by benchmark name.
+    """
+    board, moves = random_position(shape)
+    last_move = moves[-1]
+    move = board.sorted_moves()[0]
+
+    def do_undo_move():
+        board.do_move(move)
+        board.undo_move(move)
+
+    funcs = dict(
+        do_undo_move=do_undo_move,
+        avail_moves=lambda: list(board.avail_moves()),
+        sorted_moves=board.sorted_moves,
+        winning_move=lambda: board.winning_move(last_move),
+        winner=board.winner,
+        winning_series=board.winning_series,
+        get_score=board.get_score,
+    )
+    return {
+        f'board.{name}.{label}': dict(time=measure(func, **_kws))
+        for label, func in funcs.items()}
+
+
+# ======================================================================
+def bench_boards(**_kws):
+    results = {}
+    for name, shape in SHAPES.items():
+        results.update(bench_board(name, shape, **_kws))
+    return results
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+from mnkgame.util import make_board
+
+from benchmarks.util import SHAPES
+from benchmarks.perft import perft
+
+# the perft depth of each shape
+DEPTHS = dict(
+    tic_tac_toe=5,
+    connect4=4,
+    gomoku=2,
+    custom_19x19x5=1,
+    custom_12x14x5g=3,
+)
+
+
+# ======================================================================
+def bench_perfts(**_kws):
+    """
+    Benchmark the move generation with perft (on the empty boards).
+
+    Returns:
+        results (dict): The results by benchmark name.
+    """
+    results = {}
+    for name, shape in SHAPES.items():
+        board = make_board(**shape)
+        begin_time = time.perf_counter()
+        counts = perft(board, DEPTHS[name])
+        elapsed = time.perf_counter() - begin_time
+        results[f'perft.{name}'] = dict(
+            time=elapsed, count=counts['nodes'],
+            moves_per_sec=counts['moves'] / elapsed)
+    return results
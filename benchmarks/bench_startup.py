@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import subprocess
+import sys
+
+from benchmarks.util import measure
+
+# the commands to time (executed with the current interpreter)
+COMMANDS = dict(
+    import_mnkgame=['-c', 'import mnkgame'],
+    import_util=['-c', 'import mnkgame.util'],
+    import_gui=['-c', 'import mnkgame.mnk_game_gui'],
+    main_help=['-m', 'mnkgame.mnk_game', '--help'],
+)
+
+
+# ======================================================================
+def bench_startup(**_kws):
+    """
+    Benchmark the import and the startup time (in a new interpreter).
+
+    Returns:
+        results (dict): The results by benchmark name.
+    """
+    _kws.setdefault('min_duration', 0.0)
+    results = {}
+    for label, args in COMMANDS.items():
+        def func():
+            subprocess.run(
+                [sys.executable] + args, check=True,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        results[f'startup.{label}'] = dict(time=measure(func, **_kws))
+    return results
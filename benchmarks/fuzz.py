@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+(m,n,k)-game: differential fuzz harness.
+
+Random sequences of moves and undos are played on random board shapes
+with the reference implementation (`Board` / `BoardGravity`) and with
+each fast backend, and all the queries are cross-checked after each step.
+Failing sequences are shrunk to a minimal list of operations.
+"""
+
+import argparse
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from mnkgame.util import make_board
+from mnkgame.BatchBoard import BatchBoard
+from mnkgame.BoardEval import BoardEval, MAX_BASE3_NUM_WIN, OPEN_FACTOR
+
+# the default number of operations of each sequence
+NUM_OPS = 64
+# the probability of undoing the last move
+UNDO_PROB = 0.25
+# the undo operation (any other operation is a move)
+UNDO = None
+
+
+# ======================================================================
+class BatchBoardView(object):
+    """
+    A single game backed by `BatchBoard`, with the `Board` interface.
+
+    All the queries are computed from the `BatchBoard` arrays, i.e. never
+    through a reference `Board`: the static evaluation in particular is
+    computed from scratch on the windows (with the weights of
+    `BoardEval`), so that the incremental window codes of the reference
+    are cross-checked as well.
+    """
+
+    REPRS = ('-', 'X', 'O')
+
+    def __init__(self, rows, cols, num_win, gravity=False):
+        self._batch = BatchBoard(rows, cols, num_win, 1, gravity)
+        self._weights = BoardEval._weights(num_win)
+
+    def _move(self, move):
+        return [move] if self._batch.gravity else [tuple(move)]
+
+    def do_move(self, move):
+        return bool(self._batch.do_moves(self._move(move))[0])
+
+    def undo_move(self, move):
+        batch = self._batch
+        if batch.gravity:
+            heights = batch._column_heights[0]
+            row, col = batch.rows - heights[move], move
+            if heights[move] == 0:
+                return False
+            heights[move] -= 1
+        else:
+            row, col = move
+        if batch.matrices[0, row, col] == batch.EMPTY:
+            return False
+        batch.matrices[0, row, col] = batch.EMPTY
+        batch.turns[0] = batch.next_turns(batch.turns[:1])[0]
+        return True
+
+    def winner(self):
+        return self._batch.winners()[0]
+
+    def winning_move(self, move):
+        return self._batch.winning_moves(self._move(move))[0]
+
+    def _cells(self):
+        # : the contents of each window, in the order of its direction
+        batch = self._batch
+        return batch.matrices[0].ravel()[batch._windows]
+
+    def winning_series(self):
+        batch = self._batch
+        windows, cells = batch._windows, self._cells()
+        for turn in batch.TURNS:
+            won = windows[np.all(cells == turn, axis=1)]
+            if len(won) > 0:
+                # : as the reference, begin with the leftmost extremum
+                return [
+                    tuple(sorted(
+                        (divmod(int(window[0]), batch.cols),
+                         divmod(int(window[-1]), batch.cols)),
+                        key=lambda x: (x[1], x[0])))
+                    for window in won]
+        return []
+
+    def avail_moves(self):
+        mask = self._batch.avail_moves_mask()[0]
+        if self._batch.gravity:
+            return set(np.where(mask)[0].tolist())
+        else:
+            return set(zip(*[idx.tolist() for idx in np.where(mask)]))
+
+    def is_full(self):
+        return self._batch.is_full()[0]
+
+    def get_score(self):
+        batch = self._batch
+        cells = self._cells()
+        first, second = batch.TURNS
+        num_first = np.sum(cells == first, axis=1)
+        num_second = np.sum(cells == second, axis=1)
+        scores = np.where(
+            num_second == 0, self._weights[num_first], 0) \
+            - np.where(num_first == 0, self._weights[num_second], 0)
+        if batch.num_win <= MAX_BASE3_NUM_WIN:
+            is_open = \
+                (cells[:, 0] == batch.EMPTY) & (cells[:, -1] == batch.EMPTY)
+            scores[is_open] *= OPEN_FACTOR
+        score = int(np.sum(scores))
+        return score if batch.turns[0] == first else -score
+
+    def __repr__(self):
+        batch = self._batch
+        return ''.join(
+            ''.join(self.REPRS[x] for x in row) + '\n'
+            for row in batch.matrices[0].tolist()) \
+            + self.REPRS[batch.turns[0]]
+
+
+# the fast backends to cross-check (with the signature of `make_board()`)
+BACKENDS = dict(
+    batch=BatchBoardView,
+)
+# the queries to cross-check (after the operation on `move`)
+QUERIES = dict(
+    winner=lambda board, move: int(board.winner()),
+    winning_move=lambda board, move:
+        int(board.winning_move(move) or 0) if move is not UNDO else None,
+    winning_series=lambda board, move: sorted(board.winning_series()),
+    avail_moves=lambda board, move: board.avail_moves(),
+    is_full=lambda board, move: bool(board.is_full()),
+    get_score=lambda board, move: int(board.get_score()),
+    hash=lambda board, move: repr(board),
+)
+
+
+# ======================================================================
+def random_shape(rng):
+    gravity = rng.random() < 0.5
+    rows = rng.randint(3, 9)
+    cols = rng.randint(3, 9)
+    num_win = rng.randint(3, max(rows, cols))
+    return dict(rows=rows, cols=cols, num_win=num_win, gravity=gravity)
+
+
+# ======================================================================
+def random_ops(shape, num_ops=NUM_OPS, undo_prob=UNDO_PROB, rng=random):
+    """
+    Generate a random sequence of moves and undos.
+
+    The game is not continued after a win, but undos are still possible.
+
+    Args:
+        shape (dict): The board shape (as in `make_board()`).
+        num_ops (int): The number of operations.
+        undo_prob (float): The probability of undoing the last move.
+        rng (random.Random): The random number generator.
+
+    Returns:
+        ops (list): The operations (moves or `UNDO`).
+    """
+    board = make_board(**shape)
+    ops = []
+    moves = []
+    is_over = False
+    for _ in range(num_ops):
+        if moves and (is_over or rng.random() < undo_prob):
+            board.undo_move(moves.pop())
+            ops.append(UNDO)
+            is_over = False
+        elif not is_over:
+            move = rng.choice(sorted(board.avail_moves()))
+            board.do_move(move)
+            moves.append(move)
+            ops.append(move)
+            is_over = bool(board.winning_move(move)) or board.is_full()
+    return ops
+
+
+# ======================================================================
+def _query(board, name, move):
+    try:
+        return QUERIES[name](board, move)
+    except Exception as e:
+        return f'{type(e).__name__}: {e}'
+
+
+def replay(shape, ops, backend):
+    """
+    Replay a sequence and cross-check a backend against the reference.
+
+    Invalid operations (moves on unavailable cells, undos without moves)
+    are skipped, so that any subsequence can be replayed.
+
+    Args:
+        shape (dict): The board shape (as in `make_board()`).
+        ops (list): The operations (moves or `UNDO`).
+        backend (str): The backend name (see `BACKENDS`).
+
+    Returns:
+        result (tuple|None): The first mismatch as
+            `(step, query, reference_value, backend_value)`, or None.
+    """
+    ref = make_board(**shape)
+    fast = BACKENDS[backend](**shape)
+    moves = []
+    for step, op in enumerate(ops):
+        if op is UNDO:
+            if not moves:
+                continue
+            move = moves.pop()
+            ok = ref.undo_move(move), fast.undo_move(move)
+            move = UNDO
+        else:
+            if op not in ref.avail_moves():
+                continue
+            ok = ref.do_move(op), fast.do_move(op)
+            moves.append(op)
+            move = op
+        if ok[0] != ok[1]:
+            return step, 'do_move' if move is not UNDO else 'undo_move', \
+                ok[0], ok[1]
+        for name in QUERIES:
+            values = _query(ref, name, move), _query(fast, name, move)
+            if values[0] != values[1]:
+                return (step, name) + values
+    return None
+
+
+# ======================================================================
+def shrink(shape, ops, backend):
+    """
+    Shrink a failing sequence to a minimal one (delta debugging).
+
+    Args:
+        shape (dict): The board shape (as in `make_board()`).
+        ops (list): The failing operations (moves or `UNDO`).
+        backend (str): The backend name (see `BACKENDS`).
+
+    Returns:
+        ops (list): The shortest failing sequence found, such that
+            removing any single operation makes it pass.
+    """
+    chunk = len(ops) // 2
+    while chunk >= 1:
+        i = 0
+        while i < len(ops):
+            candidate = ops[:i] + ops[i + chunk:]
+            if replay(shape, candidate, backend):
+                ops = candidate
+            else:
+                i += chunk
+        chunk //= 2
+    return ops
+
+
+# ======================================================================
+def fuzz_case(seed, num_ops=NUM_OPS, backends=tuple(BACKENDS)):
+    """
+    Fuzz all the backends with one random shape and sequence.
+
+    Args:
+        seed (int): The seed of the case.
+        num_ops (int): The number of operations.
+        backends (Iterable[str]): The backend names (see `BACKENDS`).
+
+    Returns:
+        failures (list[dict]): The failures with the shrunk sequence.
+    """
+    rng = random.Random(seed)
+    shape = random_shape(rng)
+    ops = random_ops(shape, num_ops, rng=rng)
+    failures = []
+    for backend in backends:
+        if replay(shape, ops, backend):
+            ops = shrink(shape, ops, backend)
+            failures.append(dict(
+                seed=seed, backend=backend, shape=shape, ops=ops,
+                mismatch=replay(shape, ops, backend)))
+    return failures
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        'backends', metavar='BACKEND',
+        nargs='*', choices=list(BACKENDS.keys()) + [[]],
+        help='select the backends to check [all|(%(choices)s)]')
+    arg_parser.add_argument(
+        '-c', '--num_cases', metavar='N',
+        type=int, default=1000,
+        help='number of random sequences [%(default)s]')
+    arg_parser.add_argument(
+        '-l', '--num_ops', metavar='N',
+        type=int, default=NUM_OPS,
+        help='number of operations of each sequence [%(default)s]')
+    arg_parser.add_argument(
+        '-s', '--seed', metavar='N',
+        type=int, default=0,
+        help='seed of the first sequence [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_workers', metavar='N',
+        type=int, default=1,
+        help='number of worker processes [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def main():
+    args = handle_arg().parse_args()
+    backends = tuple(args.backends or BACKENDS.keys())
+    seeds = range(args.seed, args.seed + args.num_cases)
+    num_failures = 0
+    with ProcessPoolExecutor(args.num_workers) as executor:
+        for failures in executor.map(
+                fuzz_case, seeds, [args.num_ops] * len(seeds),
+                [backends] * len(seeds), chunksize=16):
+            for failure in failures:
+                print(failure)
+            num_failures += len(failures)
+    print(f'Cases: {len(seeds)}, Failures: {num_failures}')
+    if num_failures:
+        sys.exit(1)
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+(m,n,k)-game: perft node counter.
+
+Count the positions reached by playing all the moves up to a given depth,
+which verifies that a board backend generates the same game tree as the
+others (and measures how fast it does so).
+Games ending before the depth count as leaves and their result is
+reported (relative to the player to move at the root).
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from mnkgame.util import ALIASES, make_board
+
+# the fields of the counts
+FIELDS = ('nodes', 'wins', 'losses', 'draws', 'moves')
+# the known counts, by alias, for increasing depth
+COUNTS_FILEPATH = os.path.join(os.path.dirname(__file__), 'perft.json')
+
+
+# ======================================================================
+def _perft(board, depth, root_turn, counts):
+    for move in board.sorted_moves():
+        board.do_move(move)
+        counts['moves'] += 1
+        _count(board, move, depth - 1, root_turn, counts)
+        board.undo_move(move)
+
+
+def _count(board, move, depth, root_turn, counts):
+    winner = board.winning_move(move)
+    if winner:
+        counts['nodes'] += 1
+        counts['wins' if winner == root_turn else 'losses'] += 1
+    elif board.is_full():
+        counts['nodes'] += 1
+        counts['draws'] += 1
+    elif depth == 0:
+        counts['nodes'] += 1
+    else:
+        _perft(board, depth, root_turn, counts)
+
+
+def _perft_root(board, move, depth):
+    root_turn = board.next_turn()
+    counts = dict.fromkeys(FIELDS, 0)
+    board.do_move(move)
+    counts['moves'] += 1
+    _count(board, move, depth - 1, root_turn, counts)
+    return counts
+
+
+# ======================================================================
+def perft(board, depth, divide=False, num_workers=1):
+    """
+    Count the leaves of the game tree up to a given depth.
+
+    Args:
+        board (Board): The root position (it is left unchanged).
+            Any backend with the `Board` interface can be used.
+        depth (int): The number of plies.
+        divide (bool): Whether to report the counts by root move.
+        num_workers (int|None): The number of worker processes.
+            The root moves are distributed among the workers.
+            If None, the number of CPUs is used.
+            If 1, the count runs in the current process.
+
+    Returns:
+        result (dict): The counts of: `nodes` (the leaves), `wins`,
+            `losses` and `draws` (the games ended before or at the depth,
+            for the player to move at the root) and `moves` (the moves
+            performed, including the internal nodes).
+            If `divide` is True, the counts are by root move instead.
+    """
+    if depth <= 0:
+        counts = dict.fromkeys(FIELDS, 0)
+        counts['nodes'] = 1
+        return {} if divide else counts
+    moves = board.sorted_moves()
+    if num_workers == 1:
+        by_move = [
+            _perft_root(copy.deepcopy(board), move, depth) for move in moves]
+    else:
+        with ProcessPoolExecutor(num_workers) as executor:
+            by_move = list(executor.map(
+                _perft_root, [board] * len(moves), moves,
+                [depth] * len(moves)))
+    if divide:
+        return dict(zip(moves, by_move))
+    else:
+        return {
+            field: sum(counts[field] for counts in by_move)
+            for field in FIELDS}
+
+
+# ======================================================================
+def load_counts(filepath=COUNTS_FILEPATH):
+    with open(filepath, 'r') as file_obj:
+        return json.load(file_obj)
+
+
+# ======================================================================
+def handle_arg():
+    """
+    Handle command-line application arguments.
+    """
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument(
+        'alias', metavar='ALIAS',
+        nargs='?', choices=list(ALIASES.keys()), default='custom',
+        help='select the board [%(default)s|(%(choices)s)]')
+    arg_parser.add_argument(
+        '-m', '--rows', metavar='N',
+        type=int, default=3,
+        help='number of rows for the custom board [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--cols', metavar='N',
+        type=int, default=3,
+        help='number of cols for the custom board [%(default)s]')
+    arg_parser.add_argument(
+        '-k', '--num_win', metavar='N',
+        type=int, default=3,
+        help='number of aligned pieces required for winning [%(default)s]')
+    arg_parser.add_argument(
+        '-g', '--gravity',
+        action='store_true',
+        help='use gravity-rule variant [%(default)s]')
+    arg_parser.add_argument(
+        '-d', '--depth', metavar='N',
+        type=int, default=4,
+        help='number of plies [%(default)s]')
+    arg_parser.add_argument(
+        '-D', '--divide',
+        action='store_true',
+        help='report the counts by root move [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_workers', metavar='N',
+        type=int, default=None,
+        help='number of worker processes [%(default)s]')
+    arg_parser.add_argument(
+        '-c', '--check',
+        action='store_true',
+        help='check all the known counts up to the depth [%(default)s]')
+    return arg_parser
+
+
+# ======================================================================
+def check(max_depth, num_workers=None, filepath=COUNTS_FILEPATH):
+    """
+    Check the counts of the standard aliases against the known values.
+
+    Args:
+        max_depth (int): The maximum depth to check.
+        num_workers (int|None): The number of worker processes.
+        filepath (str): The path to the known counts.
+
+    Returns:
+        result (bool): Whether all the counts are correct.
+    """
+    result = True
+    for alias, known_counts in load_counts(filepath).items():
+        board = make_board(**ALIASES[alias])
+        for depth, known in enumerate(known_counts[:max_depth], 1):
+            counts = perft(board, depth, num_workers=num_workers)
+            counts.pop('moves')
+            is_ok = counts == known
+            result = result and is_ok
+            print(
+                '{:<12s} {:>3d}  {}  {}'.format(
+                    alias, depth, 'OK' if is_ok else 'FAIL', counts))
+    return result
+
+
+# ======================================================================
+def main():
+    args = handle_arg().parse_args()
+    if args.check:
+        sys.exit(0 if check(args.depth, args.num_workers) else 1)
+    if args.alias == 'custom':
+        shape = dict(
+            rows=args.rows, cols=args.cols, num_win=args.num_win,
+            gravity=args.gravity)
+    else:
+        shape = ALIASES[args.alias]
+    board = make_board(**shape)
+    begin_time = time.perf_counter()
+    result = perft(board, args.depth, args.divide, args.num_workers)
+    elapsed = time.perf_counter() - begin_time
+    if args.divide:
+        for move, counts in result.items():
+            print(move, counts)
+        moves = sum(counts['moves'] for counts in result.values())
+    else:
+        print(result)
+        moves = result['moves']
+    print(
+        'Time: {:.3f} s, Moves/s: {:.0f}'.format(
+            elapsed, moves / elapsed if elapsed > 0 else 0.0))
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
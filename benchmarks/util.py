@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import platform
+import random
+import sys
+import time
+import datetime
+
+from mnkgame.util import ALIASES, make_board
+
+# minimum duration of each timing in sec
+MIN_DURATION = 0.1
+# number of timings (the fastest is used)
+NUM_REPEAT = 3
+# board shapes of the benchmarks (aliases and larger custom shapes)
+SHAPES = dict(
+    **{alias: info for alias, info in ALIASES.items() if info},
+    custom_19x19x5=dict(rows=19, cols=19, num_win=5, gravity=False),
+    custom_12x14x5g=dict(rows=12, cols=14, num_win=5, gravity=True),
+)
+# fields of the results expected to be reproducible
+EXACT_FIELDS = ('move', 'nodes', 'depth', 'count')
+# default baseline path
+BASELINE_FILEPATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+# ======================================================================
+def measure(func, min_duration=MIN_DURATION, repeat=NUM_REPEAT):
+    """
+    Measure the execution time of a function.
+
+    Args:
+        func (callable): The function to time (without arguments).
+        min_duration (float): The minimum duration of each timing in sec.
+            The number of calls per timing is increased until reached.
+        repeat (int): The number of timings.
+
+    Returns:
+        result (float): The fastest time per call in sec.
+    """
+    num = 1
+    while True:
+        begin_time = time.perf_counter()
+        for _ in range(num):
+            func()
+        elapsed = time.perf_counter() - begin_time
+        if elapsed >= min_duration:
+            break
+        num *= 2
+    timings = [elapsed / num]
+    for _ in range(repeat - 1):
+        begin_time = time.perf_counter()
+        for _ in range(num):
+            func()
+        timings.append((time.perf_counter() - begin_time) / num)
+    return min(timings)
+
+
+# ======================================================================
+def random_position(shape, fill=0.3, seed=0):
+    """
+    Generate a reproducible random position without winner.
+
+    Args:
+        shape (dict): The board shape (as in `ALIASES`).
+        fill (float): The fraction of the cells to fill.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        result (tuple): The board and the moves performed.
+    """
+    rng = random.Random(seed)
+    board = make_board(**shape)
+    moves = []
+    num_moves = int(fill * board.rows * board.cols)
+    while len(moves) < num_moves:
+        candidates = [
+            move for move in board.sorted_moves()
+            if board.do_move(move) and board.undo_move(move)
+            and not _is_winning(board, move)]
+        if not candidates:
+            break
+        move = rng.choice(candidates)
+        board.do_move(move)
+        moves.append(move)
+    return board, moves
+
+
+def _is_winning(board, move):
+    board.do_move(move)
+    result = board.winning_move(move) == board.turn
+    board.undo_move(move)
+    return result
+
+
+# ======================================================================
+def jsonify(obj):
+    """Convert moves (possibly tuples of NumPy integers) for JSON."""
+    if isinstance(obj, (tuple, list)):
+        return [jsonify(x) for x in obj]
+    elif hasattr(obj, 'item'):
+        return obj.item()
+    else:
+        return obj
+
+
+# ======================================================================
+def get_meta():
+    import numpy as np
+    from mnkgame import INFO
+    return dict(
+        version=INFO['version'],
+        python=sys.version.split()[0],
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor(),
+        date=datetime.datetime.now().isoformat())
+
+
+# ======================================================================
+def save(results, filepath):
+    with open(filepath, 'w') as file_obj:
+        json.dump(
+            dict(meta=get_meta(), results=results), file_obj,
+            indent=2, sort_keys=True)
+
+
+# ======================================================================
+def load(filepath):
+    with open(filepath, 'r') as file_obj:
+        return json.load(file_obj)['results']
+
+
+# ======================================================================
+def compare(results, baseline, tolerance=0.25):
+    """
+    Compare results against a baseline.
+
+    Args:
+        results (dict): The benchmark results.
+        baseline (dict): The baseline results.
+        tolerance (float): The relative slowdown tolerated.
+
+    Returns:
+        result (list[tuple]): The regressions found, as
+            `(name, field, baseline_value, value)`.
+            Timing regressions are reported for the `time` field, while
+            any difference in a reproducible field (e.g. the move chosen
+            or the number of nodes) is reported as well.
+    """
+    regressions = []
+    for name, entry in sorted(results.items()):
+        base_entry = baseline.get(name)
+        if base_entry is None:
+            continue
+        for field in EXACT_FIELDS:
+            if field in entry and field in base_entry \
+                    and entry[field] != base_entry[field]:
+                regressions.append(
+                    (name, field, base_entry[field], entry[field]))
+        if entry['time'] > base_entry['time'] * (1 + tolerance):
+            regressions.append(
+                (name, 'time', base_entry['time'], entry['time']))
+    return regressions
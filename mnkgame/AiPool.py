@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import ctypes
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from mnkgame.GameAiSearchTree import GameAiSearchTree
+from mnkgame.SharedBoard import SharedBoard
+
+# maximum number of requests pending at the same time (per pool)
+MAX_REQUESTS = 1024
+
+# the AI instances of the worker process, by class and board shape
+# (kept to reuse their caches)
+_AIS = {}
+# the stop flags shared with the worker process
+_FLAGS = None
+
+
+class SlotEvent(object):
+    """A read-only event backed by one slot of a shared flags array."""
+
+    def __init__(self, flags, slot):
+        self._flags = flags
+        self._slot = slot
+
+    def is_set(self):
+        return self._flags[self._slot]
+
+
+def _init_worker(flags):
+    global _FLAGS
+    _FLAGS = flags
+
+
+def _search(ai_class, board, slot, kws):
+    if isinstance(board, SharedBoard):
+        board = board.local_board()
+    key = ai_class, board.rows, board.cols, board.num_win, \
+        hasattr(board, 'has_gravity')
+    if key not in _AIS:
+        _AIS[key] = ai_class()
+    ai = _AIS[key]
+    move = ai.get_best_move(board, stop=SlotEvent(_FLAGS, slot), **kws)
+    return move, ai.stats
+
+
+class AiPool(object):
+    """
+    Pool of worker processes running AI searches for asyncio.
+
+    Each pending request is assigned a slot of a shared array of flags,
+    which is polled by the search through its `stop` event, so that
+    cancelling a request actually stops the corresponding search.
+    """
+
+    def __init__(self, num_workers=None, max_requests=MAX_REQUESTS):
+        self._flags = multiprocessing.Array(
+            ctypes.c_bool, max_requests, lock=False)
+        self._free_slots = list(range(max_requests))[::-1]
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(
+            num_workers, initializer=_init_worker, initargs=(self._flags,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def shutdown(self):
+        for slot in range(len(self._flags)):
+            self._flags[slot] = True
+        self._executor.shutdown(wait=True)
+
+    def _acquire_slot(self):
+        with self._lock:
+            if not self._free_slots:
+                raise RuntimeError('Too many pending requests.')
+            slot = self._free_slots.pop()
+        self._flags[slot] = False
+        return slot
+
+    def _release_slot(self, slot):
+        with self._lock:
+            self._free_slots.append(slot)
+
+    def _stop_slot(self, slot, c_future):
+        # : once done, the slot may already be reused by another request
+        with self._lock:
+            if not c_future.done():
+                self._flags[slot] = True
+
+    async def get_best_move_async(
+            self,
+            board,
+            ai_class=GameAiSearchTree,
+            timeout=None,
+            with_stats=False,
+            **_kws):
+        """
+        Compute the best move in a worker process.
+
+        Args:
+            board (Board|SharedBoard): The current position.
+                With a `SharedBoard`, only its name is sent to the worker,
+                which keeps its own copy of the board and updates it
+                incrementally.
+            ai_class (type): The AI class.
+            timeout (float|None): The hard time limit in sec.
+                When exceeded, the search is stopped and the best move
+                found so far is returned.
+                This is meant as a safety net on top of the search own
+                limits (e.g. `max_duration`).
+            with_stats (bool): Return the search statistics as well.
+            **_kws: Keyword arguments for `ai_class.get_best_move()`.
+
+        Returns:
+            result (Any|tuple): The best move, or, if `with_stats` is True,
+                the best move and the search statistics.
+
+        Raises:
+            asyncio.CancelledError: If cancelled (the search is stopped).
+        """
+        _kws.setdefault('verbose', False)
+        slot = self._acquire_slot()
+        try:
+            c_future = self._executor.submit(
+                _search, ai_class, board, slot, _kws)
+        except BaseException:
+            self._release_slot(slot)
+            raise
+        # : the slot is reused only after the worker is done with it
+        c_future.add_done_callback(lambda _: self._release_slot(slot))
+        future = asyncio.wrap_future(c_future)
+        try:
+            try:
+                move, stats = await asyncio.wait_for(
+                    asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                self._stop_slot(slot, c_future)
+                move, stats = await future
+        except asyncio.CancelledError:
+            self._stop_slot(slot, c_future)
+            c_future.cancel()
+            raise
+        return (move, stats) if with_stats else move
+
+
+# ======================================================================
+_POOL = None
+
+
+def get_pool():
+    """Get the default pool (created on first use)."""
+    global _POOL
+    if _POOL is None:
+        _POOL = AiPool()
+    return _POOL
+
+
+# ======================================================================
+async def get_best_move_async(board, ai_class=GameAiSearchTree, **_kws):
+    """
+    Compute the best move in a worker process of the default pool.
+
+    See `AiPool.get_best_move_async()` for the details.
+    """
+    return await get_pool().get_best_move_async(board, ai_class, **_kws)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import cProfile
+import collections
+import functools
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+
+# the profiling modes
+MODES = ('cprofile', 'sample')
+# the sampling interval of the statistical profiler in sec
+SAMPLE_INTERVAL = 0.001
+# the AI methods profiled by `install()`
+AI_METHODS = ('get_best_move', 'get_move_scores')
+# the functions whose share is always reported
+HOT_FUNCS = ('winning_move', 'avail_moves')
+
+
+class SignalSampler(object):
+    """
+    Statistical profiler sampling the stack of the main thread.
+
+    The stack is sampled by a signal handler every `interval` of CPU time.
+    For each function, the number of samples where it was running (self)
+    or on the stack (cumulative) are counted.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.cum_counts = collections.Counter()
+        self.num_samples = 0
+        self._handler = None
+
+    @staticmethod
+    def is_available():
+        return hasattr(signal, 'setitimer') \
+            and threading.current_thread() is threading.main_thread()
+
+    @staticmethod
+    def _label(frame):
+        code = frame.f_code
+        return code.co_filename, code.co_firstlineno, code.co_name
+
+    def sample(self, frame):
+        self.num_samples += 1
+        self.counts[self._label(frame)] += 1
+        labels = set()
+        while frame is not None:
+            labels.add(self._label(frame))
+            frame = frame.f_back
+        self.cum_counts.update(labels)
+
+    def start(self):
+        self._handler = signal.signal(
+            signal.SIGPROF, lambda signum, frame: self.sample(frame))
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0.0)
+        signal.signal(signal.SIGPROF, self._handler)
+
+
+class ThreadSampler(SignalSampler):
+    """
+    Statistical profiler sampling the stack of another thread.
+
+    The stack is sampled by a separate thread every `interval` of wall
+    time.
+    This works for any thread, but the samples are biased toward the
+    calls releasing the GIL (e.g. some NumPy functions).
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super(ThreadSampler, self).__init__(interval)
+        self.thread_id = thread_id
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+
+
+class AiProfiler(object):
+    """
+    Profiler of the AI calls.
+
+    Only the time spent inside the profiled calls is measured, so that,
+    e.g., the time waiting for the user is excluded.
+    Calls made while another call is being profiled (e.g. pondering in
+    another thread) are not profiled.
+
+    Args:
+        mode (str): The profiling mode (see `MODES`).
+            With `cprofile`, all function calls are traced (exact counts,
+            larger overhead); with `sample`, the stack is sampled
+            periodically (approximate, small overhead; see `SignalSampler`
+            and `ThreadSampler` for calls outside of the main thread).
+        dirpath (str|None): The directory for the per-call profiles.
+            With `cprofile`, these can be loaded with `pstats`.
+            If None, they are not written.
+        interval (float): The sampling interval in sec.
+
+    Examples:
+        >>> from mnkgame.Board import Board
+        >>> from mnkgame.GameAiSearchTree import GameAiSearchTree
+        >>> profiler = AiProfiler('cprofile')
+        >>> ai = GameAiSearchTree()
+        >>> get_best_move = profiler.wrap(ai.get_best_move)
+        >>> move = get_best_move(Board(3, 3, 3), max_depth=2, verbose=False)
+        >>> profiler.num_calls
+        1
+    """
+
+    def __init__(
+            self,
+            mode='cprofile',
+            dirpath=None,
+            interval=SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f'Unknown profiling mode `{mode}`.')
+        self.mode = mode
+        self.dirpath = dirpath
+        self.interval = interval
+        self.num_calls = 0
+        self.elapsed = 0.0
+        self._stats = None
+        self._counts = collections.Counter()
+        self._cum_counts = collections.Counter()
+        self._num_samples = 0
+        self._lock = threading.Lock()
+        self._installed = []
+        if dirpath:
+            os.makedirs(dirpath, exist_ok=True)
+
+    def call(self, func, *_args, **_kws):
+        """Call a function, profiling it (if no other call is)."""
+        if not self._lock.acquire(blocking=False):
+            return func(*_args, **_kws)
+        try:
+            self.num_calls += 1
+            begin_time = time.perf_counter()
+            if self.mode == 'cprofile':
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(func, *_args, **_kws)
+                finally:
+                    self.elapsed += time.perf_counter() - begin_time
+                    self._add_profile(profile)
+            else:  # if self.mode == 'sample':
+                if SignalSampler.is_available():
+                    sampler = SignalSampler(self.interval)
+                else:
+                    sampler = ThreadSampler(
+                        threading.get_ident(), self.interval)
+                sampler.start()
+                try:
+                    return func(*_args, **_kws)
+                finally:
+                    sampler.stop()
+                    self.elapsed += time.perf_counter() - begin_time
+                    self._add_sampler(sampler)
+        finally:
+            self._lock.release()
+
+    def _add_profile(self, profile):
+        if self._stats is None:
+            self._stats = pstats.Stats(profile)
+        else:
+            self._stats.add(profile)
+        if self.dirpath:
+            profile.dump_stats(
+                os.path.join(self.dirpath, f'{self.num_calls:04d}.prof'))
+
+    def _add_sampler(self, sampler):
+        self._counts.update(sampler.counts)
+        self._cum_counts.update(sampler.cum_counts)
+        self._num_samples += sampler.num_samples
+        if self.dirpath:
+            filepath = os.path.join(
+                self.dirpath, f'{self.num_calls:04d}.txt')
+            with open(filepath, 'w') as file_obj:
+                file_obj.write(format_table(
+                    _sampler_table(
+                        sampler.counts, sampler.cum_counts,
+                        sampler.num_samples)))
+
+    def wrap(self, func):
+        """Wrap a function (e.g. a bound AI method) to profile its calls."""
+
+        @functools.wraps(func)
+        def wrapper(*_args, **_kws):
+            return self.call(func, *_args, **_kws)
+
+        return wrapper
+
+    def install(self, *ai_classes):
+        """
+        Profile the AI methods of the given classes.
+
+        Args:
+            *ai_classes (type): The AI classes.
+                Their methods listed in `AI_METHODS` (if present) are
+                replaced by profiled versions until `uninstall()`.
+        """
+        for ai_class in ai_classes:
+            for name in AI_METHODS:
+                if name in vars(ai_class):
+                    func = vars(ai_class)[name]
+                    self._installed.append((ai_class, name, func))
+                    setattr(ai_class, name, self.wrap(func))
+
+    def uninstall(self):
+        """Restore the AI methods replaced by `install()`."""
+        for ai_class, name, func in self._installed[::-1]:
+            setattr(ai_class, name, func)
+        self._installed = []
+
+    def table(self):
+        """
+        Summarize the profiles.
+
+        Returns:
+            result (list[tuple]): The function label, the self time share
+                and the cumulative time share, by decreasing self time.
+        """
+        if self.mode == 'cprofile':
+            return _pstats_table(self._stats)
+        else:
+            return _sampler_table(
+                self._counts, self._cum_counts, self._num_samples)
+
+    def report(self, top=20):
+        """
+        Report the hot functions.
+
+        Args:
+            top (int): The number of functions to report.
+                The shares of the functions in `HOT_FUNCS` are always
+                reported.
+
+        Returns:
+            text (str): The report.
+        """
+        table = self.table()
+        text = f'Profiled calls: {self.num_calls}, ' \
+               f'Time: {self.elapsed:.3f} s, Mode: {self.mode}\n'
+        text += format_table(table[:top])
+        for name in HOT_FUNCS:
+            self_share = sum(x[1] for x in table if x[0][2] == name)
+            cum_share = max([x[2] for x in table if x[0][2] == name] + [0.0])
+            text += f'\n{name}: {self_share:.1%} (self), ' \
+                    f'{cum_share:.1%} (cumulative)'
+        return text
+
+    def print_report(self, top=20, file=sys.stderr):
+        print(self.report(top), file=file)
+
+
+# ======================================================================
+def _pstats_table(stats):
+    if stats is None:
+        return []
+    total = sum(tt for _, _, tt, _, _ in stats.stats.values())
+    if total <= 0:
+        return []
+    table = [
+        (label, tt / total, ct / total)
+        for label, (_, _, tt, ct, _) in stats.stats.items()]
+    return sorted(table, key=lambda x: -x[1])
+
+
+def _sampler_table(counts, cum_counts, num_samples):
+    if num_samples <= 0:
+        return []
+    table = [
+        (label, counts[label] / num_samples,
+         cum_counts[label] / num_samples)
+        for label in cum_counts]
+    return sorted(table, key=lambda x: (-x[1], -x[2]))
+
+
+def format_table(table):
+    """Format the function label and the self and cumulative shares."""
+    text = '{:>7s} {:>7s}  {}\n'.format('self', 'cum', 'function')
+    for (filename, line, name), self_share, cum_share in table:
+        text += '{:>7.1%} {:>7.1%}  {}:{}({})\n'.format(
+            self_share, cum_share, os.path.basename(filename), line, name)
+    return text
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+from mnkgame.Board import Board, line_windows, cell_windows
+from mnkgame.BoardGravity import BoardGravity
+
+
+class BatchBoard:
+    EMPTY = Board.EMPTY
+    TURNS = Board.TURNS
+    NO_MOVE = -1
+
+    def __init__(
+            self,
+            rows,
+            cols,
+            num_win,
+            batch_size,
+            gravity=False,
+            seed=None):
+        self._rows = rows
+        self._cols = cols
+        self._num_win = num_win
+        self._batch_size = batch_size
+        self._gravity = gravity
+        self._windows = line_windows(rows, cols, num_win)
+        self._cell_windows = cell_windows(rows, cols, num_win)
+        self._rng = np.random.default_rng(seed)
+        self._matrices = None
+        self._turns = None
+        self._column_heights = None
+        self.reset()
+
+    @classmethod
+    def from_board(cls, board, batch_size, seed=None):
+        obj = cls(
+            board.rows, board.cols, board.num_win, batch_size,
+            hasattr(board, 'has_gravity'), seed)
+        obj._matrices[:] = board.matrix
+        obj._turns[:] = board.turn
+        obj._column_heights[:] = np.sum(board.matrix != cls.EMPTY, axis=0)
+        return obj
+
+    def reset(self):
+        self._matrices = np.full(
+            (self._batch_size, self._rows, self._cols), self.EMPTY,
+            dtype=np.uint8)
+        self._turns = np.full(self._batch_size, self.TURNS[-1], dtype=np.uint8)
+        self._column_heights = np.zeros(
+            (self._batch_size, self._cols), dtype=np.intp)
+
+    @property
+    def rows(self):
+        return self._rows
+
+    @property
+    def cols(self):
+        return self._cols
+
+    @property
+    def num_win(self):
+        return self._num_win
+
+    @property
+    def batch_size(self):
+        return self._batch_size
+
+    @property
+    def gravity(self):
+        return self._gravity
+
+    @property
+    def matrices(self):
+        return self._matrices
+
+    @property
+    def turns(self):
+        return self._turns
+
+    def __len__(self):
+        return self._batch_size
+
+    def __getitem__(self, i):
+        board_class = BoardGravity if self._gravity else Board
+        board = board_class(self._rows, self._cols, self._num_win)
+        board._matrix[:] = self._matrices[i]
+        board._turn = int(self._turns[i])
+        if self._gravity:
+            board._column_heights = self._column_heights[i].tolist()
+        board._sync_eval()
+        return board
+
+    def next_turns(self, turns=None):
+        if turns is None:
+            turns = self._turns
+        return np.where(
+            turns == self.TURNS[0], self.TURNS[1], self.TURNS[0]).astype(
+            np.uint8)
+
+    def _flat_matrices(self):
+        return self._matrices.reshape(self._batch_size, -1)
+
+    def num_moves(self):
+        return np.sum(self._flat_matrices() != self.EMPTY, axis=1)
+
+    def is_full(self):
+        if self._gravity:
+            return np.all(self._matrices[:, 0, :] != self.EMPTY, axis=1)
+        else:
+            return np.all(self._flat_matrices() != self.EMPTY, axis=1)
+
+    def avail_moves_mask(self):
+        if self._gravity:
+            return self._matrices[:, 0, :] == self.EMPTY
+        else:
+            return self._matrices == self.EMPTY
+
+    def _to_flat(self, moves):
+        moves = np.asarray(moves, dtype=np.intp)
+        if self._gravity:
+            rows = self._rows - self._column_heights[
+                np.arange(self._batch_size),
+                np.clip(moves, 0, self._cols - 1)] - 1
+            valid = (0 <= moves) & (moves < self._cols) & (rows >= 0)
+            flat = rows * self._cols + moves
+        else:
+            valid = (0 <= moves[:, 0]) & (moves[:, 0] < self._rows) \
+                    & (0 <= moves[:, 1]) & (moves[:, 1] < self._cols)
+            flat = moves[:, 0] * self._cols + moves[:, 1]
+        return np.where(valid, flat, 0), valid
+
+    def do_moves(self, moves, mask=None):
+        """
+        Perform one move on each board of the batch.
+
+        Args:
+            moves (Iterable): The moves to perform.
+                If gravity is used, this must have shape `(batch_size,)`
+                and contain the columns, otherwise this must have shape
+                `(batch_size, 2)` and contain the `(row, col)` coordinates.
+            mask (Iterable[bool]|None): The boards on which to move.
+                If None, all boards are used.
+
+        Returns:
+            valid (np.ndarray[bool]): The boards where the move was performed.
+        """
+        flat, valid = self._to_flat(moves)
+        flat_matrices = self._flat_matrices()
+        idx = np.arange(self._batch_size)
+        valid &= flat_matrices[idx, flat] == self.EMPTY
+        if mask is not None:
+            valid &= np.asarray(mask, dtype=bool)
+        self._turns[valid] = self.next_turns(self._turns[valid])
+        flat_matrices[idx[valid], flat[valid]] = self._turns[valid]
+        if self._gravity:
+            self._column_heights[idx[valid], flat[valid] % self._cols] += 1
+        return valid
+
+    def random_moves(self, mask=None):
+        """
+        Sample uniformly one available move on each board of the batch.
+
+        Args:
+            mask (Iterable[bool]|None): The boards for which to sample.
+                If None, all boards are used.
+
+        Returns:
+            moves (np.ndarray): The sampled moves.
+                These are in the same format as in `do_moves()`.
+                Boards without available moves (or excluded by `mask`)
+                get `NO_MOVE`.
+        """
+        avail = self.avail_moves_mask().reshape(self._batch_size, -1)
+        keys = np.where(avail, self._rng.random(avail.shape), -1.0)
+        flat = np.argmax(keys, axis=1)
+        has_move = np.any(avail, axis=1)
+        if mask is not None:
+            has_move &= np.asarray(mask, dtype=bool)
+        if self._gravity:
+            return np.where(has_move, flat, self.NO_MOVE)
+        else:
+            return np.where(
+                has_move[:, None],
+                np.stack([flat // self._cols, flat % self._cols], axis=1),
+                self.NO_MOVE)
+
+    def winners(self, turn=None):
+        """
+        Compute the winner of each board of the batch.
+
+        Args:
+            turn (int|None): The player to check.
+                If None, all players are checked.
+
+        Returns:
+            result (np.ndarray): The winner of each board or `EMPTY`.
+        """
+        cells = self._flat_matrices()[:, self._windows]
+        result = np.full(self._batch_size, self.EMPTY, dtype=np.uint8)
+        for turn in (self.TURNS if turn is None else (turn,)):
+            won = np.any(np.all(cells == turn, axis=2), axis=1)
+            result[won & (result == self.EMPTY)] = turn
+        return result
+
+    def winning_moves(self, moves):
+        """
+        Check whether the last moves were winning.
+
+        This only checks the windows touching the last moved cells and
+        it is, therefore, much faster than `winners()`.
+
+        Args:
+            moves (Iterable): The last performed moves.
+                These are in the same format as in `do_moves()`.
+
+        Returns:
+            result (np.ndarray): The winner of each board or `EMPTY`.
+        """
+        moves = np.asarray(moves, dtype=np.intp)
+        idx = np.arange(self._batch_size)
+        if self._gravity:
+            rows = self._rows - self._column_heights[
+                idx, np.clip(moves, 0, self._cols - 1)]
+            flat = rows * self._cols + moves
+            valid = (moves >= 0) & (rows < self._rows)
+        else:
+            flat = moves[:, 0] * self._cols + moves[:, 1]
+            valid = moves[:, 0] >= 0
+        flat = np.where(valid, flat, 0)
+        flat_matrices = self._flat_matrices()
+        ws = self._cell_windows[flat]
+        cells = flat_matrices[idx[:, None, None], self._windows[ws]]
+        turns = flat_matrices[idx, flat]
+        won = np.any(
+            np.all(cells == turns[:, None, None], axis=2) & (ws >= 0), axis=1)
+        won &= valid & (turns != self.EMPTY)
+        return np.where(won, turns, self.EMPTY).astype(np.uint8)
+
+    def playouts(self):
+        """
+        Play random moves on all boards until each game is over.
+
+        Returns:
+            result (np.ndarray): The winner of each board or `EMPTY` (draw).
+        """
+        result = self.winners()
+        active = (result == self.EMPTY) & ~self.is_full()
+        while np.any(active):
+            moves = self.random_moves(active)
+            active &= self.do_moves(moves, active)
+            won = self.winning_moves(moves)
+            won[~active] = self.EMPTY
+            result = np.where(won != self.EMPTY, won, result)
+            active &= (won == self.EMPTY) & ~self.is_full()
+        return result
@@ -1,9 +1,72 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import functools
+
 import numpy as np
 
 NUM_DIGITS = 10
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+# ======================================================================
+@functools.lru_cache(maxsize=None)
+def line_windows(rows, cols, num_win):
+    """
+    Compute all the winning windows of a board shape.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        num_win (int): The number of aligned pieces required for winning.
+
+    Returns:
+        windows (np.ndarray): The flat cell indices of each window.
+            This has shape `(num_windows, num_win)` and the cells of each
+            window are ordered along its direction.
+    """
+    windows = []
+    for d_row, d_col in DIRECTIONS:
+        for i in range(rows):
+            for j in range(cols):
+                last_i = i + d_row * (num_win - 1)
+                last_j = j + d_col * (num_win - 1)
+                if 0 <= last_i < rows and 0 <= last_j < cols:
+                    windows.append([
+                        (i + d_row * k) * cols + (j + d_col * k)
+                        for k in range(num_win)])
+    windows = np.array(windows, dtype=np.intp).reshape(-1, num_win)
+    windows.setflags(write=False)
+    return windows
+
+
+# ======================================================================
+@functools.lru_cache(maxsize=None)
+def cell_windows(rows, cols, num_win):
+    """
+    Compute the winning windows touching each cell of a board shape.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        num_win (int): The number of aligned pieces required for winning.
+
+    Returns:
+        result (np.ndarray): The window indices for each flat cell index.
+            This has shape `(rows * cols, max_num_windows)` and it is
+            padded with `-1` where a cell has fewer windows.
+    """
+    windows = line_windows(rows, cols, num_win)
+    by_cell = [[] for _ in range(rows * cols)]
+    for w, window in enumerate(windows.tolist()):
+        for cell in window:
+            by_cell[cell].append(w)
+    size = max([len(x) for x in by_cell] + [1])
+    result = np.full((rows * cols, size), -1, dtype=np.intp)
+    for cell, ws in enumerate(by_cell):
+        result[cell, :len(ws)] = ws
+    result.setflags(write=False)
+    return result
 
 
 class Board:
@@ -25,13 +88,82 @@ class Board:
         self._reprs = reprs
         self._matrix = None
         self._turn = None
+        self._codes = None
+        self._score = None
+        self._threats = None
+        self._num_moves = None
         self._max_num_moves = rows * cols
+        from mnkgame.BoardEval import get_board_eval
+        self._eval = get_board_eval(rows, cols, num_win)
         self.reset()
 
+    @classmethod
+    def from_moves(cls, rows, cols, num_win, moves):
+        """
+        Create a board from a list of moves, in bulk.
+
+        The moves are not validated (e.g. against repetitions or the end of
+        the game), so this is meant for trusted move lists, e.g. from game
+        records.
+
+        Args:
+            rows (int): The number of rows.
+            cols (int): The number of columns.
+            num_win (int): The number of aligned pieces required for winning.
+            moves (Sequence): The moves, alternating the players.
+
+        Returns:
+            board (Board): The board after the moves.
+        """
+        board = cls(rows, cols, num_win)
+        board._set_moves(moves)
+        return board
+
+    def _set_moves(self, coords):
+        if len(coords) > 0:
+            rows, cols = np.asarray(coords, dtype=np.intp).T
+            for i, turn in enumerate(self.TURNS):
+                self._matrix[rows[i::2], cols[i::2]] = turn
+            self._turn = self.TURNS[(len(coords) - 1) % len(self.TURNS)]
+        self._sync_eval()
+
     def reset(self):
         self._matrix = np.full(
             (self._rows, self._cols), self.EMPTY, dtype=np.uint8)
         self._turn = self.TURNS[-1]
+        self._codes = np.zeros(len(self._eval.windows), dtype=np.int64)
+        self._score = 0
+        self._threats = np.zeros(len(self.TURNS) + 1, dtype=np.intp)
+        self._num_moves = 0
+
+    def set_matrix(self, matrix):
+        """
+        Set the position from a board matrix.
+
+        The player to move is inferred from the number of pieces.
+
+        Args:
+            matrix (Iterable): The board matrix, with `EMPTY` or `TURNS`.
+        """
+        self._matrix[:] = matrix
+        num_pieces = [np.sum(self._matrix == turn) for turn in self.TURNS]
+        self._turn = \
+            self.TURNS[0] if num_pieces[0] > num_pieces[1] else self.TURNS[1]
+        self._sync_eval()
+
+    def _sync_eval(self):
+        self._codes = self._eval.encode(self._matrix)
+        self._score = int(np.sum(self._eval.table[self._codes]))
+        self._threats = np.bincount(
+            self._eval.threat_table[self._codes], minlength=3)
+        self._num_moves = int(np.sum(self._matrix != self.EMPTY))
+
+    def _update_eval(self, coord, turn, sign=1):
+        d_score, d_threats = self._eval.update(
+            self._codes, coord[0] * self._cols + coord[1], turn, sign)
+        self._score += d_score
+        self._threats += d_threats
+        self._num_moves += sign
 
     @property
     def rows(self):
@@ -59,12 +191,16 @@ class Board:
 
     @property
     def _win_score(self):
-        return self.max_num_moves * self.max_num_moves * self._num_win
+        # : the smallest win score, larger than any static evaluation
+        return self._eval.max_score + 1
 
     @property
     def win_score(self):
-        # return (self.max_num_moves - self.num_moves()) * self._win_score
-        return np.inf
+        # : wins with fewer moves get larger scores
+        return self._win_score + self._max_num_moves - self._num_moves
+
+    def is_win_score(self, value):
+        return abs(value) >= self._win_score
 
     def __repr__(self):
         text = ''
@@ -123,7 +259,7 @@ class Board:
             - np.sum(self._matrix == self.TURNS[1])) in {0, 1}
 
     def is_full(self):
-        return not np.any(self._matrix == self.EMPTY)
+        return self._num_moves >= self._max_num_moves
 
     def is_valid_move(self, coord):
         return 0 <= coord[0] < self._rows and 0 <= coord[1] < self._cols
@@ -146,12 +282,14 @@ class Board:
         if coord in self.avail_moves():
             self._turn = self.next_turn()
             self._matrix[coord] = self._turn
+            self._update_eval(coord, self._turn)
             return True
         else:
             return False
 
     def undo_move(self, coord):
         if self.is_valid_move(coord) and self._matrix[coord] != self.EMPTY:
+            self._update_eval(coord, self._matrix[coord], -1)
             self._turn = self.prev_turn()
             self._matrix[coord] = self.EMPTY
             return True
@@ -170,10 +308,10 @@ class Board:
         return all(self.undo_move(coord) for coord in coords)
 
     def num_moves(self):
-        return int(np.sum(self._matrix != self.EMPTY))
+        return self._num_moves
 
     def num_moves_left(self):
-        return int(np.sum(self._matrix == self.EMPTY))
+        return self._max_num_moves - self._num_moves
 
     def winner(self, turn=None):
         if self.is_empty():
@@ -268,9 +406,56 @@ class Board:
                         result.append(((i, j), (i + num_win - 1, j)))
             return result
 
+    def _cell_to_move(self, cell):
+        return divmod(cell, self._cols)
+
+    def threat_moves(self, turn=None):
+        """
+        Find the available moves that would win the game.
+
+        Args:
+            turn (int|None): The player to check.
+                If None, the player who has to move next is used.
+
+        Returns:
+            moves (set): The winning moves for `turn`, if it were to move.
+        """
+        if turn is None:
+            turn = self.next_turn()
+        if self._threats[turn] == 0:
+            return set()
+        cells = self._eval.threat_cells(self._matrix, self._codes, turn)
+        return {
+            move for move in map(self._cell_to_move, cells)
+            if move is not None}
+
+    def threat_making_moves(self, turn=None):
+        """
+        Find the available moves that would create a new threat.
+
+        Args:
+            turn (int|None): The player to check.
+                If None, the player who has to move next is used.
+
+        Returns:
+            moves (set): The moves after which `turn` would be one move
+                short of winning.
+        """
+        if turn is None:
+            turn = self.next_turn()
+        cells = self._eval.threat_cells(
+            self._matrix, self._codes, turn, self._eval.pre_threat_table)
+        return {
+            move for move in map(self._cell_to_move, cells)
+            if move is not None}
+
+    def has_threats(self, turn=None):
+        if turn is None:
+            turn = self.next_turn()
+        return self._threats[turn] > 0
+
     def get_score(self):
-        return (self.max_num_moves - self.num_moves() - 1) \
-               * (1 if self._turn == self.TURNS[0] else -1)
+        return self._score * (1 if self._turn == self.TURNS[0] else -1)
 
     @staticmethod
     def extrema_to_moves(begin, end):
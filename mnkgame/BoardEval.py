@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import functools
+
+import numpy as np
+
+from mnkgame.Board import line_windows, cell_windows
+
+# largest `num_win` for which windows are encoded in base 3
+MAX_BASE3_NUM_WIN = 10
+# growth factor of the score with the number of pieces in a window
+PATTERN_BASE = 8
+# largest exponent of `PATTERN_BASE` used in the scores
+MAX_PATTERN_EXP = 9
+# score multiplier for windows whose extrema are both empty
+OPEN_FACTOR = 2
+
+
+class BoardEval:
+    """
+    Pattern-based static evaluation of (m,n,k)-game positions.
+
+    Each window of `num_win` aligned cells is encoded as an integer
+    (in base 3 from its cell contents, or from the number of pieces of each
+    player for large `num_win`) and scored through a precomputed lookup
+    table.
+    Only windows containing pieces of a single player contribute, with a
+    score that grows geometrically with the number of pieces (from 2 up to
+    `num_win`).
+    Since an open run is contained in more free windows than a closed one,
+    open runs are naturally valued more than closed runs.
+    Additionally, base-3 encoding allows to favor runs which are open on
+    both ends of the window.
+    """
+    EMPTY = 0
+    TURNS = (1, 2)
+
+    def __init__(self, rows, cols, num_win):
+        self.rows = rows
+        self.cols = cols
+        self.num_win = num_win
+        self.windows = line_windows(rows, cols, num_win)
+        self.is_base3 = num_win <= MAX_BASE3_NUM_WIN
+        self.digit_weights = np.zeros((3, num_win), dtype=np.int64)
+        if self.is_base3:
+            self.digit_weights[1, :] = 3 ** np.arange(num_win)
+            self.digit_weights[2, :] = 2 * 3 ** np.arange(num_win)
+            self.num_codes = 3 ** num_win
+        else:
+            self.digit_weights[1, :] = 1
+            self.digit_weights[2, :] = num_win + 1
+            self.num_codes = (num_win + 1) ** 2
+        self.counts, self.is_open = self._decode(np.arange(self.num_codes))
+        self.weights = self._weights(num_win)
+        self.table = self._make_table()
+        self.threat_table = self._make_lines_table(num_win - 1)
+        self.win_table = self._make_lines_table(num_win)
+        self.pre_threat_table = self._make_lines_table(num_win - 2)
+        self.max_score = len(self.windows) * int(np.max(np.abs(self.table)))
+        self.cell_windows, self.cell_deltas = self._make_cell_deltas()
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return get_board_eval, (self.rows, self.cols, self.num_win)
+
+    def _decode(self, codes):
+        num_win = self.num_win
+        counts = np.zeros((len(self.TURNS), len(codes)), dtype=np.intp)
+        is_open = np.zeros(len(codes), dtype=bool)
+        if self.is_base3:
+            digits = (codes[:, None] // 3 ** np.arange(num_win)) % 3
+            for i, turn in enumerate(self.TURNS):
+                counts[i] = np.sum(digits == turn, axis=1)
+            is_open = \
+                (digits[:, 0] == self.EMPTY) & (digits[:, -1] == self.EMPTY)
+        else:
+            counts[0] = codes % (num_win + 1)
+            counts[1] = codes // (num_win + 1)
+        return counts, is_open
+
+    @staticmethod
+    def _weights(num_win):
+        num_pieces = np.arange(num_win + 1)
+        if num_win - 1 > MAX_PATTERN_EXP:
+            exps = (num_pieces - 1) * MAX_PATTERN_EXP // (num_win - 1)
+        else:
+            exps = num_pieces - 1
+        weights = PATTERN_BASE ** np.maximum(exps, 0)
+        weights[num_pieces < 2] = 0
+        return weights.astype(np.int64)
+
+    def _make_table(self):
+        counts = self.counts
+        table = np.zeros(self.num_codes, dtype=np.int64)
+        valid = np.sum(counts, axis=0) <= self.num_win
+        for i, sign in enumerate((1, -1)):
+            mask = valid & (counts[i] > 0) & (counts[1 - i] == 0)
+            table[mask] = sign * self.weights[counts[i, mask]]
+        table[self.is_open] *= OPEN_FACTOR
+        table.setflags(write=False)
+        return table
+
+    def _make_lines_table(self, num_pieces):
+        table = np.full(self.num_codes, self.EMPTY, dtype=np.uint8)
+        valid = np.sum(self.counts, axis=0) <= self.num_win
+        for i, turn in enumerate(self.TURNS if num_pieces > 0 else ()):
+            mask = valid \
+                   & (self.counts[i] == num_pieces) \
+                   & (self.counts[1 - i] == 0)
+            table[mask] = turn
+        table.setflags(write=False)
+        return table
+
+    def _make_cell_deltas(self):
+        padded = cell_windows(self.rows, self.cols, self.num_win)
+        windows = []
+        deltas = [[] for _ in range(len(self.TURNS) + 1)]
+        for cell, ws in enumerate(padded):
+            ws = ws[ws >= 0]
+            positions = np.argmax(self.windows[ws] == cell, axis=1)
+            windows.append(ws)
+            for turn in (self.EMPTY,) + self.TURNS:
+                deltas[turn].append(self.digit_weights[turn, positions])
+        return windows, deltas
+
+    def encode(self, matrix):
+        """
+        Encode all the windows of a board.
+
+        Args:
+            matrix (np.ndarray): The board matrix.
+
+        Returns:
+            codes (np.ndarray): The code of each window.
+        """
+        cells = matrix.ravel()[self.windows]
+        return np.sum(
+            self.digit_weights[cells, np.arange(self.num_win)], axis=1)
+
+    def evaluate(self, matrix):
+        """
+        Evaluate a board.
+
+        Args:
+            matrix (np.ndarray): The board matrix.
+
+        Returns:
+            score (int): The score from the point of view of `TURNS[0]`.
+        """
+        return int(np.sum(self.table[self.encode(matrix)]))
+
+    def update(self, codes, cell, turn, sign=1):
+        """
+        Update the window codes after a piece is placed or removed.
+
+        Args:
+            codes (np.ndarray): The window codes, updated in-place.
+            cell (int): The flat index of the modified cell.
+            turn (int): The player whose piece is placed or removed.
+            sign (int): Either `1` (piece placed) or `-1` (piece removed).
+
+        Returns:
+            result (tuple): The changes, given by:
+             - d_score (int): The score change from the point of view of
+               `TURNS[0]`.
+             - d_threats (np.ndarray): The change in the number of windows
+               that are one piece short of winning, for each player.
+        """
+        ws = self.cell_windows[cell]
+        old_codes = codes[ws]
+        new_codes = old_codes + sign * self.cell_deltas[turn][cell]
+        codes[ws] = new_codes
+        d_score = \
+            int(np.sum(self.table[new_codes]) - np.sum(self.table[old_codes]))
+        d_threats = \
+            np.bincount(self.threat_table[new_codes], minlength=3) \
+            - np.bincount(self.threat_table[old_codes], minlength=3)
+        return d_score, d_threats
+
+    def threat_cells(self, matrix, codes, turn, table=None):
+        """
+        Find the cells that would complete a winning window.
+
+        Args:
+            matrix (np.ndarray): The board matrix.
+            codes (np.ndarray): The window codes.
+            turn (int): The player to check.
+            table (np.ndarray|None): The table of the windows to consider.
+                If None, `threat_table` is used, i.e. the windows that are
+                one piece short of winning.
+
+        Returns:
+            cells (set[int]): The flat indices of the empty cells.
+        """
+        if table is None:
+            table = self.threat_table
+        windows = self.windows[table[codes] == turn]
+        return set(windows[matrix.ravel()[windows] == self.EMPTY].tolist())
+
+
+# ======================================================================
+@functools.lru_cache(maxsize=None)
+def get_board_eval(rows, cols, num_win):
+    return BoardEval(rows, cols, num_win)
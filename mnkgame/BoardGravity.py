@@ -21,6 +21,19 @@ class BoardGravity(Board):
         super(BoardGravity, self).reset()
         self._column_heights = [0] * self._cols
 
+    def _set_moves(self, cols):
+        coords = []
+        for col in cols:
+            coords.append(
+                (self._rows - self._column_heights[col] - 1, col))
+            self._column_heights[col] += 1
+        Board._set_moves(self, coords)
+
+    def set_matrix(self, matrix):
+        Board.set_matrix(self, matrix)
+        self._column_heights = \
+            np.sum(self._matrix != self.EMPTY, axis=0).tolist()
+
     def is_valid(self):
         result = True
         for j in list(self.avail_moves()):
@@ -55,6 +68,7 @@ class BoardGravity(Board):
             self._turn = self.next_turn()
             row = self._rows - self._column_heights[col] - 1
             self._matrix[row, col] = self.turn
+            self._update_eval((row, col), self._turn)
             self._column_heights[col] += 1
             return True
         else:
@@ -64,12 +78,20 @@ class BoardGravity(Board):
         if self.is_valid_move(col) and self._matrix[-1, col] != self.EMPTY:
             self._turn = self.prev_turn()
             row = self._rows - self._column_heights[col]
+            self._update_eval((row, col), self._matrix[row, col], -1)
             self._matrix[row, col] = self.EMPTY
             self._column_heights[col] -= 1
             return True
         else:
             return False
 
+    def _cell_to_move(self, cell):
+        row, col = divmod(cell, self._cols)
+        if row == self._rows - self._column_heights[col] - 1:
+            return col
+        else:
+            return None
+
     def winning_move(self, col):
         rows, cols, num_win, matrix = \
             self._rows, self._cols, self._num_win, self._matrix
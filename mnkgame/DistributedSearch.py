@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import ast  # Abstract Syntax Trees
+import collections
+import itertools
+import multiprocessing
+import os
+import queue
+import secrets
+import socket
+import statistics
+import threading
+import time
+from multiprocessing.managers import BaseManager, DictProxy
+
+from mnkgame.GameAiSearchTree import GameAiSearchTree, _move_score_key
+from mnkgame.util import make_board
+
+# the number of random bytes of the generated authentication keys
+AUTHKEY_SIZE = 16
+# the interval of the worker heartbeats in sec
+HEARTBEAT_INTERVAL = 0.5
+# the workers without heartbeats for this long are considered failed
+HEARTBEAT_TIMEOUT = 3.0
+# the tasks running longer than this multiple of the median are reassigned
+SLOW_FACTOR = 4.0
+# the minimum running time before a task can be considered slow in sec
+MIN_SLOW_DURATION = 1.0
+# the maximum number of attempts per task
+MAX_ATTEMPTS = 3
+# the polling interval of the queues in sec
+POLL_INTERVAL = 0.1
+
+# the shared objects (in the manager process of the coordinator)
+_TASKS = queue.Queue()
+_RESULTS = queue.Queue()
+_STATE = {}
+# the AI instances of the worker (kept to reuse their tables)
+_AIS = {}
+
+
+class _Manager(BaseManager):
+    pass
+
+
+def _get_tasks():
+    return _TASKS
+
+
+def _get_results():
+    return _RESULTS
+
+
+def _get_state():
+    return _STATE
+
+
+_Manager.register('get_tasks', callable=_get_tasks)
+_Manager.register('get_results', callable=_get_results)
+_Manager.register('get_state', callable=_get_state, proxytype=DictProxy)
+
+
+# ======================================================================
+def _parse_address(text):
+    host, _, port = text.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def _run_task(task):
+    shape = task['shape']
+    key = tuple(sorted(shape.items()))
+    if key not in _AIS:
+        _AIS[key] = GameAiSearchTree()
+    board = make_board(**shape)
+    board.set_matrix(task['matrix'])
+    (result,) = _AIS[key].get_move_scores(
+        board, task['max_duration'], task['method'],
+        max_depth=task['depth'], moves=[task['move']])
+    return result
+
+
+def run_worker(address, authkey, worker_id=None):
+    """
+    Run a worker node until the coordinator quits.
+
+    The worker takes the tasks of the coordinator (scoring a root move to
+    a given depth), sending heartbeats in the meantime, and keeps an AI
+    per board shape, so that its tables are reused by the next depths.
+
+    Args:
+        address (tuple): The host and port of the coordinator.
+        authkey (bytes): The authentication key of the coordinator.
+        worker_id (str|None): The worker id.
+            If None, the host name and the process id are used.
+
+    Returns:
+        None.
+    """
+    if worker_id is None:
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    manager = _Manager(address, authkey)
+    manager.connect()
+    tasks = manager.get_tasks()
+    results = manager.get_results()
+    state = manager.get_state()
+    stop = threading.Event()
+
+    def heartbeat():
+        # : a proxy per thread
+        heartbeat_results = manager.get_results()
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                heartbeat_results.put(('alive', None, worker_id, None))
+            except (EOFError, OSError):
+                break
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        while True:
+            try:
+                task = tasks.get(timeout=POLL_INTERVAL * 10)
+            except queue.Empty:
+                continue
+            if task is None:
+                break
+            if task['search_id'] != state.get('search_id'):
+                # : the search is over
+                continue
+            results.put(('started', task['id'], worker_id, None))
+            results.put(('result', task['id'], worker_id, _run_task(task)))
+    except (EOFError, OSError):
+        # : the coordinator is gone
+        pass
+    finally:
+        stop.set()
+        thread.join()
+
+
+# ======================================================================
+class DistributedSearch(object):
+    """
+    Coordinator of a search distributed over worker nodes.
+
+    The search uses iterative deepening: at each depth, each root move
+    is a task, which is scored (exactly, up to the depth) by one of the
+    workers (see `run_worker()`), started separately, e.g. on other
+    machines, or locally (see `spawn_workers()`).
+    The workers connect to the coordinator, which serves the task and
+    result queues with `multiprocessing.managers`.
+
+    The tasks of failed workers (without heartbeats) are reassigned, and
+    so are the tasks lost in the queue.
+    When some workers are idle, the tasks running much longer than the
+    others get a backup attempt (the first result of a task is used).
+
+    Args:
+        address (tuple): The host and port (0 for any free port).
+            Workers on other machines need a reachable host.
+        authkey (bytes|None): The authentication key for the workers.
+            If None, a random key is generated (see `authkey`), as the
+            workers and the coordinator unpickle what their peers send.
+
+    Examples:
+        >>> with DistributedSearch() as search:
+        ...     workers = search.spawn_workers(2)
+        ...     board = make_board(3, 3, 3, False)
+        ...     _ = board.do_moves([(0, 0), (1, 1), (0, 1)])
+        ...     search.get_best_move(board, 10.0)
+        (0, 2)
+    """
+
+    def __init__(self, address=('127.0.0.1', 0), authkey=None):
+        if authkey is None:
+            # : printable, so that it can be given to the remote workers
+            authkey = secrets.token_hex(AUTHKEY_SIZE).encode()
+        self.authkey = authkey
+        self._manager = _Manager(address, authkey)
+        self._manager.start()
+        self._tasks = self._manager.get_tasks()
+        self._results = self._manager.get_results()
+        self._state = self._manager.get_state()
+        self._ids = itertools.count()
+        self._workers = []
+        self.last_seen = {}
+        self.counts = collections.Counter()
+
+    @property
+    def address(self):
+        return self._manager.address
+
+    def spawn_workers(self, num_workers=None):
+        """
+        Start worker processes on this machine.
+
+        Args:
+            num_workers (int|None): The number of workers.
+                If None, the number of CPUs is used.
+
+        Returns:
+            workers (list[Process]): The worker processes.
+        """
+        workers = [
+            multiprocessing.Process(
+                target=run_worker, args=(self.address, self.authkey),
+                daemon=True)
+            for _ in range(num_workers or os.cpu_count())]
+        for worker in workers:
+            worker.start()
+        self._workers.extend(workers)
+        return workers
+
+    def close(self):
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join(HEARTBEAT_TIMEOUT)
+            if worker.is_alive():
+                worker.terminate()
+        self._manager.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def _put(self, record, records):
+        task_id = next(self._ids)
+        records[task_id] = record
+        record['attempts'] += 1
+        record['queued'] = time.time()
+        self._tasks.put(dict(record['task'], id=task_id))
+
+    def _reassign(self, record, records, reason, verbose):
+        self.counts[reason] += 1
+        if verbose:
+            print(f'Reassigned: {record["task"]["move"]} ({reason})')
+        self._put(record, records)
+
+    def _run_depth(self, tasks, deadline, verbose=False):
+        # : each attempt of a task has an id, all sharing the task record
+        records = {}
+        for task in tasks:
+            self._put(
+                dict(task=task, result=None, attempts=0, running={}),
+                records)
+        todo = list({id(x): x for x in records.values()}.values())
+        durations = []
+        while any(record['result'] is None for record in todo):
+            if time.time() > deadline:
+                break
+            try:
+                kind, task_id, worker_id, result = \
+                    self._results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                kind = None
+            now = time.time()
+            if kind is not None:
+                self.last_seen[worker_id] = now
+            if kind == 'started' and task_id in records:
+                records[task_id]['running'][task_id] = worker_id, now
+            elif kind == 'result' and task_id in records:
+                record = records[task_id]
+                begin_time = record['running'].pop(task_id, (None, now))[1]
+                if record['result'] is None:
+                    record['result'] = result
+                    durations.append(now - begin_time)
+                    self.counts['results'] += 1
+            num_alive = sum(
+                now - last_seen <= HEARTBEAT_TIMEOUT
+                for last_seen in self.last_seen.values())
+            num_running = sum(len(record['running']) for record in todo)
+            # : backup attempts only when some workers are idle
+            is_idle = self._tasks.qsize() == 0 and num_running < num_alive
+            max_duration = max(
+                SLOW_FACTOR * statistics.median(durations)
+                if durations else 0.0, MIN_SLOW_DURATION)
+            for record in todo:
+                if record['result'] is not None \
+                        or record['attempts'] >= MAX_ATTEMPTS:
+                    continue
+                running = record['running']
+                for task_id, (worker_id, _) in list(running.items()):
+                    if now - self.last_seen[worker_id] > HEARTBEAT_TIMEOUT:
+                        del running[task_id]
+                        self._reassign(record, records, 'failed', verbose)
+                if not running:
+                    # : e.g. taken from the queue by a failed worker
+                    if is_idle and now - record['queued'] > HEARTBEAT_TIMEOUT:
+                        self._reassign(record, records, 'lost', verbose)
+                elif is_idle and len(running) == 1 and all(
+                        now - begin_time > max_duration
+                        for _, begin_time in running.values()):
+                    self._reassign(record, records, 'slow', verbose)
+                    is_idle = False
+        return [
+            record['result'] for record in todo
+            if record['result'] is not None]
+
+    def get_move_scores(
+            self,
+            game,
+            max_duration=10.0,
+            method='negamax_alphabeta_hashing',
+            max_depth=None,
+            verbose=False):
+        """
+        Score every root move with distributed iterative deepening.
+
+        Args:
+            game (Board): The current position.
+            max_duration (float): The maximum search duration in sec.
+            method (str): The search function.
+            max_depth (int|None): The maximum search depth.
+                If None or 0, the search continues until the end of the
+                game or until the time is over.
+            verbose (bool): Print the results of each iteration.
+
+        Returns:
+            result (list[tuple]): The scored moves, best first, as in
+                `GameAiSearchTree.get_move_scores()`, from the last
+                depth completed (the first depth may be partial).
+        """
+        clock = time.time()
+        deadline = clock + max_duration
+        search_id = next(self._ids)
+        self._state['search_id'] = search_id
+        shape = dict(
+            rows=game.rows, cols=game.cols, num_win=game.num_win,
+            gravity=hasattr(game, 'has_gravity'))
+        matrix = game.matrix.tolist()
+        moves = game.sorted_moves()
+        max_depth = min(
+            max_depth or game.num_moves_left(), game.num_moves_left())
+        scores = {move: (move, None, False, 0, [move]) for move in moves}
+        try:
+            for depth in range(1, max_depth + 1):
+                depth_clock = time.time()
+                tasks = [
+                    dict(search_id=search_id, shape=shape, matrix=matrix,
+                         move=move, depth=depth, method=method,
+                         max_duration=deadline - time.time())
+                    for move in moves]
+                results = self._run_depth(tasks, deadline, verbose)
+                is_complete = len(results) == len(tasks) and all(
+                    result[3] == depth for result in results)
+                if not is_complete and depth > 1:
+                    # : the scores of an interrupted depth are not ranked
+                    # against the (deeper) scores of the others
+                    break
+                for result in results:
+                    if result[3] >= scores[result[0]][3]:
+                        scores[result[0]] = result
+                moves = [
+                    result[0] for result in
+                    sorted(scores.values(), key=_move_score_key)]
+                if verbose:
+                    best = scores[moves[0]]
+                    print(f'Time: {time.time() - depth_clock:.3f}, '
+                          f'Depth: {depth}, Best: {best[1]}, '
+                          f'Move: {best[0]}, Tasks: {len(results)}')
+                if not is_complete or time.time() > deadline:
+                    break
+                if game.is_win_score(scores[moves[0]][1] or 0):
+                    break
+        finally:
+            # : the queued tasks are dropped by the workers
+            self._state['search_id'] = None
+        return sorted(scores.values(), key=_move_score_key)
+
+    def get_best_move(self, game, max_duration=10.0, **_kws):
+        """Get the best move (see `get_move_scores()`)."""
+        return self.get_move_scores(game, max_duration, **_kws)[0][0]
+
+
+# ======================================================================
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Distributed search over worker nodes.')
+    arg_parser.add_argument(
+        'mode', choices=('search', 'worker'),
+        help='run the coordinator (and search) or a worker node')
+    arg_parser.add_argument(
+        '-A', '--address', metavar='HOST:PORT',
+        type=str, default='127.0.0.1:0',
+        help='address of the coordinator [%(default)s]')
+    arg_parser.add_argument(
+        '-K', '--authkey', metavar='KEY',
+        type=str, default=None,
+        help='authentication key of the coordinator (required by the '
+             'workers, random for the search if omitted) [%(default)s]')
+    arg_parser.add_argument(
+        '-s', '--shape', metavar=('M', 'N', 'K'),
+        type=int, nargs=3, default=(3, 3, 3),
+        help='board rows, cols and number to win [%(default)s]')
+    arg_parser.add_argument(
+        '-g', '--gravity',
+        action='store_true',
+        help='use gravitataion-rule variant [%(default)s]')
+    arg_parser.add_argument(
+        '-p', '--position', metavar='MOVES',
+        type=str, default='[]',
+        help='moves played, e.g. `[(1, 1), (0, 0)]` [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--max_duration', metavar='X',
+        type=float, default=10.0,
+        help='search duration in sec [%(default)s]')
+    arg_parser.add_argument(
+        '-l', '--local', metavar='N',
+        type=int, default=0,
+        help='number of local worker processes to start [%(default)s]')
+    args = arg_parser.parse_args()
+    address = _parse_address(args.address)
+    authkey = args.authkey.encode() if args.authkey else None
+    if args.mode == 'worker':
+        if authkey is None:
+            arg_parser.error('the worker mode requires -K/--authkey')
+        run_worker(address, authkey)
+        return
+    board = make_board(*args.shape, args.gravity)
+    board.do_moves([
+        tuple(move) if isinstance(move, list) else move
+        for move in ast.literal_eval(args.position)])
+    with DistributedSearch(address, authkey) as search:
+        print('Coordinator: {}:{}'.format(*search.address))
+        print(f'Key: {search.authkey.decode()}')
+        if args.local:
+            search.spawn_workers(args.local)
+        results = search.get_move_scores(
+            board, args.max_duration, verbose=True)
+        for move, val, is_exact, depth, pv in results:
+            print(f'{move}: {val} ({"exact" if is_exact else "bound"}, '
+                  f'depth {depth}) PV: {pv}')
+        print('Reassigned: ' + ', '.join(
+            f'{search.counts[reason]} ({reason})'
+            for reason in ('failed', 'lost', 'slow')))
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
@@ -7,3 +7,16 @@ class GameAi(object):
 
     def get_best_move(self, board):
         raise NotImplementedError
+
+    def iter_best_moves(self, board, *_args, **_kws):
+        """
+        Search the best moves, yielding improving results.
+
+        AIs without incremental results yield only their final result.
+
+        Yields:
+            result (tuple): The depth, score, principal variation and
+                statistics (or None) of the search.
+        """
+        move = self.get_best_move(board, *_args, **_kws)
+        yield 0, None, [move], getattr(self, 'stats', None)
@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import math
 import random
+import time
 
 import numpy as np
 
 from mnkgame.GameAi import GameAi
+from mnkgame.BatchBoard import BatchBoard
+from mnkgame.SearchStats import SearchStats
 
 random.seed()
 np.random.seed()
@@ -14,6 +18,7 @@ np.random.seed()
 class GameAiRandom(GameAi):
     def __init__(self, *_args, **_kws):
         GameAi.__init__(self, *_args, **_kws)
+        self.stats = None
 
     def get_best_move(
             self,
@@ -22,9 +27,17 @@ class GameAiRandom(GameAi):
             method='more',
             verbose=True,
             callback=None,
+            batch_size=256,
+            max_nodes=None,
+            seed=None,
             *_args,
             **_kws):
-        if method == 'more':
+        self.stats = SearchStats(method, max_nodes)
+        if method == 'playouts':
+            choices, scores = self.get_playout_scores(
+                board, max_duration, batch_size, max_nodes, seed)
+            choice = choices[0]
+        elif method == 'more':
             choices = list(board.avail_moves())
             i = random.randint(0, len(choices) - 1)
             choice = choices[i]
@@ -41,6 +54,59 @@ class GameAiRandom(GameAi):
             feedback = ', '.join([
                 f'Method: {method}', f'Best: {choice}', f'Move(s): {choices}'])
             print(feedback)
+        self.stats.add_iteration(0, None, [choice], 0.0)
+        self.stats.stop()
         if callable(callback):
-            callback(**vars())
+            callback(self.stats)
         return choice
+
+    @staticmethod
+    def get_playout_scores(
+            board,
+            max_duration=0.1,
+            batch_size=256,
+            max_nodes=None,
+            seed=None):
+        """
+        Score the moves with random playouts.
+
+        Args:
+            board (Board): The current position.
+            max_duration (float|None): The maximum duration in sec.
+                If None, the duration is not limited.
+            batch_size (int): The number of playouts per batch.
+            max_nodes (int|None): The maximum number of playouts.
+                At least one batch per move is always played.
+            seed (int|None): The seed of the random number generator.
+                With a seed and without time limit, the result is
+                reproducible.
+
+        Returns:
+            result (tuple): The moves (best first) and their scores.
+        """
+        if max_duration is None:
+            max_duration = math.inf
+        if max_nodes is None:
+            max_nodes = math.inf
+        rng = np.random.default_rng(seed)
+        clock = time.time()
+        moves = board.sorted_moves()
+        scores = np.zeros(len(moves))
+        num_playouts = 0
+        while num_playouts == 0 or (
+                time.time() - clock < max_duration
+                and (num_playouts + batch_size) * len(moves) <= max_nodes):
+            for i, move in enumerate(moves):
+                board.do_move(move)
+                if board.winning_move(move) == board.turn:
+                    scores[i] += batch_size
+                else:
+                    batch = BatchBoard.from_board(board, batch_size, rng)
+                    winners = batch.playouts()
+                    scores[i] += \
+                        np.sum(winners == board.turn) \
+                        - np.sum(winners == board.next_turn())
+                board.undo_move(move)
+            num_playouts += batch_size
+        order = np.argsort(-scores, kind='stable')
+        return [moves[i] for i in order], scores[order] / num_playouts
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import inspect
+import math
 import random
 import time
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from mnkgame.GameAi import GameAi
+from mnkgame.SearchStats import SearchStats
 from mnkgame import do_nothing_decorator
 
 # Numba import
@@ -20,25 +23,202 @@ HASH_FLAG_LOWER = -1
 HASH_FLAG_UPPER = 1
 HASH_FLAG_EXACT = 0
 
+# maximum number of nodes of each quiescence search
+MAX_QUIESCENCE_NODES = 16
+
+# larger than any score (including win scores)
+SCORE_INF = 2 ** 62
+
+# maximum number of entries of the persistent caches
+MAX_CACHE_SIZE = 2 ** 20
+
+
+class StopSearch(Exception):
+    """Raised when the search must be stopped (e.g. on timeout)."""
+
+
+def forced_moves(game):
+    """
+    Compute the forced moves of a position.
+
+    Args:
+        game (Board): The current position.
+
+    Returns:
+        moves (list|None): The forced moves.
+            This is a winning move, if the player to move has any,
+            otherwise a blocking move, if the opponent threatens to win.
+            If the opponent has more than one threat, the game is lost and
+            blocking any of them is as good as any other move.
+            If there are no forced moves, None is returned.
+    """
+    for turn in (game.next_turn(), game.turn):
+        if game.has_threats(turn):
+            moves = game.threat_moves(turn)
+            if moves:
+                return [min(moves)]
+    return None
+
+
+def get_moves(game):
+    return forced_moves(game) or game.sorted_moves()
+
+
+def quiescence(
+        game,
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
+        max_nodes=MAX_QUIESCENCE_NODES,
+        stats=None,
+        _nodes=None):
+    """
+    Evaluate a leaf position by extending the forcing moves only.
+
+    This mitigates the horizon effect by resolving pending wins, forced
+    blocks and threats before using the static evaluation.
+
+    Args:
+        game (Board): The current position.
+        alpha (int): The lower bound.
+        beta (int): The upper bound.
+        max_nodes (int): The maximum number of nodes to search.
+        stats (SearchStats|None): The search statistics collector.
+        _nodes (list[int]|None): The number of remaining nodes (internal).
+
+    Returns:
+        value (int): The value from the point of view of the player who has
+            to move.
+    """
+    if _nodes is None:
+        _nodes = [max_nodes]
+    if stats is not None:
+        stats.quiescence_nodes += 1
+    if game.is_full():
+        return 0
+    stand_pat = -game.get_score()
+    moves = forced_moves(game)
+    if moves is None:
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+        best_value = stand_pat
+        moves = sorted(game.threat_making_moves())
+    else:
+        best_value = -game.win_score
+    for i, move in enumerate(moves):
+        if _nodes[0] <= 0:
+            # : node limit reached before exploring a forced move
+            if i == 0:
+                best_value = stand_pat
+            break
+        _nodes[0] -= 1
+        game.do_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -quiescence(
+                    game, -beta, -alpha, max_nodes, stats, _nodes)
+        finally:
+            game.undo_move(move)
+        if value > best_value:
+            best_value = value
+        if best_value > alpha:
+            alpha = best_value
+        if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
+            break
+    return best_value
+
+
+def tactical_move(game):
+    """
+    Find the best move of a position by means of simple tactics.
+
+    Args:
+        game (Board): The current position.
+
+    Returns:
+        move (Any|None): The move, if any.
+            This is either: a winning move, a (forced) blocking move,
+            or a move creating a double threat which cannot be blocked.
+    """
+    moves = forced_moves(game)
+    if moves:
+        return moves[0]
+    turn = game.next_turn()
+    for move in game.sorted_moves():
+        game.do_move(move)
+        is_double_threat = \
+            len(game.threat_moves(turn)) > 1 \
+            and not game.threat_moves(game.next_turn())
+        game.undo_move(move)
+        if is_double_threat:
+            return move
+    return None
+
+
+def principal_variation(game, move, hash_=None, max_length=None):
+    """
+    Compute the principal variation starting with a move.
+
+    The continuation is obtained by following the best moves stored in the
+    hash table (if any).
+
+    Args:
+        game (Board): The current position.
+        move (Any): The first move.
+        hash_ (dict|None): The hash table.
+        max_length (int|None): The maximum length of the variation.
+
+    Returns:
+        pv (list): The moves of the principal variation.
+    """
+    pv = []
+    try:
+        while move is not None and game.do_move(move):
+            pv.append(move)
+            if game.winning_move(move) == game.turn or game.is_full() \
+                    or not hash_ or max_length and len(pv) >= max_length:
+                break
+            entry = hash_.get(repr(game))
+            move = entry[3] if entry is not None else None
+    finally:
+        game.undo_moves(pv[::-1])
+    return pv
+
 
 def negamax(
         game,
         depth,
-        max_duration=10.0):
+        max_duration=10.0,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0:
-        return np.nan
-    elif depth == 0 or game.is_full():
-        return -game.get_score()
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
+    if game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        else:
-            value = -negamax(
-                game, depth - 1, max_duration - (time.time() - clock))
-        game.undo_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -negamax(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         if value > best_value:
             best_value = value
@@ -49,24 +229,35 @@ def negamax_alphabeta(
         game,
         depth,
         max_duration=10.0,
-        alpha=-np.inf,
-        beta=np.inf,
-        soft=True):
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
+        soft=True,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0.0:
-        return np.nan
-    elif depth == 0 or game.is_full():
-        return -game.get_score()
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
+    if game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, alpha, beta, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        else:
-            value = -negamax_alphabeta(
-                game, depth - 1, max_duration - (time.time() - clock),
-                -beta if soft else alpha, -alpha if soft else beta, soft)
-        game.undo_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -negamax_alphabeta(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    -beta if soft else alpha, -alpha if soft else beta, soft,
+                    stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         # alpha = max(best_value, alpha)
         if value > best_value:
@@ -74,6 +265,8 @@ def negamax_alphabeta(
         if best_value > alpha:
             alpha = best_value
         if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
             break
     return best_value
 
@@ -82,32 +275,47 @@ def negamax_alphabeta_caching(
         game,
         depth,
         max_duration=10.0,
-        alpha=-np.inf,
-        beta=np.inf,
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
         soft=True,
-        cache=None):
+        cache=None,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0.0:
-        return np.nan
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
     key = repr(game)
-    if cache is not None and key in cache:
-        return -game.win_score
+    if cache is not None:
+        is_hit = key in cache
+        if stats is not None:
+            stats.add_cache_probe(is_hit)
+        if is_hit:
+            return -game.win_score
     if game.winner(game.turn) == game.turn:
-        if cache:
-            cache.add(repr(game))
+        if cache is not None:
+            cache.add(key)
         return -game.win_score
-    elif depth == 0 or game.is_full():
-        return -game.get_score()
+    elif game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, alpha, beta, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        else:
-            value = -negamax_alphabeta_caching(
-                game, depth - 1, max_duration - (time.time() - clock),
-                -beta if soft else alpha, -alpha if soft else beta, soft, cache)
-        game.undo_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -negamax_alphabeta_caching(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    -beta if soft else alpha, -alpha if soft else beta,
+                    soft, cache, stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         # alpha = max(best_value, alpha)
         if value > best_value:
@@ -115,6 +323,8 @@ def negamax_alphabeta_caching(
         if best_value > alpha:
             alpha = best_value
         if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
             break
     return best_value
 
@@ -123,38 +333,48 @@ def negascout(
         game,
         depth,
         max_duration=10.0,
-        alpha=-np.inf,
-        beta=np.inf,
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
         soft=True,
-        window=3):
+        window=3,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0.0:
-        depth = 0
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
     if game.winner(game.turn) == game.turn:
         return -game.win_score
-    if depth == 0 or game.is_full():
-        return game.get_score()
+    if game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, alpha, beta, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        elif window > 0:
-            value = -negascout(
-                game, depth - 1, max_duration - (time.time() - clock),
-                -beta if soft else alpha, -alpha if soft else beta,
-                soft, window - 1)
-        else:
-            value = -negascout(
-                game, depth - 1, max_duration - (time.time() - clock),
-                (-alpha - 1) if soft else alpha, -alpha if soft else beta,
-                soft, window - 1)
-            if alpha < value < beta:
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            elif window > 0:
                 value = -negascout(
                     game, depth - 1, max_duration - (time.time() - clock),
                     -beta if soft else alpha, -alpha if soft else beta,
-                    soft, window - 1)
-        game.undo_move(move)
+                    soft, window - 1, stats=stats, stop=stop)
+            else:
+                value = -negascout(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    (-alpha - 1) if soft else alpha, -alpha if soft else beta,
+                    soft, window - 1, stats=stats, stop=stop)
+                if alpha < value < beta:
+                    value = -negascout(
+                        game, depth - 1, max_duration - (time.time() - clock),
+                        -beta if soft else alpha, -alpha if soft else beta,
+                        soft, window - 1, stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         # alpha = max(best_value, alpha)
         if value > best_value:
@@ -162,6 +382,8 @@ def negascout(
         if best_value > alpha:
             alpha = best_value
         if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
             break
     return best_value
 
@@ -170,19 +392,29 @@ def negamax_alphabeta_hashing(
         game,
         depth,
         max_duration=10.0,
-        alpha=-np.inf,
-        beta=np.inf,
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
         soft=True,
-        hash_=None):
+        hash_=None,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0:
-        return np.nan
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
     alpha_zero = alpha
     if hash_ is not None:
         key = repr(game)
-        if key in hash_:
-            hash_value, hash_flag, hash_depth = hash_[key]
-            if hash_depth > depth:
+        entry = hash_.get(key)
+        if stats is not None:
+            stats.add_cache_probe(
+                entry is not None and entry[2] >= depth)
+        if entry is not None:
+            hash_value, hash_flag, hash_depth, _ = entry
+            if hash_depth >= depth:
                 if hash_flag == HASH_FLAG_EXACT:
                     return hash_value
                 elif hash_flag == HASH_FLAG_LOWER and hash_value > alpha:
@@ -191,26 +423,34 @@ def negamax_alphabeta_hashing(
                     beta = hash_value
                 if alpha >= beta:
                     return hash_value
-    if depth == 0 or game.is_full():
-        return game.get_score()
+    if game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, alpha, beta, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    best_move = None
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        else:
-            value = -negamax_alphabeta_hashing(
-                game, depth - 1, max_duration - (time.time() - clock),
-                -beta if soft else alpha, -alpha if soft else beta,
-                soft, hash_)
-        game.undo_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -negamax_alphabeta_hashing(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    -beta if soft else alpha, -alpha if soft else beta,
+                    soft, hash_, stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         # alpha = max(best_value, alpha)
         if value > best_value:
             best_value = value
+            best_move = move
         if best_value > alpha:
             alpha = best_value
         if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
             break
     if hash_ is not None:
         if best_value <= alpha_zero:
@@ -219,7 +459,7 @@ def negamax_alphabeta_hashing(
             hash_flag = HASH_FLAG_LOWER
         else:
             hash_flag = HASH_FLAG_EXACT
-        hash_[key] = best_value, hash_flag, depth
+        hash_[key] = best_value, hash_flag, depth, best_move
     return best_value
 
 
@@ -228,24 +468,35 @@ def negamax_alphabeta_jit(
         game,
         depth,
         max_duration=10.0,
-        alpha=-np.inf,
-        beta=np.inf,
-        soft=True):
+        alpha=-SCORE_INF,
+        beta=SCORE_INF,
+        soft=True,
+        stats=None,
+        stop=None):
     clock = time.time()
-    if max_duration < 0.0:
-        return np.nan
-    elif depth == 0 or game.is_full():
-        return -game.get_score()
+    if max_duration < 0.0 or stop is not None and stop.is_set():
+        raise StopSearch
+    if stats is not None:
+        stats.nodes += 1
+        if stats.total_nodes > stats.max_nodes:
+            raise StopSearch
+    if game.is_full():
+        return 0
+    elif depth == 0:
+        return quiescence(game, alpha, beta, stats=stats)
     best_value = -game.win_score
-    for move in game.sorted_moves():
+    for i, move in enumerate(get_moves(game)):
         game.do_move(move)
-        if game.winning_move(move) == game.turn:
-            value = game.win_score
-        else:
-            value = -negamax_alphabeta_jit(
-                game, depth - 1, max_duration - (time.time() - clock),
-                -beta if soft else alpha, -alpha if soft else beta, soft)
-        game.undo_move(move)
+        try:
+            if game.winning_move(move) == game.turn:
+                value = game.win_score
+            else:
+                value = -negamax_alphabeta_jit(
+                    game, depth - 1, max_duration - (time.time() - clock),
+                    -beta if soft else alpha, -alpha if soft else beta, soft,
+                    stats=stats, stop=stop)
+        finally:
+            game.undo_move(move)
         # best_value = max(value, best_value)
         # alpha = max(best_value, alpha)
         if value > best_value:
@@ -253,26 +504,46 @@ def negamax_alphabeta_jit(
         if best_value > alpha:
             alpha = best_value
         if alpha >= beta:
+            if stats is not None:
+                stats.add_cutoff(i)
             break
     return best_value
 
 
 class GameAiSearchTree(GameAi):
-    def __init__(self, *_args, **_kws):
+    """
+    Game AI based on game-tree search.
+
+    Args:
+        book (PositionBook|None): The position book.
+            If given, the known moves of the root position are searched
+            first, in the order of their results.
+        book_min_games (int|None): The minimum number of games to play
+            the best known move without searching.
+            If None, the book is only used for move ordering.
+    """
+
+    def __init__(self, book=None, book_min_games=None, *_args, **_kws):
         GameAi.__init__(self, *_args, **_kws)
+        self.stats = None
+        self.cache = set()
+        self.hash_ = {}
+        self.book = book
+        self.book_min_games = book_min_games
+        self.max_cache_size = MAX_CACHE_SIZE
+        self._shape = None
 
-    def get_best_move(
-            self,
-            game=None,
-            max_duration=10.0,
-            method='negamax_alphabeta',
-            method_kws=None,
-            randomize=False,
-            max_depth=None,
-            verbose=True,
-            callback=None,
-            *_args,
-            **_kws):
+    def _root_moves(self, game):
+        moves = game.sorted_moves()
+        if self.book is not None:
+            moves = self.book.order_moves(game, moves)
+        return moves
+
+    def clear_cache(self):
+        self.cache.clear()
+        self.hash_.clear()
+
+    def _prepare(self, game, method, method_kws, stats, stop, max_nodes):
         if method in globals():
             func = globals()[method]
         else:
@@ -280,56 +551,352 @@ class GameAiSearchTree(GameAi):
         if not callable(func):
             raise ValueError('Unknown search-tree method.')
         method_kws = dict(method_kws) if method_kws is not None else {}
+        # : the table keys (see `repr()`) do not include the game rules
+        shape = game.rows, game.cols, game.num_win, \
+            hasattr(game, 'has_gravity')
+        if len(self.cache) + len(self.hash_) > self.max_cache_size \
+                or max_nodes is not None or shape != self._shape:
+            # : a node budget requires reproducible (i.e. fresh) tables
+            self.clear_cache()
+            self._shape = shape
         if 'caching' in method:
-            cache = set()
-            method_kws.update(dict(cache=cache))
+            method_kws.update(dict(cache=self.cache))
         if 'hashing' in method:
-            hash_ = {}
-            method_kws.update(dict(hash_=hash_))
-        if not max_depth:
-            max_depth = 0
-        elif max_depth < 0:
-            max_depth = game.num_moves_left() - (max_depth + 1)
+            method_kws.update(dict(hash_=self.hash_))
+        if stop is not None:
+            method_kws.update(dict(stop=stop))
+        self.stats = SearchStats(method, max_nodes)
+        if stats or max_nodes is not None:
+            method_kws.update(dict(stats=self.stats))
+        return func, method_kws
+
+    def iter_best_moves(
+            self,
+            game=None,
+            max_duration=10.0,
+            method='negamax_alphabeta',
+            method_kws=None,
+            max_depth=None,
+            verbose=False,
+            tactical=True,
+            stats=False,
+            stop=None,
+            max_nodes=None,
+            min_depth=1,
+            *_args,
+            **_kws):
+        """
+        Search the best moves with iterative deepening.
+
+        The generator can be closed at any time: the results yielded so far
+        are those of completed iterations.
+
+        Args:
+            game (Board): The current position.
+            max_duration (float|None): The maximum search duration in sec.
+                If None, the duration is not limited.
+            method (str): The search function.
+            method_kws (Mappable|None): Keyword arguments for the search.
+            max_depth (int|None): The maximum search depth.
+                If None or 0, the search continues until the end of the
+                game or until a limit is exceeded.
+                If negative, this is counted from the end of the game.
+            verbose (bool): Print the results of each iteration.
+            tactical (bool): Use the tactical shortcut before searching.
+            stats (bool): Collect the node statistics.
+            stop (threading.Event|None): Stop the search when set.
+            max_nodes (int|None): The maximum number of nodes to search.
+                The nodes are always counted (as with `stats`) and the
+                persistent tables are cleared, so that, without time
+                limit, the result is reproducible.
+            min_depth (int): The first search depth.
+                This is useful for resuming an interrupted search (e.g.
+                with the same tables).
+
+        Yields:
+            result (tuple): The results after each iteration:
+             - depth (int): The search depth (0 for tactical or book
+               moves).
+             - score (int|None): The score of the best move(s).
+             - pv (list): The principal variation.
+             - stats (SearchStats): The search statistics.
+                The moves scored as the best are in `stats.best_moves`.
+        """
+        func, method_kws = self._prepare(
+            game, method, method_kws, stats, stop, max_nodes)
+        move = tactical_move(game) if tactical else None
+        if move is not None:
+            self.stats.tactical = True
+            self.stats.add_iteration(0, None, [move], 0.0)
+            self.stats.stop()
+            if verbose:
+                print(f'Tactical: {move}')
+            yield 0, None, self.stats.pv, self.stats
+            return
+        if self.book is not None and self.book_min_games is not None:
+            move = self.book.best_move(game, self.book_min_games)
+        if move is not None:
+            self.stats.book = True
+            self.stats.add_iteration(0, None, [move], 0.0)
+            self.stats.stop()
+            if verbose:
+                print(f'Book: {move}')
+            yield 0, None, self.stats.pv, self.stats
+            return
+        max_depth = _get_max_depth(game, max_depth)
         if verbose:
             feedback = ', '.join([
                 f'Method: {method}',
                 f'Min.Depth: {game.num_win}',
-                f'Max.Depth: {max(game.num_win, max_depth)}'])
+                f'Max.Depth: {max_depth}'])
             print(feedback)
+        if max_duration is None:
+            max_duration = math.inf
         clock = time.time()
-        choices = game.sorted_moves()
-        best_val = -np.inf
-        for depth in range(1, max(game.num_moves_left(), max_depth) + 1):
-            new_choices = []
-            depth_clock = time.time()
-            val = best_val
-            for move in game.sorted_moves():
-                game.do_move(move)
-                val = -func(
-                    game, depth, max_duration - (time.time() - clock),
-                    **method_kws)
-                game.undo_move(move)
-                if val > best_val:
-                    best_val = val
-                    new_choices = [move]
-                elif val == best_val and move not in new_choices:
-                    new_choices.append(move)
-            if not np.isnan(val) and new_choices:
-                choices = new_choices
-            if best_val in (np.inf, -np.inf):
-                break
-            if max_duration - (time.time() - clock) < 0.0:
-                break
-            else:
+        has_bounds = 'alpha' in inspect.signature(func).parameters
+        root_moves = self._root_moves(game)
+        try:
+            for depth in range(max(min_depth, 1), max_depth + 1):
+                choices = []
+                best_val = -SCORE_INF
+                depth_clock = time.time()
+                try:
+                    for move in root_moves:
+                        if has_bounds:
+                            # : only values not worse than the best are exact
+                            method_kws.update(dict(
+                                alpha=-SCORE_INF, beta=1 - best_val))
+                        game.do_move(move)
+                        try:
+                            if game.winning_move(move) == game.turn:
+                                val = game.win_score
+                            else:
+                                val = -func(
+                                    game, depth,
+                                    max_duration - (time.time() - clock),
+                                    **method_kws)
+                        finally:
+                            game.undo_move(move)
+                        if val > best_val:
+                            best_val = val
+                            choices = [move]
+                        elif val == best_val and move not in choices:
+                            choices.append(move)
+                except StopSearch:
+                    break
+                pv = principal_variation(
+                    game, choices[0], method_kws.get('hash_'), depth + 1)
+                self.stats.add_iteration(
+                    depth, best_val, choices, time.time() - depth_clock, pv)
                 if verbose:
                     feedback = ', '.join([
                         f'Time: {time.time() - depth_clock:.3f}',
                         f'Depth: {depth}', f'Best: {best_val}',
-                        f'Move(s): {choices}'])
+                        f'Move(s): {choices}', f'PV: {pv}'])
                     print(feedback)
-                if callable(callback):
-                    callback(**vars())
+                yield depth, best_val, pv, self.stats
+                if game.is_win_score(best_val):
+                    break
+                if max_duration - (time.time() - clock) < 0.0:
+                    break
+        finally:
+            self.stats.stop()
+
+    def get_best_move(
+            self,
+            game=None,
+            max_duration=10.0,
+            method='negamax_alphabeta',
+            method_kws=None,
+            randomize=False,
+            max_depth=None,
+            verbose=True,
+            callback=None,
+            tactical=True,
+            stats=False,
+            stop=None,
+            max_nodes=None,
+            time_manager=None,
+            *_args,
+            **_kws):
+        if time_manager is not None:
+            # : the search is aborted at the hard limit
+            _, max_duration = time_manager.start(game)
+        choices = game.sorted_moves()[:1]
+        for _, _, _, search_stats in self.iter_best_moves(
+                game, max_duration, method, method_kws, max_depth, verbose,
+                tactical, stats, stop, max_nodes):
+            choices = search_stats.best_moves
+            if callable(callback):
+                callback(search_stats)
+            if time_manager is not None \
+                    and time_manager.should_stop(search_stats):
+                break
         if randomize and len(choices) > 1:
             return random.choice(choices)
         else:
             return choices[0]
+
+    def get_move_scores(
+            self,
+            game=None,
+            max_duration=10.0,
+            method='negamax_alphabeta_hashing',
+            method_kws=None,
+            max_depth=None,
+            num_pv=None,
+            moves=None,
+            num_workers=1,
+            verbose=False,
+            stats=False,
+            stop=None,
+            max_nodes=None,
+            *_args,
+            **_kws):
+        """
+        Score every move with iterative deepening (multi-PV analysis).
+
+        At each depth, the moves are searched in the order given by the
+        scores of the previous depth.
+        If `num_pv` is given (and the method supports bounds), only the
+        moves that can enter the top `num_pv` are searched with the full
+        window, while the others are searched with a null window and only
+        get an upper bound.
+        With the hashing methods, the table is shared by all the moves.
+
+        Args:
+            game (Board): The current position.
+            max_duration (float|None): The maximum search duration in sec.
+                If None, the duration is not limited.
+            method (str): The search function.
+            method_kws (Mappable|None): Keyword arguments for the search.
+            max_depth (int|None): The maximum search depth.
+                See `iter_best_moves()` for the details.
+            num_pv (int|None): The number of exactly scored moves.
+                If None, all moves are scored exactly.
+            moves (Iterable|None): The moves to score.
+                If None, all the available moves are used.
+            num_workers (int): The number of worker processes.
+                If larger than 1, the moves are split among the workers,
+                each with its own table (and `stop` is not used).
+            verbose (bool): Print the results of each iteration.
+            stats (bool): Collect the node statistics.
+            stop (threading.Event|None): Stop the search when set.
+            max_nodes (int|None): The maximum number of nodes to search
+                (per worker).
+                See `iter_best_moves()` for the details.
+
+        Returns:
+            result (list[tuple]): The scored moves, best first:
+             - move (Any): The move.
+             - score (int|None): The score (None if not scored at all).
+             - is_exact (bool): If False, the score is an upper bound.
+             - depth (int): The search depth of the score.
+             - pv (list): The principal variation (for exact scores).
+            The scores are those of the last completed depth (the first
+            depth may be partial).
+        """
+        moves = list(moves) if moves is not None else self._root_moves(game)
+        if not moves:
+            self.stats = SearchStats(method)
+            self.stats.stop()
+            return []
+        if num_workers > 1 and len(moves) > 1:
+            num_workers = min(num_workers, len(moves))
+            kws = dict(
+                max_duration=max_duration, method=method,
+                method_kws=method_kws, max_depth=max_depth, num_pv=num_pv,
+                stats=stats, max_nodes=max_nodes)
+            with ProcessPoolExecutor(num_workers) as executor:
+                futures = [
+                    executor.submit(
+                        _get_move_scores, game, moves[i::num_workers], kws)
+                    for i in range(num_workers)]
+                results = [
+                    result for future in futures
+                    for result in future.result()]
+            self.stats = SearchStats(method)
+            self.stats.stop()
+            return sorted(results, key=_move_score_key)
+        func, method_kws = self._prepare(
+            game, method, method_kws, stats, stop, max_nodes)
+        has_bounds = 'alpha' in inspect.signature(func).parameters
+        max_depth = _get_max_depth(game, max_depth)
+        if max_duration is None:
+            max_duration = math.inf
+        scores = {move: (None, False, 0) for move in moves}
+        clock = time.time()
+        for depth in range(1, max_depth + 1):
+            depth_clock = time.time()
+            top_values = []
+            last_scores = dict(scores)
+            try:
+                for move in sorted(moves, key=lambda x: _move_score_key(
+                        (x,) + scores[x])):
+                    if has_bounds and num_pv and len(top_values) >= num_pv:
+                        lower = top_values[num_pv - 1]
+                    else:
+                        lower = -SCORE_INF
+                    if has_bounds:
+                        method_kws.update(dict(alpha=-SCORE_INF, beta=-lower))
+                    game.do_move(move)
+                    try:
+                        if game.winning_move(move) == game.turn:
+                            val = game.win_score
+                        else:
+                            val = -func(
+                                game, depth,
+                                max_duration - (time.time() - clock),
+                                **method_kws)
+                    finally:
+                        game.undo_move(move)
+                    is_exact = val > lower
+                    if is_exact:
+                        top_values = sorted(top_values + [val], reverse=True)
+                    scores[move] = val, is_exact, depth
+            except StopSearch:
+                if depth > 1:
+                    # : the scores of an interrupted depth are not ranked
+                    # against the (deeper) scores of the others
+                    scores = last_scores
+                break
+            best_moves = [
+                move for move in moves if scores[move][0] == top_values[0]]
+            self.stats.add_iteration(
+                depth, top_values[0], best_moves, time.time() - depth_clock)
+            if verbose:
+                print(f'Depth: {depth}, Scores: {scores}')
+            if max_duration - (time.time() - clock) < 0.0:
+                break
+        self.stats.stop()
+        result = []
+        for move in moves:
+            val, is_exact, depth = scores[move]
+            pv = principal_variation(
+                game, move, method_kws.get('hash_'), depth + 1) \
+                if is_exact else [move]
+            result.append((move, val, is_exact, depth, pv))
+        return sorted(result, key=_move_score_key)
+
+
+# ======================================================================
+def _get_max_depth(game, max_depth):
+    if not max_depth:
+        return game.num_moves_left()
+    elif max_depth < 0:
+        return game.num_moves_left() - (max_depth + 1)
+    else:
+        return min(max_depth, game.num_moves_left())
+
+
+# ======================================================================
+def _move_score_key(result):
+    """Sort moves best first: exact scores, bounds, unscored moves."""
+    _, val, is_exact, depth = result[:4]
+    return (
+        val is None, -val if val is not None else 0, not is_exact, -depth)
+
+
+# ======================================================================
+def _get_move_scores(game, moves, kws):
+    return GameAiSearchTree().get_move_scores(game, moves=moves, **kws)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import time
+
+from mnkgame.Board import Board
+
+# the minimum number of own moves the remaining time is split into
+MIN_MOVES_TO_GO = 10
+# the share of the increment spent on each move
+INCREMENT_SHARE = 0.8
+# the hard limit as a multiple of the soft limit
+HARD_FACTOR = 4.0
+# the maximum share of the remaining time spent on a single move
+MAX_TIME_SHARE = 0.25
+# the time always kept in reserve in sec (e.g. for the communication)
+RESERVE_TIME = 0.05
+# the soft limit extension for each best-move change
+CHANGE_FACTOR = 0.5
+# the soft limit extension for each score drop of `SCORE_DROP` or more
+DROP_FACTOR = 0.5
+# the score drop considered significant (as a share of the win score)
+SCORE_DROP = 0.02
+# the maximum soft limit extension (as a multiple)
+MAX_EXTENSION = 3.0
+# the estimated growth of the iteration time with each depth
+MIN_BRANCHING = 2.0
+
+
+# ======================================================================
+class GameClock(object):
+    """
+    Clock of a game with total time plus increment.
+
+    Each player has its own time, which runs between `start()` and
+    `stop()`; the increment is added after each move.
+
+    Args:
+        base (float): The initial time of each player in sec.
+        increment (float): The time added after each move in sec.
+        turns (Sequence): The players.
+
+    Examples:
+        >>> clock = GameClock.from_text('60+2')
+        >>> clock.start(1)
+        >>> clock.stop() < 1.0
+        True
+        >>> 61.0 < clock.time_left(1) <= 62.0
+        True
+        >>> clock.time_left(2)
+        60.0
+    """
+
+    def __init__(self, base, increment=0.0, turns=Board.TURNS):
+        self.base = base
+        self.increment = increment
+        self.turns = tuple(turns)
+        self._time_left = {}
+        self._turn = None
+        self._begin_time = None
+        self.reset()
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Create a clock from a time control, e.g. `300+5` or `60`.
+
+        Raises:
+            ValueError: If the text is not a valid time control.
+        """
+        base, _, increment = text.partition('+')
+        return cls(float(base), float(increment or 0.0))
+
+    def __repr__(self):
+        return f'{self.base:g}+{self.increment:g}'
+
+    def reset(self):
+        self._time_left = {turn: self.base for turn in self.turns}
+        self._turn = None
+        self._begin_time = None
+
+    @property
+    def turn(self):
+        """The player whose time is running (None if stopped)."""
+        return self._turn
+
+    def start(self, turn):
+        """Start the time of a player (stopping the running one)."""
+        self.stop(False)
+        self._turn = turn
+        self._begin_time = time.time()
+
+    def stop(self, add_increment=True):
+        """
+        Stop the running time.
+
+        Args:
+            add_increment (bool): Add the increment (i.e. a move was made).
+
+        Returns:
+            elapsed (float): The time used in sec.
+        """
+        if self._turn is None:
+            return 0.0
+        elapsed = time.time() - self._begin_time
+        self._time_left[self._turn] -= elapsed
+        if add_increment:
+            self._time_left[self._turn] += self.increment
+        self._turn = None
+        self._begin_time = None
+        return elapsed
+
+    def time_left(self, turn):
+        """The remaining time of a player in sec (including the running)."""
+        time_left = self._time_left[turn]
+        if turn == self._turn:
+            time_left -= time.time() - self._begin_time
+        return time_left
+
+    def is_flagged(self, turn):
+        """Whether a player has run out of time."""
+        return self.time_left(turn) <= 0.0
+
+    def format(self, turn):
+        seconds = max(self.time_left(turn), 0.0)
+        return f'{int(seconds // 60)}:{seconds % 60:04.1f}'
+
+
+# ======================================================================
+class TimeManager(object):
+    """
+    Allocation of the time of a move during iterative deepening.
+
+    Each move gets a soft limit, i.e. an even share of the remaining time
+    over the expected own moves left (see `num_moves_left()`) plus most of
+    the increment, and a hard limit, i.e. a multiple of the soft limit,
+    never exceeding a fixed share of the remaining time.
+    The search is aborted at the hard limit, while the soft limit is only
+    checked between the iterations.
+    The soft limit is extended when the search is unstable (the best move
+    changes or the score drops) and no new iteration is started if it is
+    not expected to complete within the soft limit.
+    Single moves are played immediately.
+
+    Args:
+        time_left (float): The remaining time in sec.
+        increment (float): The time added after the move in sec.
+        max_move_time (float|None): The maximum time of the move in sec.
+            If None, this is not limited.
+
+    Examples:
+        >>> board = Board(15, 15, 5)
+        >>> soft, hard = TimeManager(60.0).start(board)
+        >>> round(soft, 3), round(hard, 3)
+        (0.535, 2.141)
+    """
+
+    def __init__(self, time_left, increment=0.0, max_move_time=None):
+        self.time_left = time_left
+        self.increment = increment
+        self.max_move_time = max_move_time
+        self.soft = self.hard = None
+        self._begin_time = None
+        self._extension = 1.0
+        self._last = None
+        self._score_drop = None
+
+    @classmethod
+    def from_clock(cls, clock, turn, max_move_time=None):
+        return cls(clock.time_left(turn), clock.increment, max_move_time)
+
+    def start(self, game):
+        """
+        Allocate the time of a move.
+
+        Args:
+            game (Board): The current position.
+
+        Returns:
+            result (tuple): The soft and hard limits in sec.
+        """
+        self._begin_time = time.time()
+        self._extension = 1.0
+        self._last = None
+        self._score_drop = SCORE_DROP * game.win_score
+        available = max(self.time_left - RESERVE_TIME, 0.0)
+        moves_to_go = max(MIN_MOVES_TO_GO, game.num_moves_left() // 2)
+        soft = available / moves_to_go + self.increment * INCREMENT_SHARE
+        hard = min(soft * HARD_FACTOR, available * MAX_TIME_SHARE)
+        if self.max_move_time is not None:
+            hard = min(hard, self.max_move_time)
+        if len(game.avail_moves()) < 2:
+            hard = 0.0
+        self.soft, self.hard = min(soft, hard), hard
+        return self.soft, self.hard
+
+    def elapsed(self):
+        return time.time() - self._begin_time
+
+    def should_stop(self, stats):
+        """
+        Decide whether to stop after an iteration.
+
+        Args:
+            stats (SearchStats): The search statistics.
+
+        Returns:
+            result (bool): Whether to stop the search.
+        """
+        if not stats.iterations:
+            return False
+        iteration = stats.iterations[-1]
+        if self._last is not None:
+            last_moves = self._last['best_moves']
+            last_value = self._last['best_value']
+            if iteration['best_moves'][:1] != last_moves[:1]:
+                self._extension += CHANGE_FACTOR
+            value = iteration['best_value']
+            if last_value is not None and value is not None \
+                    and last_value - value >= self._score_drop:
+                self._extension += DROP_FACTOR
+            self._extension = min(self._extension, MAX_EXTENSION)
+        last = self._last
+        self._last = iteration
+        soft = min(self.soft * self._extension, self.hard)
+        elapsed = self.elapsed()
+        # : the next iteration takes longer than the last one
+        if last is not None and last['time'] > 0.0:
+            branching = max(iteration['time'] / last['time'], MIN_BRANCHING)
+        else:
+            branching = MIN_BRANCHING
+        return elapsed + iteration['time'] * branching > soft
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import struct
+
+import numpy as np
+
+from mnkgame.Board import Board
+from mnkgame.BoardGravity import BoardGravity
+
+# the current version of the record format
+VERSION = 1
+# the magic bytes of the binary files (followed by the version byte)
+MAGIC = b'MNKG'
+# the first line of the text files
+TEXT_HEADER = f'# mnkgame-record v{VERSION}'
+# the file extensions of the binary and text variants
+EXTS = dict(binary='.mnk', text='.txt')
+# the header of each binary record:
+# rows, cols, num_win, flags, number of moves, number of moves played
+_RECORD = struct.Struct('<BBBBHH')
+_FLAG_GRAVITY = 1
+_FLAG_COMPUTER_PLAYS = 2
+
+
+class GameRecord(object):
+    """
+    Record of a game.
+
+    The moves are stored as flat cell indices (columns with gravity).
+    The moves after `num_played` have been undone (and can be redone).
+
+    Binary records are a fixed-size header followed by the packed moves
+    (one byte per move for boards up to 256 cells, two bytes otherwise).
+    Text records are single lines, e.g. `6x7x4 g=1 c=0 n=3: 3 3 2`.
+    """
+
+    def __init__(
+            self,
+            rows,
+            cols,
+            num_win,
+            gravity=False,
+            moves=(),
+            num_played=None,
+            computer_plays=False):
+        self.rows = rows
+        self.cols = cols
+        self.num_win = num_win
+        self.gravity = bool(gravity)
+        self.moves = list(moves)
+        self.num_played = \
+            num_played if num_played is not None else len(self.moves)
+        self.computer_plays = bool(computer_plays)
+
+    def __eq__(self, other):
+        return isinstance(other, GameRecord) and vars(self) == vars(other)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.to_text()})'
+
+    @classmethod
+    def from_histories(
+            cls,
+            board,
+            undo_history,
+            redo_history=(),
+            computer_plays=False):
+        """
+        Create a record from the move histories of the user interfaces.
+
+        Args:
+            board (Board): The board (only its shape is used).
+            undo_history (Sequence): The moves played.
+            redo_history (Sequence): The moves undone (last undone last).
+            computer_plays (bool): Whether the computer is to move.
+
+        Returns:
+            record (GameRecord): The game record.
+        """
+        return cls(
+            board.rows, board.cols, board.num_win,
+            hasattr(board, 'has_gravity'),
+            list(undo_history) + list(redo_history)[::-1],
+            len(undo_history), computer_plays)
+
+    def histories(self):
+        """
+        Get the move histories of the user interfaces.
+
+        Returns:
+            result (tuple): The moves played and the moves undone (last
+                undone last).
+        """
+        return \
+            self.moves[:self.num_played], self.moves[self.num_played:][::-1]
+
+    def to_board(self):
+        """
+        Create the board after the moves played.
+
+        The moves are not validated (e.g. against repetitions), apart from
+        their bounds, which are checked when reading the records.
+        """
+        board_class = BoardGravity if self.gravity else Board
+        return board_class.from_moves(
+            self.rows, self.cols, self.num_win,
+            self.moves[:self.num_played])
+
+    @property
+    def _dtype(self):
+        return np.dtype('<u1' if self.rows * self.cols <= 256 else '<u2')
+
+    def _flat_moves(self):
+        if self.gravity:
+            return np.asarray(self.moves, dtype=self._dtype)
+        elif self.moves:
+            rows, cols = np.asarray(self.moves, dtype=np.intp).T
+            return (rows * self.cols + cols).astype(self._dtype)
+        else:
+            return np.zeros(0, dtype=self._dtype)
+
+    def _set_flat_moves(self, flat):
+        # : the moves are trusted by `to_board()`, so check their bounds
+        if not (self.rows > 0 and self.cols > 0
+                and 0 < self.num_win <= max(self.rows, self.cols)):
+            raise ValueError('Invalid game record shape.')
+        if not 0 <= self.num_played <= len(flat):
+            raise ValueError('Invalid number of moves played.')
+        size = self.cols if self.gravity else self.rows * self.cols
+        if len(flat) > self.rows * self.cols \
+                or np.any((flat < 0) | (flat >= size)) \
+                or (self.gravity and len(flat) > 0 and np.bincount(
+                    flat.astype(np.intp)).max() > self.rows):
+            raise ValueError('Invalid game record moves.')
+        if self.gravity:
+            self.moves = flat.tolist()
+        else:
+            self.moves = list(zip(*divmod(flat.astype(np.intp), self.cols)))
+            self.moves = [(int(i), int(j)) for i, j in self.moves]
+
+    def _flags(self):
+        return (_FLAG_GRAVITY if self.gravity else 0) \
+               | (_FLAG_COMPUTER_PLAYS if self.computer_plays else 0)
+
+    def to_bytes(self):
+        return _RECORD.pack(
+            self.rows, self.cols, self.num_win, self._flags(),
+            len(self.moves), self.num_played) + self._flat_moves().tobytes()
+
+    @classmethod
+    def read_bytes(cls, file_obj):
+        """
+        Read a binary record from a stream.
+
+        Returns:
+            record (GameRecord|None): The record, or None at end of stream.
+
+        Raises:
+            ValueError: If the record is truncated or not valid.
+        """
+        data = file_obj.read(_RECORD.size)
+        if not data:
+            return None
+        elif len(data) < _RECORD.size:
+            raise ValueError('Truncated game record.')
+        rows, cols, num_win, flags, num_moves, num_played = \
+            _RECORD.unpack(data)
+        record = cls(
+            rows, cols, num_win, flags & _FLAG_GRAVITY, (), num_played,
+            flags & _FLAG_COMPUTER_PLAYS)
+        dtype = record._dtype
+        data = file_obj.read(num_moves * dtype.itemsize)
+        if len(data) < num_moves * dtype.itemsize:
+            raise ValueError('Truncated game record.')
+        record._set_flat_moves(np.frombuffer(data, dtype=dtype))
+        return record
+
+    def to_text(self):
+        return '{}x{}x{} g={:d} c={:d} n={}: {}'.format(
+            self.rows, self.cols, self.num_win, self.gravity,
+            self.computer_plays, self.num_played,
+            ' '.join(str(x) for x in self._flat_moves().tolist()))
+
+    @classmethod
+    def from_text(cls, text):
+        """
+        Parse a text record.
+
+        Raises:
+            ValueError: If the text is not a valid record.
+        """
+        try:
+            head, moves = text.split(':')
+            shape, gravity, computer_plays, num_played = head.split()
+            rows, cols, num_win = [int(x) for x in shape.split('x')]
+            record = cls(
+                rows, cols, num_win, int(gravity[2:]), (),
+                int(num_played[2:]), int(computer_plays[2:]))
+            record._set_flat_moves(
+                np.array([int(x) for x in moves.split()], dtype=np.intp))
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid game record `{text.strip()}`.')
+        return record
+
+
+# ======================================================================
+class GameRecordWriter(object):
+    """
+    Streaming writer of game records to a binary stream.
+
+    Args:
+        file_obj (BinaryIO): The stream (opened in binary mode).
+        text (bool): Whether to use the text variant.
+    """
+
+    def __init__(self, file_obj, text=False):
+        self.file_obj = file_obj
+        self.text = text
+        if text:
+            file_obj.write((TEXT_HEADER + '\n').encode('ascii'))
+        else:
+            file_obj.write(MAGIC + bytes([VERSION]))
+
+    def write(self, record):
+        if self.text:
+            self.file_obj.write((record.to_text() + '\n').encode('ascii'))
+        else:
+            self.file_obj.write(record.to_bytes())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file_obj.flush()
+
+
+# ======================================================================
+def read_records(file_obj):
+    """
+    Read game records from a binary stream (of either variant).
+
+    Args:
+        file_obj (BinaryIO): The stream (opened in binary mode).
+
+    Yields:
+        record (GameRecord): The game records.
+
+    Raises:
+        ValueError: If the format or the version is not supported.
+    """
+    magic = file_obj.read(len(MAGIC))
+    if magic == MAGIC:
+        version = file_obj.read(1)
+        if not version or version[0] > VERSION:
+            raise ValueError('Unsupported game record version.')
+        record = GameRecord.read_bytes(file_obj)
+        while record is not None:
+            yield record
+            record = GameRecord.read_bytes(file_obj)
+    elif magic == TEXT_HEADER[:len(MAGIC)].encode('ascii'):
+        header = (magic + file_obj.readline()).decode('ascii').strip()
+        version = header.rsplit('v', 1)[-1]
+        if not version.isdigit() or int(version) > VERSION:
+            raise ValueError('Unsupported game record version.')
+        for line in file_obj:
+            line = line.decode('ascii').strip()
+            if line and not line.startswith('#'):
+                yield GameRecord.from_text(line)
+    else:
+        raise ValueError('Unknown game record format.')
+
+
+# ======================================================================
+def save_records(filepath, records, text=None):
+    """
+    Save game records to a file.
+
+    Args:
+        filepath (str): The file path.
+        records (Iterable[GameRecord]): The game records.
+        text (bool|None): Whether to use the text variant.
+            If None, this is determined from the file extension.
+
+    Returns:
+        None.
+    """
+    if text is None:
+        text = filepath.endswith(EXTS['text'])
+    with open(filepath, 'wb') as file_obj:
+        with GameRecordWriter(file_obj, text) as writer:
+            for record in records:
+                writer.write(record)
+
+
+# ======================================================================
+def load_records(filepath):
+    """Load all the game records from a file (of either variant)."""
+    with open(filepath, 'rb') as file_obj:
+        return list(read_records(file_obj))
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import itertools
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+from mnkgame.util import make_board
+from mnkgame.util import AI_MODES
+
+# the initial time slice of the searches in sec
+SLICE_DURATION = 0.05
+# the maximum time slice of the searches in sec
+MAX_SLICE_DURATION = 1.0
+
+
+# ======================================================================
+class SearchTask(object):
+    """
+    Search of a game, run in time slices by a worker.
+
+    The search uses iterative deepening: a slice completes as many depths
+    as possible, and an interrupted depth is searched again in the next
+    slice (with the tables of the game AI still warm).
+    The slices of a task that could not complete any depth are doubled
+    (up to `MAX_SLICE_DURATION`), so that deep iterations still progress.
+
+    The tasks of a worker are scheduled by stride scheduling: the task
+    with the smallest `pass_` runs next, and its `pass_` grows by the
+    time used divided by its priority.
+    """
+
+    def __init__(
+            self,
+            request_id,
+            board,
+            budget,
+            priority=1.0,
+            max_depth=None,
+            pass_=0.0):
+        self.request_id = request_id
+        self.board = board
+        self.budget = budget
+        self.priority = priority
+        self.max_depth = max_depth
+        self.pass_ = pass_
+        self.slice = SLICE_DURATION
+        self.next_depth = 1
+        self.used = 0.0
+        self.num_slices = 0
+        self.depth = 0
+        self.score = None
+        self.moves = board.sorted_moves()[:1]
+        self.is_done = False
+        self.begin_time = time.time()
+
+    def run_slice(self, ai, method):
+        duration = min(self.slice, self.budget - self.used)
+        begin_time = time.perf_counter()
+        has_completed = False
+        if not hasattr(ai, 'iter_best_moves'):
+            self.moves = [ai.get_best_move(
+                self.board, self.budget, method, verbose=False)]
+            self.is_done = True
+        else:
+            max_depth = self.max_depth or self.board.num_moves_left()
+            for depth, score, _, stats in ai.iter_best_moves(
+                    self.board, duration, method, max_depth=max_depth,
+                    min_depth=self.next_depth):
+                has_completed = True
+                self.depth, self.score = depth, score
+                self.moves = stats.best_moves
+                self.next_depth = depth + 1
+                if depth == 0 or self.board.is_win_score(score) \
+                        or depth >= max_depth:
+                    self.is_done = True
+        elapsed = time.perf_counter() - begin_time
+        self.used += elapsed
+        self.num_slices += 1
+        self.pass_ += elapsed / self.priority
+        if not has_completed:
+            self.slice = min(2 * self.slice, MAX_SLICE_DURATION)
+        if self.used >= self.budget:
+            self.is_done = True
+
+    def result(self):
+        return dict(
+            move=self.moves[0], score=self.score, depth=self.depth,
+            search_time=self.used, slices=self.num_slices,
+            time=time.time() - self.begin_time)
+
+
+# ======================================================================
+def _worker(in_queue, out_queue, ai_mode):
+    ai_class = AI_MODES[ai_mode]['ai_class']
+    method = AI_MODES[ai_mode]['ai_method']
+    games = {}
+    tasks = {}
+    while True:
+        block = not tasks
+        while True:
+            try:
+                message = in_queue.get(block)
+            except queue.Empty:
+                break
+            block = False
+            kind, game_id, args = message
+            if kind == 'quit':
+                return
+            elif kind == 'new':
+                games[game_id] = ai_class(), make_board(**args)
+            elif kind == 'close':
+                games.pop(game_id, None)
+                if game_id in tasks:
+                    out_queue.put(
+                        ('cancel', tasks.pop(game_id).request_id, None))
+            elif kind == 'search':
+                request_id, moves, budget, priority, max_depth = args
+                ai, board = games[game_id]
+                if game_id in tasks:
+                    out_queue.put(
+                        ('cancel', tasks[game_id].request_id, None))
+                if not board.do_moves(moves):
+                    out_queue.put(('error', request_id, 'Invalid moves.'))
+                    continue
+                # : new tasks start from the current pass of the others
+                pass_ = min([task.pass_ for task in tasks.values()] + [0.0])
+                tasks[game_id] = SearchTask(
+                    request_id, board, budget, priority, max_depth, pass_)
+        if tasks:
+            game_id, task = min(tasks.items(), key=lambda x: x[1].pass_)
+            try:
+                task.run_slice(games[game_id][0], method)
+            except Exception as e:
+                del tasks[game_id]
+                out_queue.put(('error', task.request_id, repr(e)))
+                continue
+            if task.is_done:
+                del tasks[game_id]
+                out_queue.put(('result', task.request_id, task.result()))
+            else:
+                # : keep the passes small
+                min_pass = min(other.pass_ for other in tasks.values())
+                for other in tasks.values():
+                    other.pass_ -= min_pass
+
+
+# ======================================================================
+class GameScheduler(object):
+    """
+    Scheduler of the searches of many concurrent games.
+
+    Each game is assigned to one of a fixed set of worker processes
+    (the least loaded when the game is created), where its AI (with its
+    tables) is kept warm for the whole game.
+    Each worker runs the searches of its games in time slices (see
+    `SearchTask`), so that no game waits for another game to finish
+    thinking: a game waits at most one slice of each other active game
+    on the same worker, and the games with larger priority get
+    proportionally more slices.
+
+    The position of a search is given as the moves played, i.e. the
+    `undo_history` of the user interfaces.
+
+    Args:
+        num_workers (int|None): The number of worker processes.
+            If None, the number of CPUs is used.
+        ai_mode (str): The AI mode (see `AI_MODES`).
+
+    Examples:
+        >>> with GameScheduler(2) as scheduler:
+        ...     game_id = scheduler.new_game(3, 3, 3)
+        ...     moves = [(0, 0), (1, 1), (0, 1)]
+        ...     future = scheduler.search(game_id, moves, 1.0)
+        ...     future.result()['move']
+        (0, 2)
+    """
+
+    def __init__(self, num_workers=None, ai_mode='alphabeta'):
+        self.num_workers = num_workers or os.cpu_count()
+        self.ai_mode = ai_mode
+        self._games = {}
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._out_queue = multiprocessing.Queue()
+        self._in_queues = []
+        self._workers = []
+        for _ in range(self.num_workers):
+            in_queue = multiprocessing.Queue()
+            worker = multiprocessing.Process(
+                target=_worker, args=(in_queue, self._out_queue, ai_mode),
+                daemon=True)
+            worker.start()
+            self._in_queues.append(in_queue)
+            self._workers.append(worker)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def _collect(self):
+        while True:
+            kind, request_id, result = self._out_queue.get()
+            if kind == 'quit':
+                return
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue
+            elif kind == 'result':
+                future.set_result(result)
+            elif kind == 'cancel':
+                # : the futures are running, so `cancel()` does not apply
+                future.set_exception(CancelledError())
+            else:  # if kind == 'error':
+                future.set_exception(RuntimeError(result))
+
+    def new_game(self, rows, cols, num_win, gravity=False):
+        """
+        Create a game.
+
+        Returns:
+            game_id (int): The game id.
+        """
+        loads = [0] * self.num_workers
+        for i in self._games.values():
+            loads[i] += 1
+        i = loads.index(min(loads))
+        game_id = next(self._ids)
+        self._games[game_id] = i
+        self._in_queues[i].put((
+            'new', game_id,
+            dict(rows=rows, cols=cols, num_win=num_win, gravity=gravity)))
+        return game_id
+
+    def close_game(self, game_id):
+        """Close a game (its pending search is cancelled)."""
+        self._in_queues[self._games.pop(game_id)].put(
+            ('close', game_id, None))
+
+    def search(
+            self,
+            game_id,
+            moves,
+            budget,
+            priority=1.0,
+            max_depth=None):
+        """
+        Search the best move of a game.
+
+        A new search of a game cancels its pending search, i.e. the
+        result of the latter raises `CancelledError`.
+
+        Args:
+            game_id (int): The game id.
+            moves (Sequence): The moves played.
+            budget (float): The search time in sec.
+                This is the time spent searching, not the time until the
+                result, which is larger if the worker is shared.
+            priority (float): The priority (the share of the worker time
+                is proportional to it).
+            max_depth (int|None): The maximum search depth.
+
+        Returns:
+            future (Future): The result, with the best `move`, its
+                `score`, the search `depth`, the `search_time`, the number
+                of `slices` and the `time` from the start of the search.
+        """
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            request_id = next(self._ids)
+            self._futures[request_id] = future
+        self._in_queues[self._games[game_id]].put((
+            'search', game_id,
+            (request_id, list(moves), budget, priority, max_depth)))
+        return future
+
+    def shutdown(self):
+        for in_queue in self._in_queues:
+            in_queue.put(('quit', None, None))
+        for worker in self._workers:
+            worker.join()
+        self._out_queue.put(('quit', None, None))
+        self._collector.join()
+        with self._lock:
+            for future in self._futures.values():
+                future.set_exception(CancelledError())
+            self._futures.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+
+# ======================================================================
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description='Play many concurrent games on the scheduler.')
+    arg_parser.add_argument(
+        '-g', '--num_games', metavar='N',
+        type=int, default=32,
+        help='number of concurrent games [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_workers', metavar='N',
+        type=int, default=None,
+        help='number of worker processes [%(default)s]')
+    arg_parser.add_argument(
+        '-s', '--shape', metavar=('M', 'N', 'K'),
+        type=int, nargs=3, default=(6, 6, 4),
+        help='board rows, cols and number to win [%(default)s]')
+    arg_parser.add_argument(
+        '-t', '--budget', metavar='X',
+        type=float, default=0.2,
+        help='search time per move in sec [%(default)s]')
+    arg_parser.add_argument(
+        '-n', '--num_moves', metavar='N',
+        type=int, default=4,
+        help='number of searched moves per game [%(default)s]')
+    args = arg_parser.parse_args()
+    rows, cols, num_win = args.shape
+    latencies = []
+    begin_time = time.time()
+    with GameScheduler(args.num_workers) as scheduler:
+        histories = {
+            scheduler.new_game(rows, cols, num_win): []
+            for _ in range(args.num_games)}
+        for _ in range(args.num_moves):
+            futures = {
+                game_id: scheduler.search(
+                    game_id, moves, args.budget,
+                    # : one game in four has double priority
+                    priority=2.0 if game_id % 4 == 0 else 1.0)
+                for game_id, moves in histories.items()}
+            for game_id, future in futures.items():
+                result = future.result()
+                latencies.append(result['time'])
+                # : the opponent replies randomly
+                board = make_board(rows, cols, num_win, False)
+                board.do_moves(histories[game_id] + [result['move']])
+                moves = list(board.avail_moves())
+                histories[game_id].append(result['move'])
+                if moves:
+                    histories[game_id].append(random.choice(moves))
+    latencies.sort()
+    print(f'Searches: {len(latencies)}, '
+          f'Time: {time.time() - begin_time:.3f} s, '
+          f'Latency: {latencies[len(latencies) // 2]:.3f} s (median), '
+          f'{latencies[-1]:.3f} s (max)')
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import collections
+import hashlib
+import itertools
+import sqlite3
+
+import numpy as np
+
+from mnkgame.Board import Board
+
+# the number of games ingested per transaction
+BATCH_SIZE = 1000
+# the fields of the statistics
+FIELDS = ('games', 'wins', 'draws', 'losses')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER PRIMARY KEY,
+    games INTEGER, wins INTEGER, draws INTEGER, losses INTEGER);
+CREATE TABLE IF NOT EXISTS moves (
+    key INTEGER, move INTEGER,
+    games INTEGER, wins INTEGER, draws INTEGER, losses INTEGER,
+    PRIMARY KEY (key, move)) WITHOUT ROWID;
+"""
+_UPSERT = """
+INSERT INTO {table} VALUES ({values})
+ON CONFLICT({keys}) DO UPDATE SET
+    games = games + excluded.games, wins = wins + excluded.wins,
+    draws = draws + excluded.draws, losses = losses + excluded.losses
+"""
+
+
+# ======================================================================
+def symmetries(rows, cols, gravity=False):
+    """
+    Compute the symmetries of a board shape.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        gravity (bool): Whether the gravity rule is used.
+
+    Returns:
+        result (list[tuple]): The symmetries as `(transpose, flip_rows,
+            flip_cols)`, applied in this order (the identity is first).
+    """
+    if gravity:
+        return [(False, False, False), (False, False, True)]
+    return [
+        (transpose, flip_rows, flip_cols)
+        for transpose, flip_rows, flip_cols
+        in itertools.product((False, True), repeat=3)
+        if not transpose or rows == cols]
+
+
+def _transform_matrix(matrix, symmetry):
+    transpose, flip_rows, flip_cols = symmetry
+    if transpose:
+        matrix = matrix.T
+    if flip_rows:
+        matrix = matrix[::-1, :]
+    if flip_cols:
+        matrix = matrix[:, ::-1]
+    return matrix
+
+
+def _transform_move(move, shape, symmetry, inverse=False):
+    rows, cols = shape
+    transpose, flip_rows, flip_cols = symmetry
+    if not isinstance(move, tuple):
+        # : the columns of boards with gravity
+        return cols - 1 - move if flip_cols else move
+    # : transpositions are only used with square boards
+    row, col = move
+    if transpose and not inverse:
+        row, col = col, row
+    if flip_rows:
+        row = rows - 1 - row
+    if flip_cols:
+        col = cols - 1 - col
+    if transpose and inverse:
+        # : flips are undone before transposing back
+        row, col = col, row
+    return row, col
+
+
+# ======================================================================
+def canonical_key(matrix, num_win, gravity=False):
+    """
+    Compute the canonical hash of a position.
+
+    The key is the same for all the positions equivalent by symmetry.
+
+    Args:
+        matrix (np.ndarray): The board matrix.
+        num_win (int): The number of aligned pieces required for winning.
+        gravity (bool): Whether the gravity rule is used.
+
+    Returns:
+        result (tuple): The key (a signed 64-bit integer) and the symmetry
+            mapping the position to its canonical form.
+    """
+    rows, cols = matrix.shape
+    header = bytes([rows, cols, num_win, int(gravity)])
+    data, symmetry = min(
+        (np.ascontiguousarray(_transform_matrix(matrix, symmetry)).tobytes(),
+         symmetry)
+        for symmetry in symmetries(rows, cols, gravity))
+    digest = hashlib.blake2b(header + data, digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True), symmetry
+
+
+# ======================================================================
+class PositionBook(object):
+    """
+    Store of the positions of a game archive, with their outcomes.
+
+    Positions are indexed by their canonical hash (see `canonical_key()`),
+    with the number of games, wins, draws and losses (for the player to
+    move) of the position and of each move played from it.
+
+    Args:
+        filepath (str): The path to the SQLite database.
+            If `:memory:`, the database is not persistent.
+    """
+
+    def __init__(self, filepath=':memory:'):
+        self.filepath = filepath
+        self._conn = sqlite3.connect(filepath)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute(
+            'SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    # ------------------------------------------------------------------
+    def ingest(self, records, batch_size=BATCH_SIZE):
+        """
+        Index all the positions of finished games.
+
+        Args:
+            records (Iterable[GameRecord]): The game records.
+                Only the moves played are used, and unfinished games
+                are skipped.
+            batch_size (int): The number of games per transaction.
+
+        Returns:
+            result (int): The number of games ingested.
+        """
+        num_games = 0
+        positions = collections.defaultdict(lambda: [0, 0, 0, 0])
+        moves = collections.defaultdict(lambda: [0, 0, 0, 0])
+        for record in records:
+            if self._add_game(record, positions, moves):
+                num_games += 1
+                if num_games % batch_size == 0:
+                    self._flush(positions, moves)
+        self._flush(positions, moves)
+        return num_games
+
+    @staticmethod
+    def _add_game(record, positions, moves):
+        game_moves = record.moves[:record.num_played]
+        board = record.to_board()
+        if not game_moves:
+            return False
+        winner = board.winning_move(game_moves[-1]) or Board.EMPTY
+        if winner == Board.EMPTY and not board.is_full():
+            return False
+        matrix = np.full(
+            (record.rows, record.cols), Board.EMPTY, dtype=np.uint8)
+        heights = [0] * record.cols
+        for i, move in enumerate(game_moves + [None]):
+            turn = Board.TURNS[i % 2]
+            key, symmetry = canonical_key(
+                matrix, record.num_win, record.gravity)
+            # : the outcome for the player to move (games, wins, draws, ...)
+            outcome = (
+                1, int(winner == turn), int(winner == Board.EMPTY),
+                int(winner != turn and winner != Board.EMPTY))
+            _add(positions[key], outcome)
+            if move is None:
+                break
+            canonical_move = _transform_move(
+                move, matrix.shape, symmetry)
+            _add(moves[key, _encode(canonical_move, matrix.shape)], outcome)
+            if record.gravity:
+                matrix[record.rows - heights[move] - 1, move] = turn
+                heights[move] += 1
+            else:
+                matrix[move] = turn
+        return True
+
+    def _flush(self, positions, moves):
+        with self._conn:
+            self._conn.executemany(
+                _UPSERT.format(
+                    table='positions', values='?, ?, ?, ?, ?', keys='key'),
+                [(key,) + tuple(value) for key, value in positions.items()])
+            self._conn.executemany(
+                _UPSERT.format(
+                    table='moves', values='?, ?, ?, ?, ?, ?',
+                    keys='key, move'),
+                [key + tuple(value) for key, value in moves.items()])
+        positions.clear()
+        moves.clear()
+
+    # ------------------------------------------------------------------
+    def lookup(self, board):
+        """
+        Get the statistics of a position.
+
+        Args:
+            board (Board): The position.
+
+        Returns:
+            result (dict|None): The number of `games`, `wins`, `draws` and
+                `losses` (for the player to move), or None if unknown.
+        """
+        key, _ = canonical_key(
+            board.matrix, board.num_win, hasattr(board, 'has_gravity'))
+        row = self._conn.execute(
+            'SELECT games, wins, draws, losses FROM positions WHERE key = ?',
+            (key,)).fetchone()
+        return dict(zip(FIELDS, row)) if row is not None else None
+
+    def move_stats(self, board):
+        """
+        Get the statistics of the moves played from a position.
+
+        Args:
+            board (Board): The position.
+
+        Returns:
+            result (list[dict]): The `move` (for `board`), its `score` (the
+                expected result from 0 to 1) and the number of `games`,
+                `wins`, `draws` and `losses` (for the player to move),
+                best first.
+        """
+        gravity = hasattr(board, 'has_gravity')
+        key, symmetry = canonical_key(board.matrix, board.num_win, gravity)
+        shape = _transform_matrix(board.matrix, symmetry).shape
+        result = []
+        for row in self._conn.execute(
+                'SELECT move, games, wins, draws, losses FROM moves '
+                'WHERE key = ?', (key,)):
+            stats = dict(zip(FIELDS, row[1:]))
+            move = _decode(row[0], shape, gravity)
+            stats.update(
+                move=_transform_move(move, shape, symmetry, inverse=True),
+                score=(stats['wins'] + stats['draws'] / 2) / stats['games'])
+            result.append(stats)
+        return sorted(result, key=lambda x: (-x['score'], -x['games']))
+
+    def best_move(self, board, min_games=1):
+        """
+        Get the best known move of a position.
+
+        Args:
+            board (Board): The position.
+            min_games (int): The minimum number of games of the move.
+
+        Returns:
+            result (Any|None): The move, or None if unknown.
+        """
+        for stats in self.move_stats(board):
+            if stats['games'] >= min_games:
+                return stats['move']
+        return None
+
+    def order_moves(self, board, moves):
+        """
+        Order the moves by their statistics (known moves first).
+
+        Args:
+            board (Board): The position.
+            moves (Iterable): The moves to order.
+
+        Returns:
+            result (list): The moves, with the known moves first (best
+                first) and the others in the original order.
+        """
+        moves = list(moves)
+        known = [
+            stats['move'] for stats in self.move_stats(board)
+            if stats['move'] in moves]
+        return known + [move for move in moves if move not in known]
+
+
+# ======================================================================
+def _add(counts, outcome):
+    for i, x in enumerate(outcome):
+        counts[i] += x
+
+
+def _encode(move, shape):
+    if isinstance(move, tuple):
+        return move[0] * shape[1] + move[1]
+    else:
+        return move
+
+
+def _decode(code, shape, gravity):
+    return code if gravity else divmod(code, shape[1])
+
+
+# ======================================================================
+def main():
+    from mnkgame.GameRecord import read_records
+    arg_parser = argparse.ArgumentParser(
+        description='Index the positions of game records.')
+    arg_parser.add_argument(
+        'db_filepath', metavar='DB',
+        help='the SQLite database (created if missing)')
+    arg_parser.add_argument(
+        'filepaths', metavar='FILE', nargs='+',
+        help='the game record files')
+    args = arg_parser.parse_args()
+    with PositionBook(args.db_filepath) as book:
+        for filepath in args.filepaths:
+            with open(filepath, 'rb') as file_obj:
+                num_games = book.ingest(read_records(file_obj))
+            print(f'{filepath}: {num_games} games')
+        print(f'Positions: {len(book)}')
+
+
+# ======================================================================
+if __name__ == '__main__':
+    main()
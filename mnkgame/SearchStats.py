@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import math
+import time
+
+
+class SearchStats(object):
+    """
+    Statistics of a game-tree search.
+
+    The counters are only updated by the search functions when an instance
+    is passed to them (otherwise the cost is a single `is not None` check
+    per node).
+    The per-iteration results are recorded by the iterative deepening.
+    If `max_nodes` is given, the search is stopped once the total number of
+    nodes exceeds it.
+    """
+
+    def __init__(self, method=None, max_nodes=None):
+        self.method = method
+        self.max_nodes = max_nodes if max_nodes is not None else math.inf
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.cutoffs = 0
+        self.first_cutoffs = 0
+        self.cache_probes = 0
+        self.cache_hits = 0
+        self.depth = 0
+        self.best_value = None
+        self.best_moves = []
+        self.pv = []
+        self.iterations = []
+        self.tactical = False
+        self.book = False
+        self._begin_time = time.time()
+        self.elapsed = 0.0
+
+    def add_cutoff(self, i):
+        self.cutoffs += 1
+        if i == 0:
+            self.first_cutoffs += 1
+
+    def add_cache_probe(self, is_hit):
+        self.cache_probes += 1
+        if is_hit:
+            self.cache_hits += 1
+
+    def add_iteration(self, depth, best_value, best_moves, duration, pv=None):
+        self.depth = depth
+        self.best_value = best_value
+        self.best_moves = list(best_moves)
+        self.pv = list(pv) if pv is not None else self.best_moves[:1]
+        self.elapsed = time.time() - self._begin_time
+        self.iterations.append(dict(
+            depth=depth, time=duration, nodes=self.total_nodes,
+            best_value=best_value, best_moves=list(best_moves),
+            pv=list(self.pv)))
+
+    def stop(self):
+        self.elapsed = time.time() - self._begin_time
+
+    @property
+    def total_nodes(self):
+        return self.nodes + self.quiescence_nodes
+
+    @property
+    def nodes_per_sec(self):
+        return self.total_nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def first_cutoff_rate(self):
+        return self.first_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    @property
+    def cache_hit_rate(self):
+        return \
+            self.cache_hits / self.cache_probes if self.cache_probes else 0.0
+
+    @property
+    def branching_factor(self):
+        """The effective branching factor of the last iteration."""
+        if len(self.iterations) > 1:
+            nodes = [x['nodes'] for x in self.iterations[-3:]]
+            last, prev = nodes[-1] - nodes[-2], nodes[-2] - (
+                nodes[-3] if len(nodes) > 2 else 0)
+            return last / prev if prev > 0 else 0.0
+        else:
+            return 0.0
+
+    def to_dict(self):
+        return dict(
+            method=self.method,
+            max_nodes=(
+                self.max_nodes if self.max_nodes != math.inf else None),
+            depth=self.depth,
+            best_value=self.best_value,
+            best_moves=self.best_moves,
+            pv=self.pv,
+            tactical=self.tactical,
+            book=self.book,
+            elapsed=self.elapsed,
+            nodes=self.nodes,
+            quiescence_nodes=self.quiescence_nodes,
+            nodes_per_sec=self.nodes_per_sec,
+            branching_factor=self.branching_factor,
+            cutoffs=self.cutoffs,
+            first_cutoff_rate=self.first_cutoff_rate,
+            cache_probes=self.cache_probes,
+            cache_hit_rate=self.cache_hit_rate,
+            iterations=self.iterations)
+
+    def to_json(self, **_kws):
+        return json.dumps(self.to_dict(), default=str, **_kws)
+
+    def feedback(self):
+        feedback = [
+            f'Method: {self.method}', f'Depth: {self.depth}',
+            f'Best: {self.best_value}', f'Move(s): {self.best_moves}',
+            f'Time: {self.elapsed:.3f}']
+        if len(self.pv) > 1:
+            feedback.append(f'PV: {self.pv}')
+        if self.total_nodes:
+            feedback += [
+                f'Nodes: {self.total_nodes}',
+                f'N/s: {self.nodes_per_sec:.0f}']
+        return ', '.join(feedback)
+
+    __str__ = feedback
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from mnkgame.util import make_board
+
+# the layout of the header: version, then rows, cols, num_win, gravity,
+# number of moves (padded to 8-byte alignment of the data)
+_VERSION_DTYPE = np.dtype('<u8')
+_HEADER_DTYPE = np.dtype('<u2')
+_HEADER_SIZE = 5
+_DATA_OFFSET = 24
+_MOVE_DTYPE = np.dtype('<u2')
+# the maximum number of blocks kept attached per process when unpickling
+MAX_ATTACHED = 64
+
+# the blocks attached by unpickling (by name)
+_ATTACHED = collections.OrderedDict()
+
+
+# ======================================================================
+def sync_board(board, played, moves):
+    """
+    Update a board to a new move list, incrementally.
+
+    The moves after the common prefix are undone and the new ones are
+    done, so that, e.g., a new move only costs one `do_move()`.
+
+    Args:
+        board (Board): The board after `played`.
+        played (list): The moves played on `board`.
+        moves (Sequence): The new moves.
+
+    Returns:
+        played (list): The new moves played on `board`.
+
+    Raises:
+        ValueError: If a move is not valid (`board` is left after
+            `played`).
+    """
+    i = 0
+    for i, (a, b) in enumerate(zip(played, moves)):
+        if a != b:
+            break
+    else:
+        i = min(len(played), len(moves))
+    for move in played[i:][::-1]:
+        if not board.undo_move(move):
+            raise ValueError(f'Invalid played move `{move}`.')
+    for j, move in enumerate(moves[i:]):
+        if not board.do_move(move):
+            for done in moves[i:i + j][::-1]:
+                board.undo_move(done)
+            for undone in played[i:]:
+                board.do_move(undone)
+            raise ValueError(f'Invalid move `{move}`.')
+    return list(moves)
+
+
+# ======================================================================
+class SharedBoard(object):
+    """
+    Board position in shared memory, for handing it to worker processes.
+
+    The layout is fixed: an 8-byte version counter, the shape (rows, cols,
+    num_win, gravity) and the number of moves as 2-byte integers, then
+    the `uint8` board matrix and the move history as flat cell indices
+    (columns with gravity) as 2-byte integers.
+
+    A single process writes the position (`write()`), while any number of
+    processes can read it (`read()`, `matrix()`, `local_board()`) without
+    pickling: only the name of the memory block is passed around.
+    Pickling a `SharedBoard` does just that, and the unpickled instances
+    are kept attached, so that, e.g., the local board of a worker process
+    is kept between tasks and updated incrementally.
+    The version counter is incremented on each write (it is odd while the
+    write is in progress), so that readers always get consistent
+    positions and can cheaply check whether the position has changed.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        num_win (int): The number of aligned pieces required for winning.
+        gravity (bool): Whether to use the gravity rule.
+        name (str|None): The name of the memory block.
+            If None, a new block is created (and owned), otherwise the
+            existing block is attached (see also `attach()`).
+
+    Examples:
+        >>> shared = SharedBoard(3, 3, 3)
+        >>> shared.write([(1, 1), (0, 0)])
+        2
+        >>> reader = SharedBoard.attach(shared.name)
+        >>> reader.read()
+        (2, [(1, 1), (0, 0)])
+        >>> reader.close()
+        >>> shared.close()
+    """
+
+    def __init__(
+            self,
+            rows,
+            cols,
+            num_win,
+            gravity=False,
+            name=None):
+        self.rows = rows
+        self.cols = cols
+        self.num_win = num_win
+        self.gravity = bool(gravity)
+        size = rows * cols
+        self.is_owner = name is None
+        if self.is_owner:
+            self._shm = shared_memory.SharedMemory(
+                create=True,
+                size=_DATA_OFFSET + size + size * _MOVE_DTYPE.itemsize)
+        else:
+            self._shm = _attach_shm(name)
+        buf = self._shm.buf
+        self._version = np.ndarray(1, _VERSION_DTYPE, buf, 0)
+        self._header = np.ndarray(
+            _HEADER_SIZE, _HEADER_DTYPE, buf, _VERSION_DTYPE.itemsize)
+        self._matrix = np.ndarray(
+            (rows, cols), np.uint8, buf, _DATA_OFFSET)
+        self._moves = np.ndarray(
+            size, _MOVE_DTYPE, buf, _DATA_OFFSET + size)
+        if self.is_owner:
+            self._version[0] = 0
+            self._header[:] = (rows, cols, num_win, self.gravity, 0)
+            self._matrix[:] = make_board(rows, cols, num_win, gravity).EMPTY
+        self._board = None
+        self._played = []
+
+    @classmethod
+    def attach(cls, name):
+        """Attach an existing block, reading the shape from its header."""
+        shm = _attach_shm(name)
+        try:
+            rows, cols, num_win, gravity = np.ndarray(
+                _HEADER_SIZE, _HEADER_DTYPE, shm.buf,
+                _VERSION_DTYPE.itemsize)[:4].tolist()
+        finally:
+            shm.close()
+        return cls(rows, cols, num_win, gravity, name)
+
+    def __reduce__(self):
+        return _get_attached, (self.name,)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def version(self):
+        """The version of the position (even when consistent)."""
+        return int(self._version[0])
+
+    def close(self):
+        """Detach the block (and free it, if owned)."""
+        self._version = self._header = self._matrix = self._moves = None
+        self._shm.close()
+        if self.is_owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ------------------------------------------------------------------
+    def _encode(self, moves):
+        if self.gravity:
+            return moves
+        return [row * self.cols + col for row, col in moves]
+
+    def _decode(self, flat):
+        if self.gravity:
+            return flat
+        return [divmod(x, self.cols) for x in flat]
+
+    def write(self, moves):
+        """
+        Write a position (only one process must write).
+
+        Args:
+            moves (Sequence): The moves played, e.g. the `undo_history`.
+
+        Returns:
+            version (int): The new version.
+
+        Raises:
+            ValueError: If a move is not valid (nothing is written).
+        """
+        if self._board is None:
+            self._board = make_board(
+                self.rows, self.cols, self.num_win, self.gravity)
+        self._played = sync_board(self._board, self._played, moves)
+        version = self.version
+        self._version[0] = version + 1
+        self._matrix[:] = self._board.matrix
+        self._moves[:len(moves)] = self._encode(moves)
+        self._header[4] = len(moves)
+        self._version[0] = version + 2
+        return version + 2
+
+    def _read(self, func):
+        while True:
+            version = self.version
+            if version % 2 == 0:
+                result = func()
+                if self.version == version:
+                    return version, result
+            time.sleep(0)
+
+    def read(self):
+        """
+        Read the moves of the position.
+
+        Returns:
+            result (tuple): The version and the moves.
+        """
+        version, flat = self._read(
+            lambda: self._moves[:self._header[4]].tolist())
+        return version, self._decode(flat)
+
+    def matrix(self):
+        """
+        Read the board matrix of the position.
+
+        Returns:
+            result (tuple): The version and a copy of the matrix.
+        """
+        return self._read(self._matrix.copy)
+
+    def has_changed(self, version):
+        """Whether the position has changed since a version."""
+        return self.version != version
+
+    def sync(self, board, played):
+        """
+        Update a board to the position (see `sync_board()`).
+
+        Args:
+            board (Board): The board after `played`.
+            played (list): The moves played on `board`.
+
+        Returns:
+            result (tuple): The version and the moves played on `board`.
+        """
+        version, moves = self.read()
+        return version, sync_board(board, played, moves)
+
+    def local_board(self):
+        """
+        Get the local board, updated to the position.
+
+        The board is kept between calls (it must be restored after use), so
+        that it is updated incrementally (see `sync_board()`).
+        """
+        if self._board is None:
+            self._board = make_board(
+                self.rows, self.cols, self.num_win, self.gravity)
+        _, self._played = self.sync(self._board, self._played)
+        return self._board
+
+    def to_board(self):
+        """
+        Create a board with the position.
+
+        Returns:
+            result (tuple): The version and the board.
+        """
+        version, moves = self.read()
+        board = make_board(self.rows, self.cols, self.num_win, self.gravity)
+        board.do_moves(moves)
+        return version, board
+
+
+# ======================================================================
+def _attach_shm(name):
+    # : the owner frees the block, not the processes attaching it
+    # (before Python 3.13, blocks are always tracked, which is harmless
+    # for the child processes of the owner, as they share its tracker)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _get_attached(name):
+    if name in _ATTACHED:
+        _ATTACHED.move_to_end(name)
+    else:
+        _ATTACHED[name] = SharedBoard.attach(name)
+        if len(_ATTACHED) > MAX_ATTACHED:
+            _ATTACHED.popitem(last=False)[1].close()
+    return _ATTACHED[name]
@@ -34,6 +34,7 @@ from mnkgame import msg
 
 from mnkgame.util import is_gui_available, is_tui_available, make_board
 from mnkgame.util import AI_MODES, ALIASES, USER_INTERFACES
+from mnkgame.AiProfiler import AiProfiler, MODES as PROFILE_MODES
 
 
 # ======================================================================
@@ -99,6 +100,15 @@ def handle_arg():
         '-t', '--ai_timeout', metavar='X',
         type=float, default=5.0,
         help='AI move timeout in sec [%(default)s]')
+    arg_parser.add_argument(
+        '-T', '--time_control', metavar='BASE[+INC]',
+        type=str, default=None,
+        help='game clock in sec, e.g. `300+5` (`-t` is then the maximum '
+             'AI move time) [%(default)s]')
+    arg_parser.add_argument(
+        '-p', '--ponder',
+        action='store_true',
+        help='let the AI think on the opponent time [%(default)s]')
     arg_parser.add_argument(
         '-c', '--computer_plays',
         action='store_true',
@@ -107,6 +117,48 @@ def handle_arg():
         '-u', '--ugly',
         action='store_true',
         help='do not use terminal formatting [%(default)s]')
+    arg_parser.add_argument(
+        '-i', '--input', metavar='FILE',
+        type=str, default=None,
+        help='input positions for `analyze` (None for stdin) [%(default)s]')
+    arg_parser.add_argument(
+        '-o', '--output', metavar='FILE',
+        type=str, default=None,
+        help='output JSONL for `analyze` (None for stdout) [%(default)s]')
+    arg_parser.add_argument(
+        '-j', '--num_workers', metavar='N',
+        type=int, default=None,
+        help='number of worker processes for `analyze` and `server` '
+             '[%(default)s]')
+    arg_parser.add_argument(
+        '-d', '--max_depth', metavar='N',
+        type=int, default=None,
+        help='maximum AI search depth for `analyze` [%(default)s]')
+    arg_parser.add_argument(
+        '-N', '--max_nodes', metavar='N',
+        type=int, default=None,
+        help='maximum AI search nodes for `analyze` [%(default)s]')
+    arg_parser.add_argument(
+        '--host', metavar='HOST',
+        type=str, default='127.0.0.1',
+        help='host to listen on for `server` [%(default)s]')
+    arg_parser.add_argument(
+        '--port', metavar='N',
+        type=int, default=8765,
+        help='port to listen on for `server` (0 for any) [%(default)s]')
+    arg_parser.add_argument(
+        '-P', '--profile', metavar='MODE',
+        choices=PROFILE_MODES,
+        type=str, default=None,
+        help='profile the AI calls [%(default)s|(%(choices)s)]')
+    arg_parser.add_argument(
+        '--profile_dir', metavar='DIR',
+        type=str, default=None,
+        help='write the profile of each AI call to dir [%(default)s]')
+    arg_parser.add_argument(
+        '--profile_top', metavar='N',
+        type=int, default=20,
+        help='number of hot functions printed at exit [%(default)s]')
     return arg_parser
 
 
@@ -117,11 +169,15 @@ def main():
     # :: handle program parameters
     arg_parser = handle_arg()
     args = arg_parser.parse_args()
+    # the engine protocol uses stdout
+    if args.ui == 'engine':
+        args.quiet = True
     # fix verbosity in case of 'quiet'
     if args.quiet:
         args.verbose = VERB_LVL['none']
     # print greetings
-    print_greetings('inline', not args.ugly)
+    if not args.quiet:
+        print_greetings('inline', not args.ugly)
     # print help info
     if args.verbose >= VERB_LVL['debug']:
         arg_parser.print_help()
@@ -144,7 +200,29 @@ def main():
 
     kws['pretty'] = not kws.pop('ugly')
 
+    profile_mode = kws.pop('profile')
+    profile_dir = kws.pop('profile_dir')
+    profile_top = kws.pop('profile_top')
+    profiler = None
+    if profile_mode or profile_dir:
+        profiler = AiProfiler(profile_mode or PROFILE_MODES[0], profile_dir)
+        profiler.install(*{info['ai_class'] for info in AI_MODES.values()})
+
     ui = kws.pop('ui')
+    analyze_kws = dict(
+        input_filepath=kws.pop('input'),
+        output_filepath=kws.pop('output'),
+        num_workers=kws.pop('num_workers'),
+        max_depth=kws.pop('max_depth'),
+        max_nodes=kws.pop('max_nodes'))
+    server_kws = dict(
+        num_workers=analyze_kws['num_workers'],
+        host=kws.pop('host'),
+        port=kws.pop('port'))
+    if ui == 'analyze':
+        kws.update(analyze_kws)
+    elif ui == 'server':
+        kws.update(server_kws)
     if ui == 'auto':
         if is_gui_available():
             ui = 'gui'
@@ -156,7 +234,13 @@ def main():
         ui_module_name = ui_name = 'mnk_game_' + ui
         ui_module = importlib.import_module('mnkgame.' + ui_module_name)
         mnk_game_ui = getattr(ui_module, ui_name)
-        mnk_game_ui(**kws)
+        try:
+            mnk_game_ui(**kws)
+        finally:
+            if profiler is not None:
+                profiler.uninstall()
+                if profile_top > 0:
+                    profiler.print_report(profile_top)
 
     exec_time = datetime.datetime.now() - begin_time
     msg('ExecTime: {}'.format(exec_time), args.verbose, VERB_LVL['debug'],
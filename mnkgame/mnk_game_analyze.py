@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ast  # Abstract Syntax Trees
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from mnkgame import D_VERB_LVL
+from mnkgame import msg
+
+from mnkgame.util import make_board
+from mnkgame.util import AI_MODES
+
+# the separator of the rows in single-line board strings
+ROW_SEP = '/'
+# the number of positions submitted per worker at the same time
+NUM_PENDING = 2
+
+
+# ======================================================================
+def parse_position(text, board):
+    """
+    Set a position from its text.
+
+    Args:
+        text (str): The position, either as a list of moves (e.g.
+            `[(1, 1), (0, 0)]` or `[3, 3, 4]` with gravity) or as a board
+            string, i.e. `repr(board)` with the rows separated by newlines
+            or by `ROW_SEP` (the player to move last is ignored).
+        board (Board): The board to set (it is reset).
+
+    Returns:
+        board (Board): The board with the position.
+
+    Raises:
+        ValueError: If the position is not valid.
+    """
+    text = text.strip()
+    if text.startswith(('[', '(')):
+        moves = ast.literal_eval(text)
+        if not isinstance(moves, (list, tuple)):
+            raise ValueError('Invalid moves.')
+        moves = [
+            tuple(move) if isinstance(move, list) else move
+            for move in moves]
+        if not all(_is_move(move, board) for move in moves) \
+                or not board.do_moves(moves):
+            raise ValueError('Invalid moves.')
+    else:
+        lines = text.replace('\n', ROW_SEP).split(ROW_SEP)[:board.rows]
+        if len(lines) != board.rows \
+                or any(len(line) != board.cols for line in lines):
+            raise ValueError('Invalid board size.')
+        reprs = board._reprs
+        try:
+            matrix = [[reprs.index(char) for char in line] for line in lines]
+        except ValueError:
+            raise ValueError('Invalid board symbols.')
+        board.reset()
+        board.set_matrix(matrix)
+    return board
+
+
+def _is_move(move, board):
+    def is_index(value, size):
+        return type(value) is int and 0 <= value < size
+
+    if hasattr(board, 'has_gravity'):
+        return is_index(move, board.cols)
+    else:
+        return isinstance(move, tuple) and len(move) == 2 \
+            and is_index(move[0], board.rows) \
+            and is_index(move[1], board.cols)
+
+
+# ======================================================================
+def read_positions(file_obj):
+    """
+    Read the positions from a stream, one per line.
+
+    Each line is either the position text (see `parse_position()`) or a
+    JSON object with the `position` and (optionally) its `id`.
+    Without an explicit `id`, the line number (starting from 0) is used.
+
+    Yields:
+        result (tuple): The position id, text and error (None if the line
+            is valid, otherwise the text is None).
+    """
+    for i, line in enumerate(file_obj):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('{'):
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield i, None, 'Invalid JSON.'
+                continue
+            id_ = item.get('id', i)
+            if not isinstance(id_, (str, int)):
+                yield i, None, 'Invalid id.'
+            elif not isinstance(item.get('position'), (str, list)):
+                yield id_, None, 'Missing position.'
+            else:
+                yield id_, str(item['position']), None
+        else:
+            yield i, line, None
+
+
+# ======================================================================
+def read_done(filepath):
+    """Read the ids of the positions already analyzed in a JSONL file."""
+    done = set()
+    if filepath and os.path.isfile(filepath):
+        with open(filepath, 'r') as file_obj:
+            for line in file_obj:
+                try:
+                    done.add(json.loads(line)['id'])
+                except (ValueError, KeyError):
+                    # : e.g. a truncated last line after a crash
+                    pass
+    return done
+
+
+# ======================================================================
+def _to_json(move):
+    return list(move) if isinstance(move, tuple) else move
+
+
+def analyze_position(
+        id_,
+        text,
+        shape,
+        ai_mode,
+        ai_timeout=None,
+        max_depth=None,
+        max_nodes=None,
+        ai=None):
+    """
+    Analyze a position.
+
+    Args:
+        id_ (Any): The position id.
+        text (str): The position (see `parse_position()`).
+        shape (dict): The board shape (as in `make_board()`).
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        ai_timeout (float|None): The maximum duration in sec.
+        max_depth (int|None): The maximum search depth.
+        max_nodes (int|None): The maximum number of nodes.
+        ai (GameAi|None): The AI instance (of the class of `ai_mode`).
+            If None, a new one is created.
+
+    Returns:
+        result (dict): The position id and either the `error` or the
+            `winner` (if the game is over) or the `best_move`, `score`,
+            `depth`, `nodes` and `time` of the search.
+    """
+    result = dict(id=id_)
+    try:
+        board = parse_position(text, make_board(**shape))
+    except (ValueError, SyntaxError) as e:
+        result.update(error=str(e))
+        return result
+    winner = board.winner()
+    if winner != board.EMPTY or board.is_full():
+        result.update(winner=int(winner))
+        return result
+    if ai is None:
+        ai = AI_MODES[ai_mode]['ai_class']()
+    begin_time = time.time()
+    move = ai.get_best_move(
+        board, ai_timeout, AI_MODES[ai_mode]['ai_method'],
+        max_depth=max_depth, max_nodes=max_nodes, verbose=False, stats=True)
+    stats = ai.stats
+    result.update(
+        best_move=_to_json(move),
+        score=int(stats.best_value) if stats.best_value is not None else None,
+        depth=stats.depth,
+        nodes=stats.total_nodes,
+        time=time.time() - begin_time)
+    return result
+
+
+# ======================================================================
+def mnk_game_analyze(
+        rows,
+        cols,
+        num_win,
+        gravity,
+        ai_mode,
+        ai_timeout,
+        verbose=D_VERB_LVL,
+        pretty=True,
+        input_filepath=None,
+        output_filepath=None,
+        num_workers=None,
+        max_depth=None,
+        max_nodes=None,
+        *_args,
+        **_kws):
+    """
+    Analyze positions in batch, without interaction.
+
+    The positions are read from the input (see `read_positions()`) and
+    analyzed on a pool of processes, each with the given budget.
+    The results are appended as JSONL to the output as they complete
+    (see `analyze_position()`), hence not necessarily in input order.
+    The positions whose id is already in the output are skipped, so that
+    an interrupted analysis can be resumed.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        num_win (int): The number of aligned pieces required for winning.
+        gravity (bool): Whether to use the gravity rule.
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        ai_timeout (float|None): The maximum duration per position in sec.
+        verbose (int): The level of verbosity.
+        pretty (bool): Whether to use terminal formatting.
+        input_filepath (str|None): The input path. If None, use stdin.
+        output_filepath (str|None): The output path. If None, use stdout.
+        num_workers (int|None): The number of worker processes.
+            If None, the number of CPUs is used.
+        max_depth (int|None): The maximum search depth per position.
+        max_nodes (int|None): The maximum number of nodes per position.
+
+    Returns:
+        None.
+    """
+    shape = dict(rows=rows, cols=cols, num_win=num_win, gravity=gravity)
+    num_workers = num_workers or os.cpu_count()
+    done = read_done(output_filepath)
+    in_file = open(input_filepath, 'r') if input_filepath else sys.stdin
+    out_file = open(output_filepath, 'a+') if output_filepath else sys.stdout
+    if output_filepath and out_file.tell() > 0:
+        out_file.seek(out_file.tell() - 1)
+        if out_file.read(1) != '\n':
+            # : terminate the truncated last line
+            out_file.write('\n')
+    num_results = num_skipped = 0
+    try:
+        with ProcessPoolExecutor(num_workers) as executor:
+            max_pending = NUM_PENDING * num_workers
+            pending = set()
+            ids = {}
+            for id_, text, error in read_positions(in_file):
+                if id_ in done:
+                    num_skipped += 1
+                    continue
+                if error is not None:
+                    out_file.write(
+                        json.dumps(dict(id=id_, error=error)) + '\n')
+                    num_results += 1
+                    continue
+                future = executor.submit(
+                    analyze_position, id_, text, shape, ai_mode,
+                    ai_timeout, max_depth, max_nodes)
+                ids[future] = id_
+                pending.add(future)
+                while len(pending) >= max_pending:
+                    completed, pending = wait(
+                        pending, return_when=FIRST_COMPLETED)
+                    num_results += _write(completed, ids, out_file)
+            while pending:
+                completed, pending = wait(
+                    pending, return_when=FIRST_COMPLETED)
+                num_results += _write(completed, ids, out_file)
+    finally:
+        if input_filepath:
+            in_file.close()
+        if output_filepath:
+            out_file.close()
+    msg(f'I: Analyzed: {num_results}, Skipped: {num_skipped}',
+        verbose, D_VERB_LVL, fmtt=pretty, file=sys.stderr)
+
+
+def _write(futures, ids, file_obj):
+    for future in futures:
+        id_ = ids.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            # : a failed position does not stop the others
+            result = dict(id=id_, error=repr(e))
+        file_obj.write(json.dumps(result) + '\n')
+    file_obj.flush()
+    return len(futures)
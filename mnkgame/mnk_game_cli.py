@@ -2,13 +2,14 @@
 # -*- coding: utf-8 -*-
 
 import ast  # Abstract Syntax Trees
-import pickle
 
 from mnkgame import prettify
 from mnkgame import D_VERB_LVL
 from mnkgame import msg
 
-from mnkgame.util import make_board
+from mnkgame.util import make_board, Ponder
+from mnkgame.GameRecord import GameRecord, save_records, load_records
+from mnkgame.GameClock import GameClock, TimeManager
 from mnkgame.util import AI_MODES, ALIASES, USER_INTERFACES
 
 
@@ -132,23 +133,50 @@ def mnk_game_cli(
         ai_timeout,
         computer_plays,
         pretty,
-        verbose):
+        verbose,
+        ponder=False,
+        time_control=None):
     ai_class = AI_MODES[ai_mode]['ai_class']
     ai_method = AI_MODES[ai_mode]['ai_method']
+    ai = ai_class()
+    ponderer = None
     board = make_board(rows, cols, num_win, gravity)
     undo_history = []
     redo_history = []
-    filepath = 'mnkgame-saved.pickle'
+    filepath = 'mnkgame-saved.mnk'
     choice = 'n'
     continue_game = True
     first_computer_plays = computer_plays
+    clock = GameClock.from_text(time_control) if time_control else None
     while continue_game:
         if choice not in {None, 's'}:
             print('\n' + colorized_board(board, pretty), sep='')
+            if clock is not None:
+                msg('Clock: ' + '  '.join(
+                    f'{board._reprs[turn]} {clock.format(turn)}'
+                    for turn in board.TURNS), fmtt=pretty)
+        if clock is not None and clock.turn != board.next_turn():
+            clock.start(board.next_turn())
         if computer_plays:
-            choice = ai_class().get_best_move(
-                board, ai_timeout, ai_method, max_depth=-1,
-                verbose=verbose >= D_VERB_LVL)
+            choice = None
+            if ponderer is not None:
+                if undo_history and not board.is_empty():
+                    choice = ponderer.get_move(undo_history[-1], ai_timeout)
+                    if choice is not None:
+                        msg('I: Ponder hit!', fmtt=pretty)
+                else:
+                    ponderer.stop()
+                ponderer = None
+            if choice is None:
+                time_manager = TimeManager.from_clock(
+                    clock, board.next_turn(), ai_timeout) \
+                    if clock is not None else None
+                choice = ai.get_best_move(
+                    board, ai_timeout, ai_method, max_depth=-1,
+                    verbose=verbose >= D_VERB_LVL,
+                    stats=verbose > D_VERB_LVL, time_manager=time_manager)
+                if verbose > D_VERB_LVL:
+                    print(ai.stats.to_json())
         else:
             menu_choices = dict(
                 q='quit', n='new game', l='load game', s='save game',
@@ -159,6 +187,9 @@ def mnk_game_cli(
             else:
                 choice = get_human_move(
                     board, menu_choices, 0, False, pretty=pretty)
+            if ponderer is not None and choice in menu_choices:
+                ponderer.stop()
+                ponderer = None
             if choice == 'q':
                 break
             elif choice == 'n':
@@ -166,23 +197,27 @@ def mnk_game_cli(
                 first_computer_plays = not first_computer_plays
                 computer_plays = first_computer_plays
                 board.reset()
+                if clock is not None:
+                    clock.reset()
             elif choice == 'l':
-                with open(filepath, 'rb') as file_obj:
-                    data = pickle.load(file_obj)
-                undo_history = data.pop('undo_history')
-                redo_history = data.pop('redo_history')
-                computer_plays = data.pop('computer_plays')
-                board = make_board(**data)
-                board.do_moves(undo_history)
-                board.undo_moves(redo_history)
+                try:
+                    records = load_records(filepath)
+                except (OSError, ValueError) as e:
+                    msg(f'W: Cannot load data from: `{filepath}` ({e})')
+                    continue
+                if not records:
+                    msg(f'W: No game in: `{filepath}`')
+                    continue
+                record = records[-1]
+                undo_history, redo_history = record.histories()
+                computer_plays = record.computer_plays
+                board = record.to_board()
+                if clock is not None:
+                    clock.reset()
                 msg('Load data from: `{}`'.format(filepath))
             elif choice == 's':
-                data = dict(
-                    rows=board.rows, cols=board.cols,
-                    num_win=board.num_win, gravity=board.gravity,
-                    undo_history=undo_history, redo_history=redo_history,
-                    computer_plays=computer_plays)
-                pickle.dump(data, open(filepath, 'wb+'))
+                save_records(filepath, [GameRecord.from_histories(
+                    board, undo_history, redo_history, computer_plays)])
                 msg('Save data to: `{}`'.format(filepath))
             elif choice == 'u':
                 if undo_history:
@@ -201,13 +236,26 @@ def mnk_game_cli(
             elif choice == 'w':
                 msg('I: switching sides (computer plays)!', fmtt=pretty)
             elif choice == 'h':
-                move = ai_class().get_best_move(
+                move = ai.get_best_move(
                     board, ai_timeout, ai_method, max_depth=-1,
                     verbose=True)
                 msg('I: Best move for computer: ' + str(move), fmtt=pretty)
                 choice = None
         if not isinstance(choice, str) or choice not in 'lsur':
+            if clock is not None and clock.turn is not None \
+                    and choice is not None and not isinstance(choice, str):
+                turn = clock.turn
+                clock.stop()
+                if clock.is_flagged(turn):
+                    msg(f'W: {board._reprs[turn]} is out of time!',
+                        fmtt=pretty)
             continue_game = handle_move(
                 board, choice, computer_plays, undo_history, redo_history,
                 True, pretty)
+            if clock is not None and board.is_empty():
+                clock.reset()
+            if ponder and computer_plays and not board.is_empty():
+                ponderer = Ponder(
+                    ai, board, ai_timeout, ai_method, last_move=choice)
+                ponderer.start()
             computer_plays = not computer_plays
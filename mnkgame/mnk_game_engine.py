@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+
+from mnkgame import INFO
+from mnkgame import D_VERB_LVL
+
+from mnkgame.GameClock import TimeManager
+from mnkgame.util import make_board
+from mnkgame.util import AI_MODES
+
+# the fraction of the time limits actually used for searching
+TIME_MARGIN = 0.8
+# the estimated memory of the process (without the AI tables) in bytes
+BASE_MEMORY = 64 * 2 ** 20
+# the estimated memory per entry of the AI tables in bytes
+BYTES_PER_ENTRY = 256
+
+
+# ======================================================================
+class GomocupEngine(object):
+    """
+    Engine speaking the Gomocup (Piskvork) protocol.
+
+    The coordinates are `x,y` with `x` the column and `y` the row (with
+    gravity, only `x` is used).
+    The AI instance (and its tables) is kept between the turns.
+
+    Args:
+        rows (int): The number of rows (until `START` or `RECTSTART`).
+        cols (int): The number of columns (until `START` or `RECTSTART`).
+        num_win (int): The number of aligned pieces required for winning.
+        gravity (bool): Whether to use the gravity rule.
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        ai_timeout (float): The time per move in sec (until `INFO`).
+    """
+
+    def __init__(
+            self,
+            rows,
+            cols,
+            num_win,
+            gravity,
+            ai_mode,
+            ai_timeout):
+        self.num_win = num_win
+        self.gravity = gravity
+        self.ai_class = AI_MODES[ai_mode]['ai_class']
+        self.ai_method = AI_MODES[ai_mode]['ai_method']
+        self.ai = self.ai_class()
+        self.board = make_board(rows, cols, num_win, gravity)
+        self.info = dict(timeout_turn=ai_timeout * 1000)
+        self._board_lines = None
+        self.is_done = False
+
+    # ------------------------------------------------------------------
+    def _to_move(self, text):
+        x, y = [int(v) for v in text.split(',')[:2]]
+        return x if self.gravity else (y, x)
+
+    def _from_move(self, move):
+        if self.gravity:
+            row = self.board.rows - self.board._column_heights[move]
+            return f'{move},{row}'
+        else:
+            return f'{move[1]},{move[0]}'
+
+    def _search_kws(self):
+        info = self.info
+        max_move_time = info.get('timeout_turn', 0) / 1000 * TIME_MARGIN
+        if info.get('timeout_match') and 'time_left' in info:
+            time_manager = TimeManager(
+                info['time_left'] / 1000 * TIME_MARGIN, 0.0,
+                max_move_time or None)
+            return dict(max_duration=None, time_manager=time_manager)
+        elif max_move_time:
+            return dict(max_duration=max_move_time)
+        else:
+            # : as fast as possible
+            return dict(max_duration=None, max_depth=1)
+
+    def _set_memory(self, max_memory):
+        if max_memory > 0 and hasattr(self.ai, 'max_cache_size'):
+            self.ai.max_cache_size = max(
+                1, (max_memory - BASE_MEMORY) // BYTES_PER_ENTRY)
+
+    def play(self):
+        """
+        Search and play the engine move.
+
+        The time is allocated by a `TimeManager` with a match time limit,
+        otherwise the time per turn is used.
+        """
+        move = self.ai.get_best_move(
+            self.board, method=self.ai_method, verbose=False,
+            **self._search_kws())
+        self.board.do_move(move)
+        return self._from_move(move)
+
+    def _reset(self, rows, cols):
+        self.board = make_board(rows, cols, self.num_win, self.gravity)
+        if hasattr(self.ai, 'clear_cache'):
+            self.ai.clear_cache()
+
+    # ------------------------------------------------------------------
+    def handle(self, line):
+        """
+        Handle a line of the protocol.
+
+        Args:
+            line (str): The input line.
+
+        Returns:
+            result (list[str]): The output lines.
+        """
+        line = line.strip()
+        if self._board_lines is not None:
+            return self._handle_board_line(line)
+        command, _, arg = line.partition(' ')
+        command = command.upper()
+        try:
+            if command == 'START':
+                size = int(arg)
+                self._reset(size, size)
+                return ['OK']
+            elif command == 'RECTSTART':
+                cols, rows = [int(x) for x in arg.split(',')]
+                self._reset(rows, cols)
+                return ['OK']
+            elif command == 'RESTART':
+                self._reset(self.board.rows, self.board.cols)
+                return ['OK']
+            elif command == 'BEGIN':
+                return [self.play()]
+            elif command == 'TURN':
+                if not self.board.do_move(self._to_move(arg)):
+                    return [f'ERROR invalid move {arg}']
+                return [self.play()]
+            elif command == 'TAKEBACK':
+                if not self.board.undo_move(self._to_move(arg)):
+                    return [f'ERROR invalid move {arg}']
+                return ['OK']
+            elif command == 'BOARD':
+                self._board_lines = []
+                return []
+            elif command == 'INFO':
+                key, _, value = arg.partition(' ')
+                if key in ('timeout_turn', 'timeout_match', 'time_left'):
+                    self.info[key] = int(value)
+                elif key == 'max_memory':
+                    self._set_memory(int(value))
+                return []
+            elif command == 'ABOUT':
+                return [
+                    f'name="{INFO["name"]}", version="{INFO["version"]}", '
+                    f'author="{INFO["author"]}"']
+            elif command == 'END':
+                self.is_done = True
+                return []
+            else:
+                return [f'UNKNOWN {command}']
+        except ValueError as e:
+            return [f'ERROR {e}']
+
+    def _handle_board_line(self, line):
+        if line.upper() != 'DONE':
+            self._board_lines.append(line)
+            return []
+        # : own stones are `1`, the opponent stones are `2` (or `3`)
+        stones = {1: [], 2: []}
+        for item in self._board_lines:
+            x, y, field = [int(v) for v in item.split(',')]
+            stones[1 if field == 1 else 2].append((y, x))
+        self._board_lines = None
+        # : the engine is to move, i.e. it has not more stones
+        if len(stones[1]) == len(stones[2]):
+            own, other = self.board.TURNS
+        else:
+            other, own = self.board.TURNS
+        matrix = [[self.board.EMPTY] * self.board.cols
+                  for _ in range(self.board.rows)]
+        for turn, coords in ((own, stones[1]), (other, stones[2])):
+            for row, col in coords:
+                matrix[row][col] = turn
+        self.board.set_matrix(matrix)
+        return [self.play()]
+
+    def run(self, in_file=sys.stdin, out_file=sys.stdout):
+        for line in in_file:
+            for output in self.handle(line):
+                print(output, file=out_file, flush=True)
+            if self.is_done:
+                break
+
+
+# ======================================================================
+def mnk_game_engine(
+        rows,
+        cols,
+        num_win,
+        gravity,
+        ai_mode,
+        ai_timeout,
+        verbose=D_VERB_LVL,
+        *_args,
+        **_kws):
+    """
+    Run the engine on stdin/stdout with the Gomocup protocol.
+
+    Args:
+        rows (int): The number of rows.
+        cols (int): The number of columns.
+        num_win (int): The number of aligned pieces required for winning.
+        gravity (bool): Whether to use the gravity rule.
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        ai_timeout (float): The time per move in sec (until `INFO`).
+        verbose (int): The level of verbosity.
+
+    Returns:
+        None.
+    """
+    engine = GomocupEngine(rows, cols, num_win, gravity, ai_mode, ai_timeout)
+    engine.run()
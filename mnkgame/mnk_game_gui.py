@@ -5,7 +5,7 @@
 """
 import os
 import warnings
-import pickle
+import colorsys
 
 try:
     import queue
@@ -35,8 +35,15 @@ from mnkgame import D_VERB_LVL, VERB_LVL, VERB_LVL_NAMES
 from mnkgame import msg
 from mnkgame import INFO, PATH
 from mnkgame import print_greetings, prettify, MY_GREETINGS
-from mnkgame.util import make_board, guess_alias, AskAiMove
+from mnkgame.util import make_board, guess_alias, AskAiMove, Ponder
+from mnkgame.util import AskAiMoveScores
 from mnkgame.util import AI_MODES, ALIASES, USER_INTERFACES
+from mnkgame.GameRecord import GameRecord, save_records, load_records, EXTS
+
+# the file types of the game records in the file dialogs
+GAME_RECORD_FILETYPES = [
+    ('Game Record', '*' + EXTS['binary']),
+    ('Game Record (Text)', '*' + EXTS['text'])]
 
 
 # ======================================================================
@@ -113,6 +120,22 @@ def center(target, reference=None):
     target.geometry(str(target_geometry.set_to_center(geometry)))
 
 
+# ======================================================================
+def heat_color(value, lightness=0.75):
+    """
+    Compute the color of a heatmap value.
+
+    Args:
+        value (float): The value in the [0, 1] range (from red to green).
+        lightness (float): The lightness in the [0, 1] range.
+
+    Returns:
+        color (str): The Tk color string.
+    """
+    rgb = colorsys.hls_to_rgb(value / 3, lightness, 1.0)
+    return '#' + ''.join('{:02x}'.format(int(255 * x)) for x in rgb)
+
+
 # ======================================================================
 class Geometry(object):
     def __init__(
@@ -233,6 +256,7 @@ class FrameBoard(tk.Frame):
         self.rows = self.parent.board.rows
         self.cols = self.parent.board.cols
         self.enabled = True
+        self.has_heatmap = False
         linewidth = 0.5 * (self.border * (
                 (self.height / self.rows) + (self.width / self.cols)))
         self.config(dict(highlightthickness=linewidth))
@@ -270,6 +294,8 @@ class FrameBoard(tk.Frame):
         self.refresh()
 
     def refresh(self, event=None):
+        if self.has_heatmap:
+            self.hide_heatmap()
         for i in range(self.rows):
             for j in range(self.cols):
                 if self.board.matrix[i, j] == self.board.TURNS[0] \
@@ -315,6 +341,43 @@ class FrameBoard(tk.Frame):
         else:
             self.highlight(None, (move, move))
 
+    def move_cells(self, move):
+        if hasattr(self.board, 'has_gravity'):
+            return [self.cvsMatrix[i, move] for i in range(self.rows)]
+        else:
+            return [self.cvsMatrix[move]]
+
+    def show_heatmap(self, move_scores):
+        """
+        Color the cells according to the scores of the moves.
+
+        The colors depend on the rank of the scores (from red, the worst,
+        to green, the best), so that win scores do not flatten the others.
+
+        Args:
+            move_scores (Iterable[tuple]): The moves and their scores,
+                as returned by `GameAiSearchTree.get_move_scores()`.
+        """
+        self.hide_heatmap()
+        values = sorted(set(
+            val for _, val, *_ in move_scores if val is not None))
+        for move, val, *_ in move_scores:
+            if val is not None:
+                rank = values.index(val)
+                color = heat_color(
+                    rank / (len(values) - 1) if len(values) > 1 else 1.0)
+                for cvs in self.move_cells(move):
+                    cvs.background = color
+                    cvs.normal()
+        self.has_heatmap = True
+
+    def hide_heatmap(self):
+        for i in range(self.rows):
+            for j in range(self.cols):
+                self.cvsMatrix[i, j].background = 'white'
+                self.cvsMatrix[i, j].normal()
+        self.has_heatmap = False
+
 
 # ======================================================================
 class CanvasCell(tk.Canvas):
@@ -493,6 +556,9 @@ class WinMain(ttk.Frame):
         self.computer_plays = _kws['computer_plays']
         self.ai_class = AI_MODES[self.ai_mode.get()]['ai_class']
         self.ai_method = AI_MODES[self.ai_mode.get()]['ai_method']
+        self.ai = self.ai_class()
+        self.ponder = _kws['ponder']
+        self.ponderer = None
         self.board = make_board(
             self.rows.get(), self.cols.get(), self.num_win.get(),
             self.gravity.get())
@@ -642,6 +708,7 @@ class WinMain(ttk.Frame):
         self.bind_all("<Control-question>", self.about)
 
     def new_game(self, event=None):
+        self.stop_pondering()
         self.first_computer_plays = not self.first_computer_plays
         self.computer_plays = self.first_computer_plays
         self.board.reset()
@@ -651,8 +718,9 @@ class WinMain(ttk.Frame):
         if self.computer_plays:
             self.computer_moves()
 
-    def prepare_game(self, **_kws):
-        self.board = make_board(**_kws)
+    def prepare_game(self, board=None, **_kws):
+        self.stop_pondering()
+        self.board = board if board is not None else make_board(**_kws)
         self.rows.set(self.board.rows)
         self.cols.set(self.board.cols)
         self.num_win.set(self.board.num_win)
@@ -694,37 +762,43 @@ class WinMain(ttk.Frame):
 
     def load_game(self, event=None):
         filepath = filedialog.askopenfilename(
-            parent=self, title='Open Game File', defaultextension='.pickle',
-            initialdir=PATH['data'],
-            filetypes=[('Python Pickle', '*.pickle')])
+            parent=self, title='Open Game File',
+            defaultextension=EXTS['binary'], initialdir=PATH['data'],
+            filetypes=GAME_RECORD_FILETYPES)
         if os.path.isfile(filepath):
-            with open(filepath, 'rb') as file_obj:
-                data = pickle.load(file_obj)
-            self.undo_history = data.pop('undo_history')
-            self.redo_history = data.pop('redo_history')
-            self.computer_plays = data.pop('computer_plays')
-            self.prepare_game(**data)
-            self.board.do_moves(self.undo_history)
-            self.board.undo_moves(self.redo_history)
+            try:
+                records = load_records(filepath)
+            except ValueError as e:
+                messagebox.showwarning('Open Game File', str(e))
+                return
+            if not records:
+                messagebox.showwarning(
+                    'Open Game File', f'No game in `{filepath}`.')
+                return
+            self.stop_pondering()
+            record = records[-1]
+            self.undo_history, self.redo_history = record.histories()
+            self.computer_plays = record.computer_plays
+            self.prepare_game(board=record.to_board())
             self.frmBoard.refresh()
 
     def save_game(self, event=None):
         filepath = filedialog.asksaveasfilename(
-            parent=self, title='Save Game File', defaultextension='.pickle',
-            initialdir=PATH['data'],
-            filetypes=[('Python Pickle', '*.pickle')])
-        data = dict(
-            rows=self.rows.get(), cols=self.cols.get(),
-            num_win=self.num_win.get(), gravity=self.gravity.get(),
-            undo_history=self.undo_history, redo_history=self.redo_history,
-            computer_plays=self.computer_plays)
-        pickle.dump(data, open(filepath, 'wb+'))
+            parent=self, title='Save Game File',
+            defaultextension=EXTS['binary'], initialdir=PATH['data'],
+            filetypes=GAME_RECORD_FILETYPES)
+        if filepath:
+            save_records(filepath, [GameRecord.from_histories(
+                self.board, self.undo_history, self.redo_history,
+                self.computer_plays)])
 
     def exit(self, event=None):
         if messagebox.askokcancel('Exit', 'Are you sure you want to exit?'):
+            self.stop_pondering()
             self.parent.destroy()
 
     def undo_move(self, event=None):
+        self.stop_pondering()
         if self.undo_history:
             move = self.undo_history.pop(-1)
             self.board.undo_move(move)
@@ -734,6 +808,7 @@ class WinMain(ttk.Frame):
             self.frmBoard.refresh()
 
     def redo_move(self, event=None):
+        self.stop_pondering()
         if self.redo_history:
             move = self.redo_history.pop(-1)
             self.board.do_move(move)
@@ -743,6 +818,7 @@ class WinMain(ttk.Frame):
 
     def switch_sides(self, event=None):
         if self.frmBoard.enabled:
+            self.stop_pondering()
             self.computer_plays = not self.computer_plays
             self.computer_moves()
 
@@ -755,20 +831,48 @@ class WinMain(ttk.Frame):
         except queue.Empty:
             self.parent.after(100, self.process_hint)
 
+    def process_analysis(self):
+        try:
+            move_scores = self.ai_queue.get(0)
+            if not move_scores:
+                return
+            self.frmBoard.show_heatmap(move_scores)
+            self.frmBoard.highlight_move(move_scores[0][0])
+            text = '\n'.join(
+                '{}: {} (depth {}), PV: {}'.format(
+                    move, val, depth, ' '.join(str(x) for x in pv))
+                for move, val, is_exact, depth, pv in move_scores
+                if is_exact)
+            messagebox.showinfo(
+                'Hint', 'Suggested move: {}\n\n{}'.format(
+                    move_scores[0][0], text))
+        except queue.Empty:
+            self.parent.after(100, self.process_analysis)
+
     def hint(self, event=None):
-        def refresh_status(**_kws):
-            self.statusbar.content.set(_kws['feedback'])
+        def refresh_status(stats):
+            self.statusbar.content.set(stats.feedback())
 
+        self.stop_pondering()
         self.ai_queue = queue.Queue()
-        thread = AskAiMove(
-            self.ai_queue, self.board, self.ai_timeout.get(),
-            self.ai_class, self.ai_method, refresh_status, self.verbose)
-        thread.start()
-        self.parent.after(100, self.process_hint)
+        if hasattr(self.ai_class, 'get_move_scores'):
+            thread = AskAiMoveScores(
+                self.ai_queue, self.board, self.ai_timeout.get(),
+                self.ai_class, self.ai_method, verbose=self.verbose)
+            thread.start()
+            self.parent.after(100, self.process_analysis)
+        else:
+            thread = AskAiMove(
+                self.ai_queue, self.board, self.ai_timeout.get(),
+                self.ai_class, self.ai_method, refresh_status, self.verbose)
+            thread.start()
+            self.parent.after(100, self.process_hint)
 
     def change_ai_mode(self, event=None):
+        self.stop_pondering()
         self.ai_class = AI_MODES[self.ai_mode.get()]['ai_class']
         self.ai_method = AI_MODES[self.ai_mode.get()]['ai_method']
+        self.ai = self.ai_class()
 
     def change_ai_timeout(self, event=None):
         ai_timeout = simpledialog.askfloat(
@@ -790,6 +894,18 @@ class WinMain(ttk.Frame):
             + 3.5 * self.font.metrics('linespace'))
         self.parent.geometry(new_geometry)
 
+    def start_pondering(self):
+        if self.ponder:
+            self.ponderer = Ponder(
+                self.ai, self.board, self.ai_timeout.get(), self.ai_method,
+                last_move=self.undo_history[-1])
+            self.ponderer.start()
+
+    def stop_pondering(self):
+        if self.ponderer is not None:
+            self.ponderer.stop()
+            self.ponderer = None
+
     def process_computer_move(self):
         try:
             move = self.ai_queue.get(0)
@@ -801,6 +917,9 @@ class WinMain(ttk.Frame):
                 else:
                     self.redo_history = []
                 self.frmBoard.refresh()
+                if self.board.winner(self.board.turn) != self.board.turn \
+                        and not self.board.is_full():
+                    self.start_pondering()
                 self.check_win()
             self.frmBoard.unfreeze()
             # self.frmBoard.normal()
@@ -808,16 +927,26 @@ class WinMain(ttk.Frame):
             self.parent.after(100, self.process_computer_move)
 
     def computer_moves(self):
-        def refresh_status(**_kws):
-            self.statusbar.content.set(_kws['feedback'])
+        def refresh_status(stats):
+            self.statusbar.content.set(stats.feedback())
 
         if not self.board.is_full() and self.computer_plays:
             self.frmBoard.freeze()
             self.ai_queue = queue.Queue()
-            thread = AskAiMove(
-                self.ai_queue, self.board, self.ai_timeout.get(),
-                self.ai_class, self.ai_method, refresh_status, self.verbose)
-            thread.start()
+            move = None
+            if self.ponderer is not None and self.undo_history:
+                move = self.ponderer.get_move(
+                    self.undo_history[-1], self.ai_timeout.get())
+            self.stop_pondering()
+            if move is not None:
+                self.statusbar.content.set('Ponder hit: {}'.format(move))
+                self.ai_queue.put(move)
+            else:
+                thread = AskAiMove(
+                    self.ai_queue, self.board, self.ai_timeout.get(),
+                    self.ai_class, self.ai_method, refresh_status,
+                    self.verbose, self.ai)
+                thread.start()
             self.parent.after(100, self.process_computer_move)
 
     def check_win(self):
@@ -860,4 +989,4 @@ if __name__ == '__main__':
         rows=6, cols=7, num_win=4, gravity=True,
         # rows=3, cols=3, num_win=3, gravity=False,
         ai_mode='caching', computer_plays=False,
-        ai_timeout=1.0, verbose=VERB_LVL['lowest'])
+        ai_timeout=1.0, verbose=VERB_LVL['lowest'], ponder=False)
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from mnkgame import D_VERB_LVL
+from mnkgame import msg
+
+from mnkgame.Board import line_windows, cell_windows
+from mnkgame.util import make_board
+from mnkgame.util import AI_MODES
+from mnkgame.util import NUM_ANALYSIS_PV
+from mnkgame.mnk_game_analyze import parse_position
+from mnkgame.mnk_game_analyze import analyze_position
+
+# the default address (only the local host)
+HOST = '127.0.0.1'
+PORT = 8765
+# the commands served (as `POST /<command>`)
+COMMANDS = ('best_move', 'analyze', 'solve')
+# the number of requests queued per worker before rejecting new ones
+NUM_PENDING = 4
+# the number of answers kept in the cache
+CACHE_SIZE = 1024
+# the number of warm engines (i.e. shapes and AI modes) kept per worker
+MAX_ENGINES = 8
+# the additional time given to the workers before a request times out
+TIMEOUT_MARGIN = 1.0
+# the maximum size of a request body in bytes
+MAX_BODY_SIZE = 2 ** 20
+# the maximum number of rows and columns of the requests
+MAX_SIZE = 32
+# the maximum search duration of the requests in sec
+MAX_TIMEOUT = 60.0
+
+# the warm engines of the worker process
+_ENGINES = collections.OrderedDict()
+
+
+# ======================================================================
+def _init_worker(shapes):
+    for shape in shapes:
+        cell_windows(shape['rows'], shape['cols'], shape['num_win'])
+        line_windows(shape['rows'], shape['cols'], shape['num_win'])
+
+
+def _get_engine(shape, ai_mode):
+    key = tuple(sorted(shape.items())) + (ai_mode,)
+    if key in _ENGINES:
+        _ENGINES.move_to_end(key)
+    else:
+        _ENGINES[key] = AI_MODES[ai_mode]['ai_class']()
+        if len(_ENGINES) > MAX_ENGINES:
+            _ENGINES.popitem(last=False)
+    return _ENGINES[key]
+
+
+def _parse_bool(value):
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ('true', '1', 'yes'):
+            return True
+        elif value in ('false', '0', 'no'):
+            return False
+    elif isinstance(value, (bool, int)) and value in (0, 1):
+        return bool(value)
+    raise ValueError(f'Invalid boolean `{value}`.')
+
+
+def _to_json(move):
+    return list(move) if isinstance(move, tuple) else move
+
+
+def run_request(command, shape, ai_mode, params):
+    """
+    Run a request on the warm engine of the worker process.
+
+    The engines (hence their tables) are kept per shape and AI mode.
+
+    Args:
+        command (str): The command (see `COMMANDS`).
+        shape (dict): The board shape (as in `make_board()`).
+        ai_mode (str): The AI mode (see `AI_MODES`).
+        params (dict): The request parameters: `position` (see
+            `parse_position()`), `timeout`, `max_depth`, `max_nodes` and
+            (for `analyze`) `num_pv`.
+
+    Returns:
+        result (dict): The answer, with either the `error` or the `winner`
+            (if the game is over) or the search results.
+    """
+    ai = _get_engine(shape, ai_mode)
+    if command == 'best_move':
+        result = analyze_position(
+            params.get('id'), params['position'], shape, ai_mode,
+            params['timeout'], params.get('max_depth'),
+            params.get('max_nodes'), ai)
+        result.pop('id')
+        return result
+    try:
+        board = parse_position(params['position'], make_board(**shape))
+    except (ValueError, SyntaxError) as e:
+        return dict(error=str(e))
+    winner = board.winner()
+    if winner != board.EMPTY or board.is_full():
+        return dict(winner=int(winner))
+    method = AI_MODES[ai_mode]['ai_method']
+    if command == 'analyze':
+        if not hasattr(ai, 'get_move_scores'):
+            return dict(error=f'AI mode `{ai_mode}` cannot analyze.')
+        scores = ai.get_move_scores(
+            board, params['timeout'], method,
+            max_depth=params.get('max_depth'),
+            num_pv=params.get('num_pv', NUM_ANALYSIS_PV),
+            max_nodes=params.get('max_nodes'), stats=True)
+        return dict(
+            moves=[
+                dict(move=_to_json(move),
+                     score=int(val) if val is not None else None,
+                     exact=is_exact, depth=depth,
+                     pv=[_to_json(x) for x in pv])
+                for move, val, is_exact, depth, pv in scores],
+            nodes=ai.stats.total_nodes, time=ai.stats.elapsed)
+    else:  # if command == 'solve':
+        move = ai.get_best_move(
+            board, params['timeout'], method,
+            max_depth=params.get('max_depth'),
+            max_nodes=params.get('max_nodes'), verbose=False,
+            tactical=False, stats=True)
+        stats = ai.stats
+        value = stats.best_value
+        is_solved = value is not None and (
+            board.is_win_score(value)
+            or stats.depth >= board.num_moves_left())
+        if not is_solved:
+            outcome = None
+        elif value > 0:
+            outcome = 'win'
+        elif value < 0:
+            outcome = 'loss'
+        else:
+            outcome = 'draw'
+        return dict(
+            best_move=_to_json(move), solved=is_solved, outcome=outcome,
+            score=int(value) if value is not None else None,
+            depth=stats.depth, nodes=stats.total_nodes, time=stats.elapsed)
+
+
+# ======================================================================
+class EngineServer(ThreadingHTTPServer):
+    """
+    HTTP server answering JSON requests with a pool of warm engines.
+
+    The requests are `POST /<command>` (see `COMMANDS`) with a JSON
+    object holding the `position` and, optionally, the shape (`rows`,
+    `cols`, `num_win`, `gravity`), the `ai_mode`, the `timeout` in sec,
+    `max_depth`, `max_nodes` and `num_pv` (missing values are taken from
+    the server defaults).
+    The invalid requests, e.g. with a board larger than `MAX_SIZE` or a
+    timeout larger than `MAX_TIMEOUT`, are rejected (status 400).
+    `GET /status` reports the state of the server.
+
+    The answers are cached (least recently used are dropped first).
+    When the queue of the workers is full, the requests are rejected
+    (status 503) instead of waiting, and the requests not answered within
+    their timeout are abandoned (status 504).
+
+    Args:
+        address (tuple): The host and port (0 for any free port).
+        shape (dict): The default board shape (as in `make_board()`).
+        ai_mode (str): The default AI mode (see `AI_MODES`).
+        ai_timeout (float): The default search duration in sec.
+        num_workers (int|None): The number of worker processes.
+            If None, the number of CPUs is used.
+        cache_size (int): The number of answers kept in the cache.
+        verbose (int): The level of verbosity.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+            self,
+            address,
+            shape,
+            ai_mode,
+            ai_timeout,
+            num_workers=None,
+            cache_size=CACHE_SIZE,
+            verbose=D_VERB_LVL):
+        self.shape = shape
+        self.ai_mode = ai_mode
+        self.ai_timeout = ai_timeout
+        self.num_workers = num_workers or os.cpu_count()
+        self.cache_size = cache_size
+        self.verbose = verbose
+        self.max_pending = NUM_PENDING * self.num_workers
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = collections.Counter()
+        self.executor = ProcessPoolExecutor(
+            self.num_workers, initializer=_init_worker, initargs=([shape],))
+        super(EngineServer, self).__init__(address, EngineRequestHandler)
+
+    def server_close(self):
+        super(EngineServer, self).server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    def _parse(self, request):
+        shape = {
+            key: _parse_bool(request.get(key, value))
+            if isinstance(value, bool) else int(request.get(key, value))
+            for key, value in self.shape.items()}
+        if not (1 <= shape['rows'] <= MAX_SIZE
+                and 1 <= shape['cols'] <= MAX_SIZE):
+            raise ValueError(f'The board size must be 1 to {MAX_SIZE}.')
+        if not 1 <= shape['num_win'] <= max(shape['rows'], shape['cols']):
+            raise ValueError('Invalid number to win.')
+        ai_mode = request.get('ai_mode', self.ai_mode)
+        if ai_mode not in AI_MODES:
+            raise ValueError(f'Unknown AI mode `{ai_mode}`.')
+        if not isinstance(request.get('position'), (str, list)):
+            raise ValueError('Missing position.')
+        params = dict(
+            position=str(request['position']),
+            timeout=float(request.get('timeout', self.ai_timeout)))
+        if not 0.0 < params['timeout'] <= MAX_TIMEOUT:
+            raise ValueError(f'The timeout must be 0 to {MAX_TIMEOUT} sec.')
+        for key in ('max_depth', 'max_nodes', 'num_pv'):
+            if request.get(key) is not None:
+                params[key] = int(request[key])
+        return shape, ai_mode, params
+
+    def answer(self, command, request):
+        """
+        Answer a request.
+
+        Args:
+            command (str): The command (see `COMMANDS`).
+            request (dict): The request parameters.
+
+        Returns:
+            result (tuple): The HTTP status and the answer.
+        """
+        try:
+            shape, ai_mode, params = self._parse(request)
+        except (TypeError, ValueError) as e:
+            return 400, dict(error=str(e))
+        key = json.dumps([command, shape, ai_mode, params], sort_keys=True)
+        with self._lock:
+            self.counts['requests'] += 1
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.counts['cached'] += 1
+                return 200, self._cache[key]
+        # : backpressure, i.e. do not queue more than the workers can take
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counts['rejected'] += 1
+            return 503, dict(error='Server busy.')
+        future = self.executor.submit(
+            run_request, command, shape, ai_mode, params)
+        # : the slot is freed only when the worker is done
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(params['timeout'] + TIMEOUT_MARGIN)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self.counts['timeouts'] += 1
+            return 504, dict(error='Request timed out.')
+        except Exception as e:
+            # : e.g. a worker crash, which must not kill the handler
+            with self._lock:
+                self.counts['errors'] += 1
+            return 500, dict(error=repr(e))
+        if 'error' in result:
+            return 400, result
+        with self._lock:
+            self._cache[key] = result
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return 200, result
+
+    def status(self):
+        with self._lock:
+            return dict(
+                shape=self.shape, ai_mode=self.ai_mode,
+                workers=self.num_workers, max_pending=self.max_pending,
+                cache=len(self._cache), **self.counts)
+
+
+# ======================================================================
+class EngineRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'mnkgame'
+
+    def _reply(self, status, result):
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 503:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/status':
+            self._reply(200, self.server.status())
+        else:
+            self._reply(404, dict(error=f'Unknown path `{self.path}`.'))
+
+    def do_POST(self):
+        command = self.path.strip('/')
+        if command not in COMMANDS:
+            self._reply(404, dict(error=f'Unknown command `{command}`.'))
+            return
+        size = int(self.headers.get('Content-Length', 0))
+        if size > MAX_BODY_SIZE:
+            self._reply(413, dict(error='Request too large.'))
+            return
+        try:
+            request = json.loads(self.rfile.read(size) or b'{}')
+        except ValueError:
+            self._reply(400, dict(error='Invalid JSON.'))
+            return
+        if not isinstance(request, dict):
+            self._reply(400, dict(error='Invalid request.'))
+            return
+        self._reply(*self.server.answer(command, request))
+
+    def log_message(self, format_, *_args):
+        msg(f'{self.address_string()} - {format_ % _args}',
+            self.server.verbose, D_VERB_LVL + 1, file=sys.stderr)
+
+
+# ======================================================================
+def mnk_game_server(
+        rows,
+        cols,
+        num_win,
+        gravity,
+        ai_mode,
+        ai_timeout,
+        verbose=D_VERB_LVL,
+        pretty=True,
+        num_workers=None,
+        host=HOST,
+        port=PORT,
+        *_args,
+        **_kws):
+    """
+    Serve the engine over HTTP/JSON (see `EngineServer`).
+
+    Args:
+        rows (int): The default number of rows.
+        cols (int): The default number of columns.
+        num_win (int): The default number of aligned pieces for winning.
+        gravity (bool): Whether to use the gravity rule by default.
+        ai_mode (str): The default AI mode (see `AI_MODES`).
+        ai_timeout (float): The default search duration in sec.
+        verbose (int): The level of verbosity.
+        pretty (bool): Whether to use terminal formatting.
+        num_workers (int|None): The number of worker processes.
+            If None, the number of CPUs is used.
+        host (str): The host to listen on.
+        port (int): The port to listen on (0 for any free port).
+
+    Returns:
+        None.
+    """
+    shape = dict(rows=rows, cols=cols, num_win=num_win, gravity=gravity)
+    server = EngineServer(
+        (host, port), shape, ai_mode, ai_timeout, num_workers,
+        verbose=verbose)
+    msg('I: Serving on http://{}:{}'.format(*server.server_address[:2]),
+        verbose, D_VERB_LVL, fmtt=pretty, file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
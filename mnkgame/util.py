@@ -1,9 +1,10 @@
 import threading
 import copy
+import time
 
 from mnkgame import IS_TTY, D_VERB_LVL
 
-from mnkgame.GameAiSearchTree import GameAiSearchTree
+from mnkgame.GameAiSearchTree import GameAiSearchTree, tactical_move
 from mnkgame.GameAiRandom import GameAiRandom
 
 AI_MODES = dict(
@@ -23,18 +24,27 @@ AI_MODES = dict(
         ai_class=GameAiRandom, ai_method='less'),
     zero_random=dict(
         ai_class=GameAiRandom, ai_method='zero'),
+    playout_random=dict(
+        ai_class=GameAiRandom, ai_method='playouts'),
 )
 USER_INTERFACES = (
     'auto',
     'gui',
     # 'tui',
-    'cli')
+    'cli',
+    'analyze',
+    'engine',
+    'server')
 ALIASES = dict(
     custom=None,
     tic_tac_toe=dict(rows=3, cols=3, num_win=3, gravity=False),
     connect4=dict(rows=6, cols=7, num_win=4, gravity=True),
     gomoku=dict(rows=15, cols=15, num_win=5, gravity=False),
 )
+# maximum duration of pondering on a single expected reply in sec
+MAX_PONDER_DURATION = 3600.0
+# number of exactly scored moves in the analysis
+NUM_ANALYSIS_PV = 3
 
 
 # ======================================================================
@@ -71,7 +81,8 @@ class AskAiMove(threading.Thread):
             ai_class,
             ai_method,
             callback=None,
-            verbose=D_VERB_LVL):
+            verbose=D_VERB_LVL,
+            ai=None):
         super(AskAiMove, self).__init__()
         self.queue = queue_
         self.board = board
@@ -80,16 +91,139 @@ class AskAiMove(threading.Thread):
         self.ai_method = ai_method
         self.callback = callback
         self.verbose = verbose
+        self.ai = ai
 
     def run(self):
-        move = self.ai_class().get_best_move(
+        ai = self.ai if self.ai is not None else self.ai_class()
+        move = ai.get_best_move(
             copy.deepcopy(self.board),
             self.ai_timeout, self.ai_method, max_depth=-1,
             callback=self.callback,
-            verbose=self.verbose >= D_VERB_LVL)
+            verbose=self.verbose >= D_VERB_LVL,
+            stats=self.verbose > D_VERB_LVL)
+        if self.verbose > D_VERB_LVL:
+            print(ai.stats.to_json())
         self.queue.put(move)
 
 
+# ======================================================================
+class AskAiMoveScores(threading.Thread):
+    def __init__(
+            self,
+            queue_,
+            board,
+            ai_timeout,
+            ai_class,
+            ai_method,
+            num_pv=NUM_ANALYSIS_PV,
+            verbose=D_VERB_LVL):
+        super(AskAiMoveScores, self).__init__()
+        self.queue = queue_
+        self.board = board
+        self.ai_timeout = ai_timeout
+        self.ai_class = ai_class
+        self.ai_method = ai_method
+        self.num_pv = num_pv
+        self.verbose = verbose
+
+    def run(self):
+        ai = self.ai_class()
+        result = ai.get_move_scores(
+            copy.deepcopy(self.board),
+            self.ai_timeout, self.ai_method, max_depth=-1,
+            num_pv=self.num_pv, verbose=self.verbose > D_VERB_LVL)
+        self.queue.put(result)
+
+
+# ======================================================================
+class Ponder(threading.Thread):
+    """
+    Search on the opponent's time.
+
+    After the computer moves, the search runs in the background on the
+    position after the expected reply (or after each reply, in turn, if
+    no reply is expected).
+    Unless given, the expected reply is the forced one, if any, otherwise
+    the second move of the principal variation of the last search, if it
+    started with `last_move`.
+    The AI persistent caches are filled in the process, so that a new
+    search on a pondered position is faster even if pondering did not
+    last long enough to be used directly.
+    The AI must not be used by others until pondering is stopped.
+    """
+
+    def __init__(
+            self,
+            ai,
+            board,
+            ai_timeout,
+            ai_method,
+            expected=None,
+            last_move=None):
+        super(Ponder, self).__init__(daemon=True)
+        self.ai = ai
+        self.board = copy.deepcopy(board)
+        self.ai_timeout = ai_timeout
+        self.ai_method = ai_method
+        if expected is None:
+            expected = tactical_move(self.board)
+        pv = getattr(ai.stats, 'pv', None) or []
+        if expected is None and len(pv) > 1 and pv[0] == last_move:
+            expected = pv[1]
+        self.expected = expected
+        self.results = {}
+        self.stop_event = threading.Event()
+
+    def run(self):
+        board = self.board
+        if self.expected is not None:
+            replies = [self.expected]
+            max_duration = MAX_PONDER_DURATION
+        else:
+            replies = board.sorted_moves()
+            max_duration = self.ai_timeout
+        for reply in replies:
+            if self.stop_event.is_set():
+                break
+            board.do_move(reply)
+            if board.winning_move(reply) != board.turn \
+                    and not board.is_full():
+                begin_time = time.time()
+                move = self.ai.get_best_move(
+                    board, max_duration, self.ai_method, max_depth=-1,
+                    verbose=False, stop=self.stop_event)
+                self.results[reply] = (
+                    move, time.time() - begin_time,
+                    not self.stop_event.is_set())
+            board.undo_move(reply)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def get_move(self, reply, min_duration):
+        """
+        Stop pondering and get the move for a reply (on a ponder hit).
+
+        Args:
+            reply (Any): The actual reply.
+            min_duration (float): The minimum pondering duration in sec.
+                If the search on `reply` lasted less and was interrupted,
+                no move is returned.
+
+        Returns:
+            move (Any|None): The move, if pondering on `reply` was enough.
+        """
+        self.stop()
+        move, duration, is_complete = \
+            self.results.get(reply, (None, 0.0, False))
+        if is_complete or duration >= min_duration:
+            return move
+        else:
+            return None
+
+
 # ======================================================================
 def is_gui_available():
     tk = None